@@ -4,15 +4,26 @@ Backend server for Quotation Management System using SQLite3 Database class.
 Flask handles API endpoints and connects frontend with database, email, and AI.
 FEATURES: Content filter + Auto-detection + Follow-up tracking + Conversation threads
 """
-from flask import Flask, request, jsonify, send_from_directory, session
+from flask import Flask, Response, g, request, jsonify, make_response, send_from_directory, session
 from flask_cors import CORS
 from datetime import datetime
+from functools import partial, wraps
 from config import config
-from database import db
+from database import db, keyset_ranges, keyset_fetch, keyset_slice
+from counters import table_count, status_counts
+from query_profiler import profiler
+from publisher_import import iter_csv, iter_ndjson, spool
+from export import EXPORT_TABLES, FORMATS, stream_export
+from archive import attach_archive, union_source, archived_count
+from message_store import INQUIRY_LIST_COLUMNS, encode_body, make_excerpt, decode_row
 from auth import login_required, AuthManager
 from models import User
 from email_handler import email_handler
+from email_pipeline import ingest_pipeline
+from schedulet import scheduler
+from backup import create_backup, list_backups
 from ai_assistant import ai_assistant, get_ai_response, get_inquiry_priority
+import hashlib
 import logging
 import os
 
@@ -58,12 +69,127 @@ def serve_static(path):
     return send_from_directory(FRONTEND_DIR, path)
 
 # ---------------------------------------------------------------------------
-# Start email monitoring safely
+# Database maintenance (ANALYZE, optimize, WAL checkpoints, vacuum).
+# Off on import (tests, scripts, WSGI workers) unless MAINTENANCE_ENABLED;
+# the __main__ entrypoint below starts it when MAINTENANCE_ON_SERVE.
 # ---------------------------------------------------------------------------
-try:
-    email_handler.start_email_monitoring(interval=60)
-except AttributeError:
-    logging.warning("EmailHandler monitoring not fully implemented or already running.")
+if config.MAINTENANCE_ENABLED:
+    scheduler.start()
+
+# ---------------------------------------------------------------------------
+# Database lanes: GET/HEAD handlers read through the read-only pool
+# ---------------------------------------------------------------------------
+@app.before_request
+def select_db_lane():
+    db.set_read_only_lane(request.method in ('GET', 'HEAD'))
+
+@app.teardown_request
+def reset_db_lane(exc):
+    db.set_read_only_lane(False)
+
+# ---------------------------------------------------------------------------
+# Conditional GET: ETags from table change versions
+# ---------------------------------------------------------------------------
+def conditional(*tables):
+    """
+    Answer If-None-Match with 304 when none of the tables the route reads
+    changed, without running the route's queries. The ETag is derived from
+    the trigger-maintained table_versions counters (Database.data_version).
+    
+    Usage:
+        @app.route('/api/clients')
+        @login_required
+        @conditional('clients')
+        def get_clients(): ...
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            version = db.data_version(tables)
+            if version is None:
+                return f(*args, **kwargs)
+            
+            etag = hashlib.md5(version.encode()).hexdigest()[:20]
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
+
+# ---------------------------------------------------------------------------
+# Archive fallback (?include_archived=1)
+# ---------------------------------------------------------------------------
+def _include_archived():
+    return request.args.get('include_archived', '0') in ('1', 'true')
+
+def _archive_sources(conn, *tables):
+    """
+    FROM sources for the given tables: the hot table, or a hot + archive
+    union when the request asked for ?include_archived=1.
+    """
+    if _include_archived() and attach_archive(conn):
+        return [union_source(conn, t) for t in tables]
+    return list(tables)
+
+# ---------------------------------------------------------------------------
+# Pagination helper
+# ---------------------------------------------------------------------------
+def _list_body(rows, total, page, per_page, after, keys):
+    """
+    Build the body shared by all list routes.
+    Offset mode (?page=N) returns page/pages; keyset mode (?after=<cursor>)
+    expects per_page + 1 rows and returns next_cursor/has_more instead.
+    
+    With ?format=columns rows are sent as one "columns" header plus
+    "rows" value arrays instead of one dict (repeating every key) per row.
+    """
+    if after is not None:
+        rows, next_cursor = keyset_slice(rows, per_page, keys)
+        body = {
+            "total": total,
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
+        }
+    else:
+        body = {
+            "total": total,
+            "page": page,
+            "pages": (total + per_page - 1) // per_page,
+            "per_page": per_page
+        }
+    
+    if request.args.get('format') == 'columns':
+        body["columns"] = list(rows[0].keys()) if rows else []
+        body["rows"] = [tuple(r) for r in rows]
+    else:
+        body["data"] = [dict(r) for r in rows]
+    
+    return body
+
+def _list_response(rows, total, page, per_page, after, keys):
+    return jsonify(_list_body(rows, total, page, per_page, after, keys)), 200
+
+def _fetchall(conn, sql, params):
+    return conn.execute(sql, params).fetchall()
+
+def _keyset_rows(execute, query, conditions, params, ranges, order_by, per_page):
+    """
+    per_page + 1 rows after the cursor, running query once per keyset
+    range (see keyset_ranges) until the page is full.
+    """
+    def fetch(clause, cursor_params, limit):
+        where = conditions + ([f"({clause})"] if clause else [])
+        sql = query + (" WHERE " + " AND ".join(where) if where else "") + f" ORDER BY {order_by} LIMIT ?"
+        return execute(sql, (*params, *cursor_params, limit))
+    return keyset_fetch(fetch, ranges, per_page + 1)
 
 # ============================================================================
 # AUTHENTICATION ROUTES
@@ -122,33 +248,45 @@ def logout():
 # ============================================================================
 @app.route('/api/clients', methods=['GET'])
 @login_required
+@conditional('clients')
 def get_clients():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 50, type=int)
     search = request.args.get('search', '')
+    after = request.args.get('after')
+    
+    conditions = []
+    params = []
+    
+    if search:
+        fts = db.search_filter('clients', search, ['full_name', 'email'])
+        if fts:
+            conditions.append(fts[0])
+            params += fts[1]
+        else:
+            conditions.append("(full_name LIKE ? OR email LIKE ?)")
+            params += [f"%{search}%", f"%{search}%"]
+    
+    if after is not None:
+        try:
+            ranges = keyset_ranges(['id'], after)
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
     
     with db.get_connection() as conn:
         query = "SELECT * FROM clients"
-        params = []
-        
-        if search:
-            query += " WHERE full_name LIKE ? OR email LIKE ?"
-            params = (f"%{search}%", f"%{search}%")
+        execute = partial(_fetchall, conn)
         
-        query += " LIMIT ? OFFSET ?"
-        params += (per_page, (page-1)*per_page)
-        
-        rows = conn.execute(query, params).fetchall()
-        total = conn.execute("SELECT COUNT(*) as total FROM clients").fetchone()['total']
+        if after is not None:
+            rows = _keyset_rows(execute, query, conditions, params, ranges, "id ASC", per_page)
+        else:
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            query += " ORDER BY id ASC LIMIT ? OFFSET ?"
+            rows = execute(query, tuple(params + [per_page, (page-1)*per_page]))
+        total = table_count(conn, 'clients')
     
-    clients = [dict(r) for r in rows]
-    return jsonify({
-        "data": clients,
-        "total": total,
-        "page": page,
-        "pages": (total + per_page - 1) // per_page,
-        "per_page": per_page
-    }), 200
+    return _list_response(rows, total, page, per_page, after, ['id'])
 
 @app.route('/api/clients', methods=['POST'])
 @login_required
@@ -179,6 +317,7 @@ def update_client(client_id):
 
 @app.route('/api/clients/<int:client_id>', methods=['GET'])
 @login_required
+@conditional('clients')
 def get_client(client_id):
     """Get single client by ID"""
     with db.get_connection() as conn:
@@ -227,52 +366,67 @@ def delete_client(client_id):
 # ============================================================================
 @app.route('/api/inquiries', methods=['GET'])
 @login_required
+@conditional('inquiries', 'clients')
 def get_inquiries():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 50, type=int)
     status_filter = request.args.get('status', '')
+    after = request.args.get('after')
+    
+    conditions = []
+    params = []
+    
+    if status_filter:
+        conditions.append("i.status=?")
+        params.append(status_filter)
+    
+    if after is not None:
+        try:
+            ranges = keyset_ranges(['i.received_at', 'i.id'], after, descending=True)
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
     
     with db.get_connection() as conn:
-        query = """
-            SELECT i.*, c.full_name as client_name, c.email as client_email
-            FROM inquiries i
+        inquiries, = _archive_sources(conn, 'inquiries')
+        columns = ', '.join(f"i.{c}" for c in INQUIRY_LIST_COLUMNS)
+        query = f"""
+            SELECT {columns}, c.full_name as client_name, c.email as client_email
+            FROM {inquiries} i
             LEFT JOIN clients c ON i.client_id = c.id
         """
-        params = []
-        
-        if status_filter:
-            query += " WHERE i.status=?"
-            params = [status_filter]
         
-        query += " ORDER BY i.received_at DESC LIMIT ? OFFSET ?"
-        params += [per_page, (page-1)*per_page]
-        
-        rows = conn.execute(query, tuple(params)).fetchall()
+        if after is not None:
+            rows = _keyset_rows(db.execute_query, query, conditions, params, ranges,
+                                "i.received_at DESC, i.id DESC", per_page)
+        else:
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            query += " ORDER BY i.received_at DESC LIMIT ? OFFSET ?"
+            rows = db.execute_query(query, tuple(params + [per_page, (page-1)*per_page]))
         
-        total_query = "SELECT COUNT(*) as total FROM inquiries"
         if status_filter:
-            total_query += " WHERE status=?"
-            total = conn.execute(total_query, (status_filter,)).fetchone()['total']
+            total = db.count_by_status(status_filter)
         else:
-            total = conn.execute(total_query).fetchone()['total']
+            total = db.count_rows('inquiries')
+        
+        if inquiries != 'inquiries':
+            if status_filter:
+                total += archived_count(conn, 'inquiries', "status=?", (status_filter,))
+            else:
+                total += archived_count(conn, 'inquiries')
     
-    inquiries = [dict(r) for r in rows]
-    return jsonify({
-        "data": inquiries,
-        "total": total,
-        "page": page,
-        "pages": (total + per_page - 1) // per_page,
-        "per_page": per_page
-    }), 200
+    return _list_response(rows, total, page, per_page, after, ['received_at', 'id'])
 
 @app.route('/api/inquiries/<int:inquiry_id>', methods=['GET'])
 @login_required
+@conditional('inquiries', 'clients')
 def get_inquiry(inquiry_id):
     """Get single inquiry with client info"""
     with db.get_connection() as conn:
-        row = conn.execute("""
+        inquiries, = _archive_sources(conn, 'inquiries')
+        row = conn.execute(f"""
             SELECT i.*, c.full_name as client_name, c.email as client_email, c.phone as client_phone
-            FROM inquiries i
+            FROM {inquiries} i
             LEFT JOIN clients c ON i.client_id = c.id
             WHERE i.id = ?
         """, (inquiry_id,)).fetchone()
@@ -280,17 +434,14 @@ def get_inquiry(inquiry_id):
         if not row:
             return jsonify({"error": "Inquiry not found"}), 404
         
-        return jsonify(dict(row)), 200
+        return jsonify(decode_row(row)), 200
 
 @app.route('/api/inquiries/stats', methods=['GET'])
 @login_required
+@conditional('inquiries')
 def get_inquiry_stats():
     """Get inquiry statistics"""
-    with db.get_connection() as conn:
-        rows = conn.execute("SELECT status, COUNT(*) as count FROM inquiries GROUP BY status").fetchall()
-        stats = {row['status']: row['count'] for row in rows}
-    
-    return jsonify(stats), 200
+    return jsonify(db.count_by_status()), 200
 
 @app.route('/api/inquiries', methods=['POST'])
 @login_required
@@ -302,8 +453,8 @@ def create_inquiry():
     
     with db.get_connection() as conn:
         cursor = conn.execute(
-            "INSERT INTO inquiries (client_id, subject, message, status) VALUES (?,?,?,?)",
-            (client_id, subject, message, 'pending')
+            "INSERT INTO inquiries (client_id, subject, message, message_excerpt, status) VALUES (?,?,?,?,?)",
+            (client_id, subject, encode_body(message), make_excerpt(message), 'pending')
         )
         inquiry_id = cursor.lastrowid
     
@@ -325,7 +476,7 @@ def create_response():
     
     user = AuthManager.get_current_user()
     
-    with db.get_connection() as conn:
+    def save_response(conn):
         # Create response
         cursor = conn.execute(
             "INSERT INTO responses (inquiry_id, user_id, response_text) VALUES (?,?,?)",
@@ -336,7 +487,7 @@ def create_response():
         # Create initial agent message in conversation thread
         conn.execute(
             "INSERT INTO conversation_messages (response_id, sender, message) VALUES (?, ?, ?)",
-            (response_id, 'agent', response_text)
+            (response_id, 'agent', encode_body(response_text))
         )
         
         # Update inquiry status
@@ -344,19 +495,14 @@ def create_response():
             "UPDATE inquiries SET status='responded', responded_at=? WHERE id=?",
             (datetime.utcnow(), inquiry_id)
         )
+        return response_id
+    
+    response_id = db.write(save_response)
     
     return jsonify({"success": True, "response_id": response_id, "email_sent": False}), 201
 
-@app.route('/api/responses', methods=['GET'])
-@login_required
-def get_responses():
-    """Get all responses with pagination and full client info"""
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 50, type=int)
-    
-    with db.get_connection() as conn:
-        query = """
-            SELECT 
+# Columns of the response list (r = responses, i = inquiries, c = clients, u = users)
+RESPONSE_LIST_COLUMNS = """
                 r.id,
                 r.inquiry_id,
                 r.response_text,
@@ -371,34 +517,56 @@ def get_responses():
                 c.company as client_company,
                 c.phone as client_phone,
                 u.full_name as sent_by_user
-            FROM responses r
-            LEFT JOIN inquiries i ON r.inquiry_id = i.id
+"""
+
+@app.route('/api/responses', methods=['GET'])
+@login_required
+@conditional('responses', 'inquiries', 'clients', 'users')
+def get_responses():
+    """Get all responses with pagination and full client info"""
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 50, type=int)
+    after = request.args.get('after')
+    
+    if after is not None:
+        try:
+            ranges = keyset_ranges(['r.sent_at', 'r.id'], after, descending=True)
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+    
+    with db.get_connection() as conn:
+        responses, inquiries = _archive_sources(conn, 'responses', 'inquiries')
+        query = f"""
+            SELECT {RESPONSE_LIST_COLUMNS}
+            FROM {responses} r
+            LEFT JOIN {inquiries} i ON r.inquiry_id = i.id
             LEFT JOIN clients c ON i.client_id = c.id
             LEFT JOIN users u ON r.user_id = u.id
-            ORDER BY r.sent_at DESC
-            LIMIT ? OFFSET ?
         """
-        rows = conn.execute(query, (per_page, (page-1)*per_page)).fetchall()
+        execute = partial(_fetchall, conn)
+        
+        if after is not None:
+            rows = _keyset_rows(execute, query, [], [], ranges, "r.sent_at DESC, r.id DESC", per_page)
+        else:
+            query += " ORDER BY r.sent_at DESC LIMIT ? OFFSET ?"
+            rows = execute(query, (per_page, (page-1)*per_page))
         
-        total_query = "SELECT COUNT(*) as total FROM responses"
-        total = conn.execute(total_query).fetchone()['total']
+        total = table_count(conn, 'responses')
+        if responses != 'responses':
+            total += archived_count(conn, 'responses')
     
-    responses = [dict(r) for r in rows]
-    return jsonify({
-        "data": responses,
-        "total": total,
-        "page": page,
-        "pages": (total + per_page - 1) // per_page,
-        "per_page": per_page
-    }), 200
+    return _list_response(rows, total, page, per_page, after, ['sent_at', 'id'])
 
 @app.route('/api/responses/<int:response_id>', methods=['GET'])
 @login_required
+@conditional('responses', 'inquiries', 'clients', 'users', 'conversation_messages')
 def get_response(response_id):
     """Get single response by ID with full conversation thread"""
     with db.get_connection() as conn:
+        responses, inquiries, messages_source = _archive_sources(conn, 'responses', 'inquiries', 'conversation_messages')
+        
         # Get response details
-        query = """
+        query = f"""
             SELECT 
                 r.id,
                 r.inquiry_id,
@@ -412,8 +580,8 @@ def get_response(response_id):
                 c.full_name as client_name,
                 c.email as client_email,
                 u.full_name as sent_by
-            FROM responses r
-            LEFT JOIN inquiries i ON r.inquiry_id = i.id
+            FROM {responses} r
+            LEFT JOIN {inquiries} i ON r.inquiry_id = i.id
             LEFT JOIN clients c ON i.client_id = c.id
             LEFT JOIN users u ON r.user_id = u.id
             WHERE r.id = ?
@@ -423,17 +591,17 @@ def get_response(response_id):
         if not row:
             return jsonify({"error": "Response not found"}), 404
         
-        response_data = dict(row)
+        response_data = decode_row(row, 'inquiry_message')
         
         # Get conversation thread (all messages)
-        messages_query = """
+        messages_query = f"""
             SELECT id, sender, message, sent_at
-            FROM conversation_messages
+            FROM {messages_source}
             WHERE response_id = ?
             ORDER BY sent_at ASC
         """
         messages = conn.execute(messages_query, (response_id,)).fetchall()
-        response_data['conversation_thread'] = [dict(m) for m in messages]
+        response_data['conversation_thread'] = [decode_row(m) for m in messages]
     
     return jsonify(response_data), 200
 
@@ -444,19 +612,23 @@ def mark_client_replied(response_id):
     data = request.get_json()
     client_replied = data.get('client_replied', 1)
     
-    with db.get_connection() as conn:
+    def mark_replied(conn):
         response = conn.execute(
             "SELECT id FROM responses WHERE id = ?",
             (response_id,)
         ).fetchone()
         
         if not response:
-            return jsonify({"error": "Response not found"}), 404
+            return False
         
         conn.execute(
             "UPDATE responses SET client_replied = ? WHERE id = ?",
             (client_replied, response_id)
         )
+        return True
+    
+    if not db.write(mark_replied):
+        return jsonify({"error": "Response not found"}), 404
     
     return jsonify({
         "success": True, 
@@ -472,14 +644,14 @@ def update_follow_up(response_id):
     deal_status = data.get('deal_status')
     client_replied = data.get('client_replied')
     
-    with db.get_connection() as conn:
+    def save_follow_up(conn):
         response = conn.execute(
             "SELECT id FROM responses WHERE id = ?",
             (response_id,)
         ).fetchone()
         
         if not response:
-            return jsonify({"error": "Response not found"}), 404
+            return False
         
         update_fields = []
         update_values = []
@@ -500,6 +672,10 @@ def update_follow_up(response_id):
             update_values.append(response_id)
             query = f"UPDATE responses SET {', '.join(update_fields)} WHERE id = ?"
             conn.execute(query, tuple(update_values))
+        return True
+    
+    if not db.write(save_follow_up):
+        return jsonify({"error": "Response not found"}), 404
     
     return jsonify({
         "success": True,
@@ -520,26 +696,31 @@ def add_message_to_conversation(response_id):
     if sender not in ['agent', 'client']:
         return jsonify({"error": "sender must be 'agent' or 'client'"}), 400
     
-    with db.get_connection() as conn:
+    def save_message(conn):
         response = conn.execute(
             "SELECT id FROM responses WHERE id = ?",
             (response_id,)
         ).fetchone()
         
         if not response:
-            return jsonify({"error": "Response not found"}), 404
+            return None
         
         cursor = conn.execute(
             "INSERT INTO conversation_messages (response_id, sender, message) VALUES (?, ?, ?)",
-            (response_id, sender, message)
+            (response_id, sender, encode_body(message))
         )
-        message_id = cursor.lastrowid
         
         if sender == 'client':
             conn.execute(
                 "UPDATE responses SET client_replied = 1, follow_up_method = 'email' WHERE id = ?",
                 (response_id,)
             )
+        return cursor.lastrowid
+    
+    message_id = db.write(save_message)
+    
+    if message_id is None:
+        return jsonify({"error": "Response not found"}), 404
     
     return jsonify({
         "success": True,
@@ -582,52 +763,179 @@ def generate_ai_response():
 @app.route('/api/publishers/bulk-import', methods=['POST'])
 @login_required
 def bulk_upload_publishers():
-    data = request.get_json()
-    publishers_data = data if isinstance(data, list) else data.get('publishers', [])
+    """
+    Import publishers from a JSON list, or stream them from a CSV/NDJSON
+    body (Content-Type text/csv or application/x-ndjson) or a multipart
+    'file' upload (.csv / .ndjson) without loading the file in memory.
+    The upload is received in full (spooled to disk when large) before the
+    writer connection is taken, so a slow client never blocks other writes.
+    """
+    content_type = request.mimetype
+    upload = request.files.get('file')
+    
+    if upload is not None:
+        # Already received: werkzeug spools multipart files while parsing
+        stream = upload.stream
+        rows = iter_ndjson(stream) if upload.filename.endswith(('.ndjson', '.jsonl')) else iter_csv(stream)
+    elif content_type == 'text/csv':
+        rows = iter_csv(spool(request.stream))
+    elif content_type in ('application/x-ndjson', 'application/jsonl'):
+        rows = iter_ndjson(spool(request.stream))
+    else:
+        data = request.get_json(silent=True) or {}
+        rows = data if isinstance(data, list) else data.get('publishers', [])
+        if not rows:
+            return jsonify({"error": "No publishers data provided"}), 400
     
-    if not publishers_data:
+    result = db.import_publishers(rows)
+    if not result['total']:
         return jsonify({"error": "No publishers data provided"}), 400
     
-    total_inserted = db.bulk_insert_publishers(publishers_data)
-    return jsonify({"success": True, "imported": total_inserted, "total": len(publishers_data)}), 200
+    return jsonify({"success": True, "imported": result['inserted'], **result}), 200
 
 @app.route('/api/publishers', methods=['GET'])
 @login_required
+@conditional('publishers')
 def get_publishers():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 100, type=int)
     search = request.args.get('search', '')
+    after = request.args.get('after')
     
-    with db.get_connection() as conn:
-        query = "SELECT * FROM publishers"
-        params = []
+    conditions = []
+    params = []
+    
+    if search:
+        fts = db.search_filter('publishers', search, ['name', 'email'])
+        if fts:
+            conditions.append(fts[0])
+            params += fts[1]
+        else:
+            conditions.append("(name LIKE ? OR email LIKE ?)")
+            params += [f"%{search}%", f"%{search}%"]
+    
+    if after is not None:
+        try:
+            ranges = keyset_ranges(['name', 'id'], after)
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+    
+    query = "SELECT * FROM publishers"
+    if after is not None:
+        rows = _keyset_rows(db.execute_query, query, conditions, params, ranges, "name ASC, id ASC", per_page)
+    else:
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY name ASC LIMIT ? OFFSET ?"
+        rows = db.execute_query(query, tuple(params + [per_page, (page-1)*per_page]))
+    total = db.count_rows('publishers')
+    
+    return _list_response(rows, total, page, per_page, after, ['name', 'id'])
+
+@app.route('/api/publishers/count', methods=['GET'])
+@login_required
+@conditional('publishers')
+def get_publisher_count():
+    """Get total publisher count"""
+    return jsonify({"count": db.count_rows('publishers')}), 200
+
+# ============================================================================
+# DASHBOARD ROUTES
+# ============================================================================
+@app.route('/api/dashboard/bootstrap', methods=['GET'])
+@login_required
+def dashboard_bootstrap():
+    """
+    Everything the dashboard needs for first paint in one request: current
+    user, inquiry stats, table counters, the first page of inquiries
+    (?status=, default pending) and the most recent responses (replaces
+    /api/auth/check plus four list/stat calls). The user is the one
+    login_required already resolved; everything else is read from one
+    connection inside one read transaction, so it comes from the same
+    snapshot.
+    """
+    per_page = request.args.get('per_page', 50, type=int)
+    status_filter = request.args.get('status', 'pending')
+    
+    with db.get_connection(readonly=True) as conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
         
-        if search:
-            query += " WHERE name LIKE ? OR email LIKE ?"
-            params = (f"%{search}%", f"%{search}%")
+        stats = status_counts(conn)
+        counts = {table: table_count(conn, table) for table in ('clients', 'inquiries', 'responses', 'publishers')}
         
-        query += " ORDER BY name ASC LIMIT ? OFFSET ?"
-        params += (per_page, (page-1)*per_page)
+        columns = ', '.join(f"i.{c}" for c in INQUIRY_LIST_COLUMNS)
+        query = f"""
+            SELECT {columns}, c.full_name as client_name, c.email as client_email
+            FROM inquiries i
+            LEFT JOIN clients c ON i.client_id = c.id
+        """
+        params = []
+        if status_filter:
+            query += " WHERE i.status=?"
+            params.append(status_filter)
+        query += " ORDER BY i.received_at DESC LIMIT ?"
+        params.append(per_page)
+        inquiries = conn.execute(query, tuple(params)).fetchall()
+        inquiries_total = stats.get(status_filter, 0) if status_filter else counts['inquiries']
         
-        rows = conn.execute(query, params).fetchall()
-        total = conn.execute("SELECT COUNT(*) as total FROM publishers").fetchone()['total']
+        responses = conn.execute(f"""
+            SELECT {RESPONSE_LIST_COLUMNS}
+            FROM responses r
+            LEFT JOIN inquiries i ON r.inquiry_id = i.id
+            LEFT JOIN clients c ON i.client_id = c.id
+            LEFT JOIN users u ON r.user_id = u.id
+            ORDER BY r.sent_at DESC LIMIT ?
+        """, (per_page,)).fetchall()
     
-    publishers = [dict(r) for r in rows]
     return jsonify({
-        "data": publishers,
-        "total": total,
-        "page": page,
-        "pages": (total + per_page - 1) // per_page,
-        "per_page": per_page
+        "user": g.current_user,
+        "stats": stats,
+        "counts": counts,
+        "status": status_filter,
+        "inquiries": _list_body(inquiries, inquiries_total, 1, per_page, None, ['received_at', 'id']),
+        "responses": _list_body(responses, counts['responses'], 1, per_page, None, ['sent_at', 'id'])
     }), 200
 
-@app.route('/api/publishers/count', methods=['GET'])
+# ============================================================================
+# EXPORT ROUTES
+# ============================================================================
+@app.route('/api/export/<table>', methods=['GET'])
 @login_required
-def get_publisher_count():
-    """Get total publisher count"""
-    with db.get_connection() as conn:
-        total = conn.execute("SELECT COUNT(*) as total FROM publishers").fetchone()['total']
-    return jsonify({"count": total}), 200
+def export_table(table):
+    """
+    Stream a whole table as CSV or NDJSON straight from the cursor.
+    
+    Query params:
+        format: csv (default) or ndjson
+        gzip: 1 to gzip the stream
+        search: clients / publishers filter (same as the list routes)
+        status: inquiries filter (same as the list route)
+    """
+    if table not in EXPORT_TABLES:
+        return jsonify({"error": f"Unknown export table '{table}'", "tables": sorted(EXPORT_TABLES)}), 404
+    
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+    
+    compress = request.args.get('gzip', '0') in ('1', 'true')
+    chunks = stream_export(
+        db, table, fmt,
+        search=request.args.get('search', ''),
+        status=request.args.get('status', ''),
+        compress=compress
+    )
+    
+    filename = f"{table}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}" + (".gz" if compress else "")
+    return Response(
+        chunks,
+        mimetype='application/gzip' if compress else FORMATS[fmt],
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Accel-Buffering': 'no'
+        }
+    )
 
 # ============================================================================
 # EMAIL ROUTES - WITH CONTENT FILTER, AUTO-DETECTION & CONVERSATION THREADS
@@ -636,236 +944,46 @@ def get_publisher_count():
 @login_required
 def sync_emails():
     """
-    Sync emails manually - UNSEEN ONLY
-    WITH FILTER: Only processes emails with complete info (min 3 of 4 fields)
-    WITH AUTO-DETECTION: Detects client replies and adds to conversation thread
+    Queue a background sync of mail that arrived after the UID checkpoint
+    (see email_pipeline.py); poll /api/email/sync/<job_id> for progress
     """
-    try:
-        import re
-        
-        new_emails = email_handler.fetch_new_emails()
-        count = 0
-        rejected_count = 0
-        
-        logging.info(f"\nProcessing {len(new_emails)} new emails...")
-        
-        for email_data in new_emails:
-            from_email = email_data.get('from')
-            body = email_data.get('body', '')
-            raw_subject = email_data.get('subject', '').strip()
-            
-            # Extract contact information
-            phone = None
-            phone_patterns = [
-                r'[Pp]hone[\s:]+\*?(\+?\d{1,3}[-.\s]?\(?\d{1,4}\)?[-.\s]?\d{1,4}[-.\s]?\d{1,9})\*?',
-                r'[Tt]el[eé]fono[\s:]+\*?(\+?\d{1,3}[-.\s]?\(?\d{1,4}\)?[-.\s]?\d{1,4}[-.\s]?\d{1,9})\*?',
-                r'\*(\+\d{1,3}[-.\s]?\d{1,4}[-.\s]?\d{1,4}[-.\s]?\d{1,9})\*',
-                r'\+?\d{1,3}[-.\s]?\(?\d{1,4}\)?[-.\s]?\d{1,4}[-.\s]?\d{1,9}',
-            ]
-            
-            for pattern in phone_patterns:
-                match = re.search(pattern, body)
-                if match:
-                    phone_raw = match.group(1) if match.lastindex else match.group(0)
-                    phone_raw = phone_raw.strip().replace('*', '')
-                    if len(re.findall(r'\d', phone_raw)) >= 6:
-                        phone = phone_raw
-                        break
-            
-            # Extract company
-            company = None
-            company_patterns = [
-                r'[Ff]rom\s+\*([A-Z][A-Za-z\s&.]+)\*',
-                r'[Ff]rom\s+([A-Z][A-Za-z\s&.]+?)(?:\.|$|\n)',
-                r'(?:company|empresa|organization|org)[\s:]+\*?([A-Z][A-Za-z\s&.,]+?)\*?(?:\n|$|\.|,)',
-                r'\*([A-Z][A-Za-z\s&.]+(?:Solutions|Inc|LLC|Ltd|Corp|SA|SRL|Systems|Technologies|Group|Company))\*',
-                r'([A-Z][A-Za-z\s&.]+(?:Solutions|Inc|LLC|Ltd|Corp|SA|SRL|Systems|Technologies|Group))',
-            ]
-            
-            for pattern in company_patterns:
-                match = re.search(pattern, body, re.IGNORECASE | re.MULTILINE)
-                if match:
-                    company = match.group(1).strip().replace('*', '')
-                    company = re.sub(r'\s+', ' ', company)
-                    company = re.sub(r'[.,]+$', '', company)
-                    if len(company) > 3:
-                        break
-            
-            # Extract name
-            full_name = from_email.split('@')[0]
-            name_patterns = [
-                r'(?:my name is|I am|I\'m)\s+\*?([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)\*?\s+from',
-                r'(?:my name is|I am|I\'m)\s+\*?([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)\*?',
-                r'(?:name|nombre)[\s:]+\*?([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)\*?',
-                r'^\*?([A-Z][a-z]+\s+[A-Z][a-z]+)\*?',
-            ]
-            
-            for pattern in name_patterns:
-                name_match = re.search(pattern, body, re.IGNORECASE | re.MULTILINE)
-                if name_match:
-                    full_name = name_match.group(1).strip()
-                    break
-            
-            # Extract email
-            client_email = None
-            email_patterns = [
-                r'(?:email|e-mail|correo)[\s:]+([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',
-                r'(?:contact|contacto)[\s:]+([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',
-                r'([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',
-            ]
-            
-            for pattern in email_patterns:
-                email_match = re.search(pattern, body, re.IGNORECASE)
-                if email_match:
-                    extracted_email = email_match.group(1).lower()
-                    if not any(x in extracted_email for x in ['noreply', 'no-reply', 'wordpress', 'system', 'mailer']):
-                        client_email = extracted_email
-                        break
-            
-            if not client_email:
-                client_email = from_email
-            
-            # Validate fields
-            valid_name = bool(full_name and full_name != from_email.split('@')[0] and len(full_name) > 2)
-            valid_email = bool(client_email and '@' in client_email)
-            valid_phone = bool(phone)
-            valid_company = bool(company and len(company) > 1)
-            
-            valid_fields_count = sum([valid_name, valid_email, valid_phone, valid_company])
-            
-            MIN_REQUIRED_FIELDS = 3
-            
-            if valid_fields_count < MIN_REQUIRED_FIELDS:
-                rejected_count += 1
-                
-                has = []
-                missing = []
-                if valid_name: has.append('OK Name')
-                else: missing.append('MISSING Name')
-                if valid_email: has.append('OK Email')
-                else: missing.append('MISSING Email')
-                if valid_phone: has.append('OK Phone')
-                else: missing.append('MISSING Phone')
-                if valid_company: has.append('OK Company')
-                else: missing.append('MISSING Company')
-                
-                logging.warning(f"REJECTED Email ({valid_fields_count}/{MIN_REQUIRED_FIELDS} fields): {raw_subject[:50]}")
-                logging.warning(f"   Has: {', '.join(has) if has else 'None'}")
-                logging.warning(f"   Missing: {', '.join(missing)}")
-                continue
-            
-            logging.info(f"VALID Email ({valid_fields_count}/4 fields): {raw_subject[:50]}")
-            
-            if not raw_subject or raw_subject == '':
-                current_date = datetime.now().strftime('%d/%m/%Y')
-                if company:
-                    subject = f"{company} - {current_date}"
-                else:
-                    subject = f"{full_name} - {current_date}"
-            else:
-                subject = raw_subject
-            
-            with db.get_connection() as conn:
-                cursor = conn.execute(
-                    "SELECT id, email FROM clients WHERE full_name = ? AND company = ?",
-                    (full_name, company if company else '')
-                )
-                client = cursor.fetchone()
-                
-                if not client:
-                    name_slug = full_name.lower().replace(' ', '.').replace('*', '')
-                    company_slug = company.lower().replace(' ', '.').replace('*', '') if company else 'unknown'
-                    synthetic_email = f"{name_slug}.{company_slug}@internal.local"
-                    
-                    cursor = conn.execute(
-                        "INSERT INTO clients (full_name, email, phone, company) VALUES (?, ?, ?, ?)",
-                        (full_name, synthetic_email, phone, company)
-                    )
-                    client_id = cursor.lastrowid
-                    logging.info(f"   NEW client created: {full_name} - {company} ({synthetic_email})")
-                else:
-                    client_id = client[0]
-                    
-                    update_fields = []
-                    update_values = []
-                    
-                    if phone:
-                        update_fields.append("phone = ?")
-                        update_values.append(phone)
-                    
-                    if update_fields:
-                        update_values.append(client_id)
-                        conn.execute(
-                            f"UPDATE clients SET {', '.join(update_fields)} WHERE id = ?",
-                            tuple(update_values)
-                        )
-                    logging.info(f"   UPDATED client: {full_name} - {company}")
-                
-                existing = conn.execute(
-                    "SELECT id FROM inquiries WHERE client_id=? AND subject=? AND message=?",
-                    (client_id, subject, body)
-                ).fetchone()
-                
-                if not existing:
-                    cursor = conn.execute(
-                        "INSERT INTO inquiries (client_id, subject, message, status, received_at) VALUES (?, ?, ?, ?, ?)",
-                        (client_id, subject, body, 'pending', datetime.utcnow())
-                    )
-                    inquiry_id = cursor.lastrowid
-                    count += 1
-                    logging.info(f"   CREATED inquiry: {subject[:50]}")
-                    
-                    # ========================================================================
-                    # AUTO-DETECT: Did client reply to previous response?
-                    # ========================================================================
-                    cursor = conn.execute("""
-                        SELECT r.id, r.inquiry_id
-                        FROM responses r
-                        JOIN inquiries i ON r.inquiry_id = i.id
-                        WHERE i.client_id = ? AND r.client_replied = 0
-                        ORDER BY r.sent_at DESC
-                        LIMIT 1
-                    """, (client_id,))
-                    
-                    pending_response = cursor.fetchone()
-                    
-                    if pending_response:
-                        # Update response status
-                        conn.execute("""
-                            UPDATE responses 
-                            SET client_replied = 1, 
-                                follow_up_method = 'email'
-                            WHERE id = ?
-                        """, (pending_response['id'],))
-                        
-                        # ADD CLIENT MESSAGE TO CONVERSATION THREAD
-                        conn.execute("""
-                            INSERT INTO conversation_messages (response_id, sender, message, sent_at)
-                            VALUES (?, 'client', ?, ?)
-                        """, (pending_response['id'], body, datetime.utcnow()))
-                        
-                        logging.info(f"   AUTO-DETECTED: Client replied to response #{pending_response['id']}")
-                        logging.info(f"   MESSAGE ADDED to conversation thread")
-                else:
-                    logging.info(f"   DUPLICATE inquiry skipped: {subject[:50]}")
-        
-        logging.info(f"\nSYNC SUMMARY:")
-        logging.info(f"   Total processed: {len(new_emails)}")
-        logging.info(f"   VALID (complete info): {count + (len(new_emails) - count - rejected_count)}")
-        logging.info(f"   REJECTED (incomplete info): {rejected_count}")
-        logging.info(f"   CREATED inquiries: {count}\n")
-        
-        return jsonify({
-            "success": True, 
-            "count": count,
-            "rejected": rejected_count,
-            "total_processed": len(new_emails),
-            "message": f"Synced {count} new emails (rejected {rejected_count} incomplete)"
-        }), 200
+    job = ingest_pipeline.submit('manual')
     
-    except Exception as e:
-        logging.error(f"Email sync error: {str(e)}")
-        return jsonify({"error": str(e)}), 500
+    return jsonify({
+        "success": True,
+        "job_id": job.id,
+        "status": job.state,
+        "status_url": f"/api/email/sync/{job.id}"
+    }), 202
+
+@app.route('/api/email/sync/<job_id>', methods=['GET'])
+@login_required
+def get_sync_job(job_id):
+    """Sync job progress: state, counts and per-stage items, busy time and throughput"""
+    job = ingest_pipeline.get(job_id)
+    
+    if not job:
+        return jsonify({"error": "Sync job not found"}), 404
+    
+    return jsonify(job.to_dict()), 200
+
+@app.route('/api/email/status', methods=['GET'])
+@login_required
+def email_status():
+    """IMAP watcher state and the latest sync job; last_ingest changes when synced mail was stored"""
+    status = email_handler.monitoring_status() or {"running": False}
+    latest = ingest_pipeline.latest()
+    
+    status['last_ingest'] = ingest_pipeline.last_ingest
+    status['job'] = latest.to_dict() if latest else None
+    return jsonify(status), 200
+
+# ---------------------------------------------------------------------------
+# Start email monitoring: IMAP IDLE queues a sync as soon as mail arrives
+# ---------------------------------------------------------------------------
+if config.EMAIL_MONITORING_ENABLED and config.EMAIL_ADDRESS:
+    email_handler.start_email_monitoring(interval=config.IMAP_POLL_INTERVAL,
+                                         on_new_mail=partial(ingest_pipeline.submit, 'imap'))
 
 # ============================================================================
 # ADMIN ROUTES
@@ -893,7 +1011,7 @@ def migrate_existing_conversations():
             conn.execute("""
                 INSERT INTO conversation_messages (response_id, sender, message, sent_at)
                 VALUES (?, 'agent', ?, ?)
-            """, (resp['id'], resp['response_text'], resp['sent_at']))
+            """, (resp['id'], encode_body(resp['response_text']), resp['sent_at']))
             count += 1
         
         logging.info(f"Migrated {count} existing responses to conversation threads")
@@ -904,13 +1022,121 @@ def migrate_existing_conversations():
         "message": f"Successfully migrated {count} responses"
     }), 200
 
+@app.route('/api/admin/query-stats', methods=['GET'])
+@login_required
+def query_stats():
+    """Top-N SQL statements by total time (or ?sort=calls|avg_ms|p99_ms|max_ms|rows)"""
+    user = AuthManager.get_current_user()
+    
+    if user.get('role') != 'admin':
+        return jsonify({"error": "Admin access required"}), 403
+    
+    limit = request.args.get('limit', 20, type=int)
+    sort = request.args.get('sort', 'total_ms')
+    
+    return jsonify({
+        "summary": profiler.summary(),
+        "statements": profiler.top(limit, sort)
+    }), 200
+
+@app.route('/api/admin/query-stats', methods=['DELETE'])
+@login_required
+def reset_query_stats():
+    """Clear the statement counters"""
+    user = AuthManager.get_current_user()
+    
+    if user.get('role') != 'admin':
+        return jsonify({"error": "Admin access required"}), 403
+    
+    profiler.reset()
+    return jsonify({"success": True}), 200
+
 # ============================================================================
 # SYSTEM ROUTES
 # ============================================================================
+@app.route('/api/admin/archive', methods=['POST'])
+@login_required
+def run_archive():
+    """Move finished inquiries older than ?days= (default ARCHIVE_AFTER_DAYS) to the archive database"""
+    user = AuthManager.get_current_user()
+    
+    if user.get('role') != 'admin':
+        return jsonify({"error": "Admin access required"}), 403
+    
+    days = request.args.get('days', config.ARCHIVE_AFTER_DAYS, type=int)
+    try:
+        moved = db.archive_old_records(days=days)
+    except Exception as e:
+        logging.error(f"Archive run failed: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    
+    return jsonify({"success": True, "days": days, "moved": moved}), 200
+
+@app.route('/api/admin/backup', methods=['POST'])
+@login_required
+def run_backup():
+    """Online snapshot of the database into BACKUP_DIR (see backup.py)"""
+    user = AuthManager.get_current_user()
+    
+    if user.get('role') != 'admin':
+        return jsonify({"error": "Admin access required"}), 403
+    
+    try:
+        report = create_backup(db.db_path)
+    except Exception as e:
+        logging.error(f"Backup failed: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    
+    return jsonify({"success": True, **report}), 200
+
+@app.route('/api/admin/backups', methods=['GET'])
+@login_required
+def get_backups():
+    """Snapshots in BACKUP_DIR, newest first"""
+    user = AuthManager.get_current_user()
+    
+    if user.get('role') != 'admin':
+        return jsonify({"error": "Admin access required"}), 403
+    
+    return jsonify({"backups": list_backups()}), 200
+
+@app.route('/api/admin/maintenance', methods=['GET'])
+@login_required
+def maintenance_status():
+    """Schedule and last run of the maintenance jobs"""
+    user = AuthManager.get_current_user()
+    
+    if user.get('role') != 'admin':
+        return jsonify({"error": "Admin access required"}), 403
+    
+    return jsonify(scheduler.status()), 200
+
+@app.route('/api/admin/maintenance/<job>', methods=['POST'])
+@login_required
+def run_maintenance_job(job):
+    """Run one maintenance job now"""
+    user = AuthManager.get_current_user()
+    
+    if user.get('role') != 'admin':
+        return jsonify({"error": "Admin access required"}), 403
+    
+    if job not in scheduler.jobs:
+        return jsonify({"error": f"Unknown job. Use one of: {', '.join(scheduler.jobs)}"}), 404
+    
+    outcome = scheduler.run_job(job)
+    code = {'ok': 200, 'skipped': 409}.get(outcome['status'], 500)
+    return jsonify({"success": outcome['status'] == 'ok', "job": job, **outcome}), code
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({"status": "healthy", "timestamp": datetime.utcnow().isoformat()}), 200
 
+@app.route('/api/system/db-stats', methods=['GET'])
+@login_required
+def db_stats():
+    """Connection pool usage, write queue depth and commit batch sizes"""
+    return jsonify(db.stats()), 200
+
 # ============================================================================
 # MAIN
 # ============================================================================
@@ -921,4 +1147,7 @@ if __name__ == '__main__':
     print(f"Content filter: ENABLED (minimum {3} of 4 fields)")
     print(f"Auto-detection: ENABLED")
     print(f"Conversation threads: ENABLED")
+    if config.MAINTENANCE_ON_SERVE and not config.MAINTENANCE_ENABLED:
+        scheduler.start()
+    print(f"Maintenance jobs: {'ENABLED' if config.MAINTENANCE_ON_SERVE or config.MAINTENANCE_ENABLED else 'DISABLED'}")
     app.run(debug=config.DEBUG, host='0.0.0.0', port=5001)
\ No newline at end of file
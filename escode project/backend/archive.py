@@ -0,0 +1,231 @@
+"""
+Hot/cold archival of old inquiries.
+
+Responded or closed inquiries older than ARCHIVE_AFTER_DAYS (and with no
+recent response or conversation activity) are moved, together with their
+responses and conversation messages, into an attached archive database
+(ARCHIVE_DATABASE_PATH) with the same table definitions. The hot database
+keeps only live data, so list queries, joins and sorts stay cache-resident.
+
+Reads only look at the archive when asked (?include_archived=1), through
+union_source(), which unions the hot and archived rows of a table.
+
+Run from backend/:
+    python archive.py              # archive eligible records
+    python archive.py --dry-run    # only count them
+    python archive.py --days 180   # override ARCHIVE_AFTER_DAYS
+"""
+from config import Config
+from datetime import datetime, timedelta
+import logging
+import os
+import re
+from urllib.parse import quote
+
+ARCHIVE_SCHEMA = 'archive'
+
+# Archived tables, parents first
+ARCHIVED_TABLES = ['inquiries', 'responses', 'conversation_messages']
+
+_CREATE_TABLE_RE = re.compile(r'^CREATE TABLE\s+(?:IF NOT EXISTS\s+)?"?(\w+)"?', re.IGNORECASE)
+_CREATE_INDEX_RE = re.compile(r'^CREATE (UNIQUE )?INDEX\s+(?:IF NOT EXISTS\s+)?"?(\w+)"?', re.IGNORECASE)
+
+
+def is_attached(conn):
+    return any(row[1] == ARCHIVE_SCHEMA for row in conn.execute("PRAGMA database_list"))
+
+
+def attach_archive(conn, create=False, path=None):
+    """
+    Attach the archive database to a connection (once per connection).
+
+    Args:
+        conn: Pooled connection, outside a transaction
+        create: Create the archive file and its tables if missing (writer only)
+        path: Archive file (default ARCHIVE_DATABASE_PATH)
+
+    Returns:
+        True if the archive is attached
+    """
+    if is_attached(conn):
+        return True
+
+    path = os.path.abspath(path or Config.ARCHIVE_DATABASE_PATH)
+    if not create and not os.path.exists(path):
+        return False
+    if conn.in_transaction:
+        raise RuntimeError("Cannot attach the archive inside a transaction")
+
+    if create:
+        conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (path,))
+        _ensure_archive_schema(conn)
+        conn.commit()
+    else:
+        # Works for read-only (mode=ro URI) pool connections as well
+        conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (f"file:{quote(path)}?mode=ro",))
+    return True
+
+
+def _columns(conn, schema, table):
+    return [(row[1], row[2]) for row in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def _ensure_archive_schema(conn):
+    """Create archive tables/indexes from the hot definitions and add new columns"""
+    for table in ARCHIVED_TABLES:
+        row = conn.execute("SELECT sql FROM main.sqlite_master WHERE type='table' AND name=?", (table,)).fetchone()
+        if row is None:
+            continue
+        conn.execute(_CREATE_TABLE_RE.sub(f"CREATE TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.{table}", row[0], count=1))
+
+        # Columns added to the hot table by later migrations
+        archived = {name for name, _ in _columns(conn, ARCHIVE_SCHEMA, table)}
+        for name, col_type in _columns(conn, 'main', table):
+            if name not in archived:
+                conn.execute(f"ALTER TABLE {ARCHIVE_SCHEMA}.{table} ADD COLUMN {name} {col_type}")
+
+        # Indexes are copied without UNIQUE: a hot unique key (content_hash)
+        # stops applying once a row is archived, so a later re-synced
+        # duplicate must still fit next to it
+        for name, sql in conn.execute(
+            "SELECT name, sql FROM main.sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL", (table,)
+        ).fetchall():
+            existing = conn.execute(
+                f"SELECT sql FROM {ARCHIVE_SCHEMA}.sqlite_master WHERE type='index' AND name=?", (name,)
+            ).fetchone()
+            if existing and _CREATE_INDEX_RE.match(existing[0]).group(1):
+                conn.execute(f"DROP INDEX {ARCHIVE_SCHEMA}.{name}")
+            conn.execute(_CREATE_INDEX_RE.sub(
+                lambda m: f"CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.{m.group(2)}", sql, count=1
+            ))
+
+
+def union_source(conn, table):
+    """
+    FROM source covering hot and archived rows of a table
+    (plain table name when the archive is not attached).
+    """
+    if table not in ARCHIVED_TABLES or not is_attached(conn):
+        return table
+    cols = ', '.join(name for name, _ in _columns(conn, 'main', table))
+    return f"(SELECT {cols} FROM main.{table} UNION ALL SELECT {cols} FROM {ARCHIVE_SCHEMA}.{table})"
+
+
+def archived_count(conn, table, where_clause=None, params=()):
+    """Rows of a table in the archive (0 when not attached)"""
+    if not is_attached(conn):
+        return 0
+    query = f"SELECT COUNT(*) FROM {ARCHIVE_SCHEMA}.{table}"
+    if where_clause:
+        query += f" WHERE {where_clause}"
+    return conn.execute(query, params).fetchone()[0]
+
+
+def _cutoff(days):
+    return (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _eligible_query(statuses):
+    placeholders = ','.join('?' * len(statuses))
+    return f"""
+        SELECT i.id FROM main.inquiries i
+        WHERE i.status IN ({placeholders}) AND i.received_at < ?
+          AND NOT EXISTS (
+              SELECT 1 FROM main.responses r
+              WHERE r.inquiry_id = i.id AND r.sent_at >= ?
+          )
+          AND NOT EXISTS (
+              SELECT 1 FROM main.responses r
+              JOIN main.conversation_messages m ON m.response_id = r.id
+              WHERE r.inquiry_id = i.id AND m.sent_at >= ?
+          )
+        ORDER BY i.id
+        LIMIT ?
+    """
+
+
+def count_eligible(conn, days=None, statuses=None):
+    """Inquiries that archive_batch would move"""
+    days = Config.ARCHIVE_AFTER_DAYS if days is None else days
+    statuses = statuses or Config.ARCHIVE_STATUSES
+    cutoff = _cutoff(days)
+    query = f"SELECT COUNT(*) FROM ({_eligible_query(statuses)})"
+    return conn.execute(query, (*statuses, cutoff, cutoff, cutoff, -1)).fetchone()[0]
+
+
+def archive_batch(conn, days=None, statuses=None, limit=None):
+    """
+    Move one batch of eligible inquiries with their responses and
+    conversation messages to the archive. The caller commits.
+
+    Copies only conflict on the primary key (ON CONFLICT(id) DO UPDATE),
+    so a batch interrupted between the two database files can simply be
+    run again, and no other archived row is ever replaced.
+
+    Returns:
+        Dict of table -> rows moved (empty when nothing is eligible)
+    """
+    days = Config.ARCHIVE_AFTER_DAYS if days is None else days
+    statuses = statuses or Config.ARCHIVE_STATUSES
+    limit = limit or Config.ARCHIVE_BATCH_SIZE
+    cutoff = _cutoff(days)
+
+    ids = [row[0] for row in conn.execute(_eligible_query(statuses), (*statuses, cutoff, cutoff, cutoff, limit))]
+    if not ids:
+        return {}
+
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS archive_inquiry_ids (id INTEGER PRIMARY KEY)")
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS archive_response_ids (id INTEGER PRIMARY KEY)")
+    conn.execute("DELETE FROM temp.archive_inquiry_ids")
+    conn.execute("DELETE FROM temp.archive_response_ids")
+    conn.executemany("INSERT INTO temp.archive_inquiry_ids (id) VALUES (?)", [(i,) for i in ids])
+    conn.execute("""
+        INSERT INTO temp.archive_response_ids (id)
+        SELECT id FROM main.responses WHERE inquiry_id IN (SELECT id FROM temp.archive_inquiry_ids)
+    """)
+
+    selections = {
+        'inquiries': "id IN (SELECT id FROM temp.archive_inquiry_ids)",
+        'responses': "id IN (SELECT id FROM temp.archive_response_ids)",
+        'conversation_messages': "response_id IN (SELECT id FROM temp.archive_response_ids)",
+    }
+
+    moved = {}
+    for table in ARCHIVED_TABLES:
+        names = [name for name, _ in _columns(conn, 'main', table)]
+        cols = ', '.join(names)
+        updates = ', '.join(f"{name} = excluded.{name}" for name in names if name != 'id')
+        conn.execute(f"""
+            INSERT INTO {ARCHIVE_SCHEMA}.{table} ({cols})
+            SELECT {cols} FROM main.{table} WHERE {selections[table]}
+            ON CONFLICT(id) DO UPDATE SET {updates}
+        """)
+
+    # Children first; delete triggers keep FTS, counters and versions current
+    for table in reversed(ARCHIVED_TABLES):
+        moved[table] = conn.execute(f"DELETE FROM main.{table} WHERE {selections[table]}").rowcount
+
+    return moved
+
+
+if __name__ == '__main__':
+    import sys
+    from database import db
+
+    days = Config.ARCHIVE_AFTER_DAYS
+    if '--days' in sys.argv:
+        days = int(sys.argv[sys.argv.index('--days') + 1])
+
+    print("=" * 60)
+    print(f"ARCHIVE INQUIRIES OLDER THAN {days} DAYS -> {Config.ARCHIVE_DATABASE_PATH}")
+    print("=" * 60)
+
+    if '--dry-run' in sys.argv:
+        with db.get_connection(readonly=True) as conn:
+            print(f"  {count_eligible(conn, days)} inquiries eligible")
+        sys.exit(0)
+
+    totals = db.archive_old_records(days=days)
+    for table in ARCHIVED_TABLES:
+        print(f"  ✓ {table:25} {totals.get(table, 0)} moved")
+    logging.info(f"Archive run finished: {totals}")
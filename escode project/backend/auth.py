@@ -1,5 +1,5 @@
 from functools import wraps
-from flask import session, jsonify
+from flask import g, session, jsonify
 from models import User
 from config import Config
 import secrets
@@ -121,6 +121,7 @@ class AuthManager:
 def login_required(f):
     """
     Decorator to protect routes that require authentication.
+    The resolved user is kept in g.current_user for the route.
     
     Usage:
         @app.route('/api/protected')
@@ -130,11 +131,13 @@ def login_required(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if not AuthManager.is_authenticated():
+        user = AuthManager.get_current_user()
+        if user is None:
             return jsonify({
                 'error': 'Authentication required',
                 'message': 'Please login to access this resource'
             }), 401
+        g.current_user = user
         return f(*args, **kwargs)
     return decorated_function
 
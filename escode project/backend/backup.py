@@ -0,0 +1,267 @@
+"""
+Online backup and restore (SQLite backup API).
+
+The backup copies BACKUP_PAGES_PER_STEP pages per step and sleeps
+BACKUP_STEP_SLEEP seconds between steps. It reads from its own connection
+holding one read transaction for the whole copy. With WAL, writers keep
+committing, and the copy is still a consistent snapshot that never
+restarts. Snapshots are written to BACKUP_DIR (gzip-compressed unless
+BACKUP_COMPRESS is off) and only the newest BACKUP_KEEP are kept.
+
+Run from backend/:
+    python backup.py                              # take a snapshot
+    python backup.py --list                       # list snapshots
+    python backup.py --restore <snapshot>         # restore into DATABASE_PATH
+    python backup.py --restore <snapshot> --target other.db
+    python backup.py --restore <snapshot> --yes   # no confirmation prompt
+"""
+from config import Config
+from datetime import datetime
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from urllib.parse import quote
+
+SNAPSHOT_PREFIX = 'quotations-'
+COPY_CHUNK = 1024 * 1024
+
+
+def _snapshot_files(directory):
+    """Snapshots in a directory, newest first"""
+    if not os.path.isdir(directory):
+        return []
+    names = [n for n in os.listdir(directory)
+             if n.startswith(SNAPSHOT_PREFIX) and (n.endswith('.db') or n.endswith('.db.gz'))]
+    return sorted((os.path.join(directory, n) for n in names), reverse=True)
+
+
+def list_backups(directory=None):
+    """
+    Returns:
+        List of {'path', 'bytes', 'created'} dicts, newest first
+    """
+    return [
+        {
+            'path': path,
+            'bytes': os.path.getsize(path),
+            'created': datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec='seconds'),
+        }
+        for path in _snapshot_files(directory or Config.BACKUP_DIR)
+    ]
+
+
+def rotate_backups(directory=None, keep=None):
+    """Delete all but the newest keep snapshots; returns the deleted paths"""
+    keep = Config.BACKUP_KEEP if keep is None else keep
+    stale = _snapshot_files(directory or Config.BACKUP_DIR)[keep:] if keep > 0 else []
+    for path in stale:
+        os.remove(path)
+    return stale
+
+
+def _gzip_file(source, target):
+    with open(source, 'rb') as src, gzip.open(target, 'wb', compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, COPY_CHUNK)
+
+
+def create_backup(source=None, directory=None, pages=None, sleep=None, compress=None, keep=None):
+    """
+    Take an online snapshot of the database.
+
+    Args:
+        source: Database file (default DATABASE_PATH)
+        directory: Snapshot directory (default BACKUP_DIR)
+        pages: Pages copied per step
+        sleep: Seconds to sleep between steps
+        compress: gzip the snapshot
+        keep: Snapshots kept after rotation
+
+    Returns:
+        Dict with path, pages, bytes, seconds, mb_per_s, steps,
+        stored_bytes and rotated (deleted snapshots)
+    """
+    source = os.path.abspath(source or Config.DATABASE_PATH)
+    directory = directory or Config.BACKUP_DIR
+    pages = pages or Config.BACKUP_PAGES_PER_STEP
+    sleep = Config.BACKUP_STEP_SLEEP if sleep is None else sleep
+    compress = Config.BACKUP_COMPRESS if compress is None else compress
+    os.makedirs(directory, exist_ok=True)
+
+    name = f"{SNAPSHOT_PREFIX}{datetime.now().strftime('%Y%m%d-%H%M%S')}.db"
+    target = os.path.join(directory, name + ('.gz' if compress else ''))
+    fd, copy_path = tempfile.mkstemp(prefix='.backup-', suffix='.db', dir=directory)
+    os.close(fd)
+
+    steps = 0
+
+    def progress(status, remaining, total):
+        nonlocal steps
+        steps += 1
+        # sqlite3's own sleep argument only applies after BUSY/LOCKED steps
+        if remaining and sleep > 0:
+            time.sleep(sleep)
+
+    started = time.perf_counter()
+    src = sqlite3.connect(f"file:{quote(source)}?mode=ro", uri=True)
+    dst = sqlite3.connect(copy_path)
+    try:
+        # One read transaction across every step: a fixed snapshot that
+        # other connections' commits cannot restart
+        src.execute("BEGIN")
+        src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        src.backup(dst, pages=pages, progress=progress)
+        src.rollback()
+
+        # Standalone file: no -wal sidecar
+        dst.execute("PRAGMA journal_mode=DELETE")
+        page_count = dst.execute("PRAGMA page_count").fetchone()[0]
+        check = dst.execute("PRAGMA quick_check").fetchone()[0]
+    except Exception:
+        dst.close()
+        os.remove(copy_path)
+        raise
+    finally:
+        src.close()
+    dst.close()
+    copied = time.perf_counter() - started
+
+    if check != 'ok':
+        os.remove(copy_path)
+        raise RuntimeError(f"Backup failed quick_check: {check}")
+
+    size = os.path.getsize(copy_path)
+    if compress:
+        _gzip_file(copy_path, copy_path + '.gz')
+        os.remove(copy_path)
+        os.replace(copy_path + '.gz', target)
+    else:
+        os.replace(copy_path, target)
+
+    elapsed = time.perf_counter() - started
+    report = {
+        'path': target,
+        'pages': page_count,
+        'bytes': size,
+        'stored_bytes': os.path.getsize(target),
+        'steps': steps,
+        'copy_seconds': round(copied, 3),
+        'seconds': round(elapsed, 3),
+        'mb_per_s': round(size / 1048576 / copied, 1) if copied else None,
+        'rotated': rotate_backups(directory, keep),
+    }
+    logging.info(
+        f"Backup {target}: {size / 1048576:.1f} MB in {elapsed:.1f}s "
+        f"({report['mb_per_s']} MB/s copy, {steps} steps, {report['stored_bytes'] / 1048576:.1f} MB stored)"
+    )
+    return report
+
+
+def _bump_versions(conn, previous):
+    """
+    Move every table_versions counter past both the restored and the
+    replaced value, so ETags and cached results from before the restore
+    never match again.
+    """
+    try:
+        restored = dict(conn.execute("SELECT table_name, version FROM table_versions").fetchall())
+    except sqlite3.OperationalError:
+        return
+    for table, version in restored.items():
+        conn.execute(
+            "UPDATE table_versions SET version = ? WHERE table_name = ?",
+            (max(version, previous.get(table, 0)) + 1, table)
+        )
+    conn.commit()
+
+
+def restore_backup(snapshot, target=None, pages=None):
+    """
+    Replace a database with a snapshot (compressed or not), through the
+    backup API so open connections to the target see a consistent switch.
+
+    Args:
+        snapshot: Snapshot file (.db or .db.gz)
+        target: Database to overwrite (default DATABASE_PATH)
+        pages: Pages copied per step
+
+    Returns:
+        Dict with target, pages and seconds
+    """
+    target = os.path.abspath(target or Config.DATABASE_PATH)
+    pages = pages or Config.BACKUP_PAGES_PER_STEP
+    started = time.perf_counter()
+
+    source_path = snapshot
+    if snapshot.endswith('.gz'):
+        fd, source_path = tempfile.mkstemp(prefix='.restore-', suffix='.db', dir=os.path.dirname(target) or '.')
+        os.close(fd)
+        with gzip.open(snapshot, 'rb') as src, open(source_path, 'wb') as dst:
+            shutil.copyfileobj(src, dst, COPY_CHUNK)
+
+    try:
+        src = sqlite3.connect(f"file:{quote(os.path.abspath(source_path))}?mode=ro", uri=True)
+        try:
+            check = src.execute("PRAGMA quick_check").fetchone()[0]
+            if check != 'ok':
+                raise RuntimeError(f"Snapshot failed quick_check: {check}")
+
+            dst = sqlite3.connect(target, timeout=Config.WRITE_TIMEOUT)
+            try:
+                try:
+                    previous = dict(dst.execute("SELECT table_name, version FROM table_versions").fetchall())
+                except sqlite3.OperationalError:
+                    previous = {}
+                src.backup(dst, pages=pages)
+                dst.execute("PRAGMA journal_mode=WAL")
+                _bump_versions(dst, previous)
+                page_count = dst.execute("PRAGMA page_count").fetchone()[0]
+            finally:
+                dst.close()
+        finally:
+            src.close()
+    finally:
+        if source_path != snapshot:
+            os.remove(source_path)
+
+    elapsed = time.perf_counter() - started
+    logging.info(f"Restored {snapshot} into {target} in {elapsed:.1f}s")
+    return {'target': target, 'pages': page_count, 'seconds': round(elapsed, 3)}
+
+
+if __name__ == '__main__':
+    import sys
+
+    print("=" * 60)
+    print(f"DATABASE BACKUP ({Config.DATABASE_PATH} -> {Config.BACKUP_DIR})")
+    print("=" * 60)
+
+    if '--list' in sys.argv:
+        for b in list_backups():
+            print(f"  {b['created']}  {b['bytes'] / 1048576:8.1f} MB  {b['path']}")
+        sys.exit(0)
+
+    if '--restore' in sys.argv:
+        snapshot = sys.argv[sys.argv.index('--restore') + 1]
+        target = sys.argv[sys.argv.index('--target') + 1] if '--target' in sys.argv else None
+        if not os.path.exists(snapshot):
+            print(f"  ✗ {snapshot} not found")
+            sys.exit(1)
+        if '--yes' not in sys.argv:
+            response = input(f"Overwrite {target or Config.DATABASE_PATH} with {snapshot}? (yes/no): ")
+            if response.lower() != 'yes':
+                print("  Cancelled")
+                sys.exit(1)
+        result = restore_backup(snapshot, target)
+        print(f"  ✓ Restored {result['pages']} pages into {result['target']} in {result['seconds']}s")
+        sys.exit(0)
+
+    report = create_backup()
+    print(f"  ✓ {report['path']}")
+    print(f"    {report['bytes'] / 1048576:.1f} MB in {report['copy_seconds']}s "
+          f"({report['mb_per_s']} MB/s, {report['steps']} steps), stored {report['stored_bytes'] / 1048576:.1f} MB")
+    for path in report['rotated']:
+        print(f"  - Rotated out {path}")
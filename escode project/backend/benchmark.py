@@ -0,0 +1,269 @@
+"""
+Route and model benchmark suite.
+
+Calls the Flask routes through the test client (full request path: auth,
+lane selection, query, JSON encoding) and the model methods directly,
+then writes throughput and latency percentiles per case to a JSON file
+so results can be compared between commits.
+
+Fill a scratch database first with generate_data.py.
+
+Usage (from backend/):
+    python benchmark.py --db database/bench.db
+    python benchmark.py --db database/bench.db --iterations 500 --output results/bench_abc123.json
+    python benchmark.py --db database/bench.db --compare results/bench_main.json   # exit 1 on regression
+    python benchmark.py --db database/bench.db --only inquiries
+    python benchmark.py --db database/bench.db --warm-cache   # time with the result cache on
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(round(pct / 100.0 * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+def run_case(fn, iterations, warmup):
+    """
+    Time one case.
+
+    Returns:
+        Dict with iterations, errors, throughput and latency percentiles (ms)
+    """
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        ok = fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+        if ok is False:
+            errors += 1
+    elapsed = time.perf_counter() - started
+
+    samples.sort()
+    return {
+        'iterations': iterations,
+        'errors': errors,
+        'total_s': round(elapsed, 4),
+        'ops_per_s': round(iterations / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(sum(samples) / len(samples), 3),
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p90_ms': round(percentile(samples, 90), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+        'max_ms': round(samples[-1], 3)
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_cases():
+    """(name, callable) pairs; route callables return False on a non-200 response"""
+    from app import app
+    from contact_extract import extract_contact
+    from database import db
+    from generate_data import make_sample_emails
+    from models import Client, Inquiry, Publisher, Response
+
+    with db.get_connection() as conn:
+        user = conn.execute(
+            "SELECT id, username FROM users WHERE role = 'admin' AND is_active = 1 ORDER BY id LIMIT 1"
+        ).fetchone()
+        if user is None:
+            print("ERROR: no active admin user in the database (run generate_data.py first)")
+            sys.exit(1)
+        sample_inquiry = conn.execute("SELECT id FROM inquiries ORDER BY id DESC LIMIT 1").fetchone()
+        sample_response = conn.execute("""
+            SELECT response_id FROM conversation_messages
+            GROUP BY response_id ORDER BY COUNT(*) DESC LIMIT 1
+        """).fetchone()
+        sample_emails = [r[0] for r in conn.execute("SELECT email FROM publishers ORDER BY id LIMIT 200")]
+        sample_client = conn.execute("SELECT full_name FROM clients ORDER BY id LIMIT 1").fetchone()
+
+    inquiry_id = sample_inquiry[0] if sample_inquiry else 1
+    response_id = sample_response[0] if sample_response else 1
+    client_term = sample_client[0].split()[0] if sample_client else 'john'
+
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s['user_id'] = user['id']
+        s['username'] = user['username']
+        s['login_time'] = datetime.now().isoformat()
+
+    def get(url):
+        return lambda: client.get(url).status_code == 200
+
+    def next_cursor(url):
+        body = client.get(url).get_json() or {}
+        return body.get('next_cursor') or ''
+
+    def deep_page(url, per_page):
+        body = client.get(url).get_json() or {}
+        return max(1, (body.get('pages') or 1) // 2), per_page
+
+    inquiry_cursor = next_cursor('/api/inquiries?after=&per_page=50')
+    publisher_cursor = next_cursor('/api/publishers?after=&per_page=100')
+    inquiry_mid, _ = deep_page('/api/inquiries?per_page=50', 50)
+    publisher_mid, _ = deep_page('/api/publishers?per_page=100', 100)
+    sample_mail = itertools.cycle(make_sample_emails(random.Random(42), 500))
+
+    return [
+        # Routes
+        ('route GET /api/auth/check', get('/api/auth/check')),
+        ('route GET /api/clients', get('/api/clients')),
+        ('route GET /api/clients?search', get(f'/api/clients?search={client_term}')),
+        ('route GET /api/inquiries', get('/api/inquiries')),
+        ('route GET /api/inquiries?status', get('/api/inquiries?status=pending')),
+        ('route GET /api/inquiries deep offset', get(f'/api/inquiries?page={inquiry_mid}')),
+        ('route GET /api/inquiries?after', get(f'/api/inquiries?after={inquiry_cursor}')),
+        ('route GET /api/inquiries/<id>', get(f'/api/inquiries/{inquiry_id}')),
+        ('route GET /api/inquiries/stats', get('/api/inquiries/stats')),
+        ('route GET /api/responses', get('/api/responses')),
+        ('route GET /api/responses/<id>', get(f'/api/responses/{response_id}')),
+        ('route GET /api/publishers', get('/api/publishers')),
+        ('route GET /api/publishers?search', get('/api/publishers?search=tech')),
+        ('route GET /api/publishers deep offset', get(f'/api/publishers?page={publisher_mid}')),
+        ('route GET /api/publishers?after', get(f'/api/publishers?after={publisher_cursor}')),
+        ('route GET /api/publishers/count', get('/api/publishers/count')),
+        ('route GET /api/dashboard/bootstrap', get('/api/dashboard/bootstrap?status=')),
+        # Models
+        ('model Client.get_all', lambda: Client.get_all()),
+        ('model Client.search(limit=50)', lambda: Client.search(client_term, limit=50)),
+        ('model Inquiry.get_all', lambda: Inquiry.get_all()),
+        ('model Inquiry.get_all(status)', lambda: Inquiry.get_all(status='pending')),
+        ('model Inquiry.get_with_client_info', lambda: Inquiry.get_with_client_info(inquiry_id)),
+        ('model Inquiry.get_statistics', lambda: Inquiry.get_statistics()),
+        ('model Response.get_by_inquiry', lambda: Response.get_by_inquiry(inquiry_id)),
+        ('model Publisher.get_all', lambda: Publisher.get_all()),
+        ('model Publisher.search(limit=50)', lambda: Publisher.search('tech', limit=50)),
+        ('model Publisher.get_by_emails(200)', lambda: Publisher.get_by_emails(sample_emails)),
+        ('model Publisher.get_count', lambda: Publisher.get_count()),
+        # Email ingestion
+        ('extract contact (sample emails)', lambda: extract_contact(*reversed(next(sample_mail)))),
+    ]
+
+
+def dataset_sizes():
+    from database import db
+    sizes = {}
+    with db.get_connection() as conn:
+        for table in ('users', 'clients', 'publishers', 'inquiries', 'responses', 'conversation_messages'):
+            sizes[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    return sizes
+
+
+def compare(results, baseline_path, threshold):
+    """
+    Print p50/ops deltas against a previous run.
+
+    Returns:
+        Number of cases whose p50 regressed by more than threshold percent
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    print(f"\nCompared with {baseline_path} ({baseline.get('revision') or 'unknown revision'})")
+    regressions = 0
+    for name, current in results['cases'].items():
+        before = baseline.get('cases', {}).get(name)
+        if not before or not before['p50_ms']:
+            print(f"  - {name:45} (new)")
+            continue
+        delta = (current['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100.0
+        regressed = delta > threshold
+        regressions += regressed
+        mark = '✗' if regressed else '✓'
+        print(f"  {mark} {name:45} p50 {before['p50_ms']:9.3f} -> {current['p50_ms']:9.3f} ms ({delta:+6.1f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark routes and model methods")
+    parser.add_argument('--db', required=True, help="Database to benchmark (use a generated scratch DB)")
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--only', help="Run only cases whose name contains this text")
+    parser.add_argument('--output', default=None, help="JSON output path (default bench_<revision>.json)")
+    parser.add_argument('--compare', help="Baseline JSON from an earlier run")
+    parser.add_argument('--threshold', type=float, default=20.0, help="Allowed p50 regression in percent")
+    parser.add_argument('--warm-cache', action='store_true',
+                        help="Keep the result cache on (default off, so cases time the real queries)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"ERROR: {args.db} not found (run generate_data.py first)")
+        sys.exit(1)
+
+    # Point the app's global Database at the benchmark file before importing it
+    os.environ['DATABASE_PATH'] = args.db
+    os.environ.setdefault('MAINTENANCE_ENABLED', 'False')  # No background jobs while timing
+    if not args.warm_cache:
+        os.environ['RESULT_CACHE_SIZE'] = '0'  # Repeated iterations would otherwise time cache hits
+
+    revision = git_revision()
+    results = {
+        'revision': revision,
+        'timestamp': datetime.now().isoformat(),
+        'database': os.path.abspath(args.db),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'iterations': args.iterations,
+        'warmup': args.warmup,
+        'result_cache': args.warm_cache,
+        'dataset': dataset_sizes(),
+        'cases': {}
+    }
+
+    print("=" * 60)
+    print(f"BENCHMARK ({revision or 'no git revision'})")
+    print("=" * 60)
+    print("  " + ", ".join(f"{t}={n:,}" for t, n in results['dataset'].items()))
+    print()
+
+    for name, fn in build_cases():
+        if args.only and args.only not in name:
+            continue
+        stats = run_case(fn, args.iterations, args.warmup)
+        results['cases'][name] = stats
+        mark = '✓' if not stats['errors'] else '✗'
+        print(f"  {mark} {name:45} {stats['ops_per_s']:10.1f} ops/s  "
+              f"p50 {stats['p50_ms']:8.3f}  p99 {stats['p99_ms']:8.3f} ms")
+
+    output = args.output or f"bench_{revision or 'local'}.json"
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"\n{regressions} case(s) regressed by more than {args.threshold:.0f}%")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
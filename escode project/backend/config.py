@@ -9,6 +9,44 @@ class Config:
     # Database
     # ==============================
     DATABASE_PATH = os.getenv('DATABASE_PATH', 'database/quotations.db')
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 8))  # Max open read-only connections
+    DB_WRITE_POOL_SIZE = int(os.getenv('DB_WRITE_POOL_SIZE', 1))  # Writer connections (SQLite allows one writer)
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))  # Seconds to wait for a free connection
+    DB_POOL_MAX_IDLE = float(os.getenv('DB_POOL_MAX_IDLE', 300))  # Close connections idle longer than this
+    WRITE_BATCH_WINDOW_MS = float(os.getenv('WRITE_BATCH_WINDOW_MS', 5))  # Group-commit latency window
+    WRITE_BATCH_MAX = int(os.getenv('WRITE_BATCH_MAX', 100))  # Max writes per commit
+    WRITE_TIMEOUT = float(os.getenv('WRITE_TIMEOUT', 30))  # Seconds a caller waits for its write
+    QUERY_PROFILING = os.getenv('QUERY_PROFILING', 'True').lower() == 'true'  # Per-statement timing
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 100))  # Log statements slower than this
+    SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', 'slow_queries.log')
+    RESULT_CACHE_SIZE = int(os.getenv('RESULT_CACHE_SIZE', 512))  # Cached query results (0 disables the cache)
+    RESULT_CACHE_TTL = float(os.getenv('RESULT_CACHE_TTL', 30))  # Seconds before a cached result expires
+    RESULT_CACHE_MAX_ROWS = int(os.getenv('RESULT_CACHE_MAX_ROWS', 1000))  # Larger results are not cached
+    ARCHIVE_DATABASE_PATH = os.getenv('ARCHIVE_DATABASE_PATH', os.path.join(os.path.dirname(DATABASE_PATH), 'archive.db'))
+    ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 365))  # Archive finished inquiries older than this
+    ARCHIVE_STATUSES = os.getenv('ARCHIVE_STATUSES', 'responded,closed').split(',')
+    ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', 1000))  # Inquiries moved per transaction
+    MESSAGE_COMPRESS_MIN_BYTES = int(os.getenv('MESSAGE_COMPRESS_MIN_BYTES', 1024))  # zlib-compress larger bodies (0 disables)
+    MESSAGE_COMPRESS_LEVEL = int(os.getenv('MESSAGE_COMPRESS_LEVEL', 6))
+    MESSAGE_EXCERPT_CHARS = int(os.getenv('MESSAGE_EXCERPT_CHARS', 200))  # inquiries.message_excerpt length for list views
+    MAINTENANCE_ENABLED = os.getenv('MAINTENANCE_ENABLED', 'False').lower() == 'true'  # Run schedulet.py jobs wherever app.py is imported (WSGI workers, scripts)
+    MAINTENANCE_ON_SERVE = os.getenv('MAINTENANCE_ON_SERVE', 'True').lower() == 'true'  # Run them in the python app.py server
+    MAINTENANCE_TICK = float(os.getenv('MAINTENANCE_TICK', 30))  # Seconds between due-job checks
+    MAINTENANCE_JITTER = float(os.getenv('MAINTENANCE_JITTER', 60))  # Random delay added to every run
+    MAINTENANCE_LEASE = float(os.getenv('MAINTENANCE_LEASE', 3600))  # A crashed run blocks its job at most this long
+    MAINTENANCE_CHECKPOINT_EVERY = os.getenv('MAINTENANCE_CHECKPOINT_EVERY', '5m')  # Intervals: 30s, 15m, 6h, 1d, @daily, off
+    MAINTENANCE_OPTIMIZE_EVERY = os.getenv('MAINTENANCE_OPTIMIZE_EVERY', '@hourly')
+    MAINTENANCE_ANALYZE_EVERY = os.getenv('MAINTENANCE_ANALYZE_EVERY', '@daily')
+    MAINTENANCE_VACUUM_EVERY = os.getenv('MAINTENANCE_VACUUM_EVERY', '@daily')
+    MAINTENANCE_ARCHIVE_EVERY = os.getenv('MAINTENANCE_ARCHIVE_EVERY', 'off')
+    MAINTENANCE_BACKUP_EVERY = os.getenv('MAINTENANCE_BACKUP_EVERY', 'off')
+    MAINTENANCE_ANALYZE_LIMIT = int(os.getenv('MAINTENANCE_ANALYZE_LIMIT', 1000))  # Rows sampled per index (0 = full)
+    MAINTENANCE_VACUUM_PAGES = int(os.getenv('MAINTENANCE_VACUUM_PAGES', 10000))  # Free pages released per run
+    BACKUP_DIR = os.getenv('BACKUP_DIR', os.path.join(os.path.dirname(DATABASE_PATH), 'backups'))
+    BACKUP_PAGES_PER_STEP = int(os.getenv('BACKUP_PAGES_PER_STEP', 1024))  # Pages copied per backup step
+    BACKUP_STEP_SLEEP = float(os.getenv('BACKUP_STEP_SLEEP', 0.005))  # Seconds between steps (throttles I/O)
+    BACKUP_COMPRESS = os.getenv('BACKUP_COMPRESS', 'True').lower() == 'true'  # gzip snapshots
+    BACKUP_KEEP = int(os.getenv('BACKUP_KEEP', 7))  # Snapshots kept by rotation
     
     # ==============================
     # Security
@@ -24,6 +62,18 @@ class Config:
     EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD', '')
     IMAP_SERVER = os.getenv('IMAP_SERVER', 'imap.gmail.com')
     IMAP_PORT = int(os.getenv('IMAP_PORT', 993))
+    IMAP_MAILBOX = os.getenv('IMAP_MAILBOX', 'INBOX')
+    IMAP_RESYNC_DAYS = int(os.getenv('IMAP_RESYNC_DAYS', 30))  # Days fetched on first sync or UIDVALIDITY change (0 = all)
+    IMAP_FETCH_BATCH = int(os.getenv('IMAP_FETCH_BATCH', 100))  # UIDs per FETCH command
+    IMAP_MAX_BODY_BYTES = int(os.getenv('IMAP_MAX_BODY_BYTES', 262144))  # Bytes of the text part fetched per email (0 = no limit)
+    EMAIL_MONITORING_ENABLED = os.getenv('EMAIL_MONITORING_ENABLED', 'True').lower() == 'true'  # IMAP watcher syncs new mail as it arrives
+    IMAP_IDLE_TIMEOUT = int(os.getenv('IMAP_IDLE_TIMEOUT', 540))  # Seconds before IDLE is re-issued (servers drop it after 10-30 min)
+    IMAP_POLL_INTERVAL = int(os.getenv('IMAP_POLL_INTERVAL', 60))  # UID SEARCH poll interval for servers without IDLE
+    IMAP_RECONNECT_MAX_DELAY = int(os.getenv('IMAP_RECONNECT_MAX_DELAY', 300))  # Backoff cap between reconnects
+    INGEST_QUEUE_SIZE = int(os.getenv('INGEST_QUEUE_SIZE', 100))  # Emails buffered between ingestion stages
+    INGEST_MAX_EMAILS = int(os.getenv('INGEST_MAX_EMAILS', 500))  # Emails per sync job (a follow-up job takes the rest)
+    INGEST_JOBS_KEPT = int(os.getenv('INGEST_JOBS_KEPT', 50))  # Finished sync jobs kept for the status endpoint
+    EXTRACT_WINDOW_CHARS = int(os.getenv('EXTRACT_WINDOW_CHARS', 4000))  # Head and tail of a long body scanned for contact fields (0 = whole body)
     SMTP_SERVER = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
     SMTP_PORT = int(os.getenv('SMTP_PORT', 587))
     
@@ -61,7 +111,10 @@ class Config:
     # Batch processing
     # ==============================
     BATCH_SIZE = 100  # For processing large publisher database
-    MAX_EMAIL_FETCH = 50  # Max emails to fetch per sync
+    MAX_EMAIL_FETCH = int(os.getenv('MAX_EMAIL_FETCH', 50))  # Max emails to fetch per sync (the rest wait for the next one)
+    IMPORT_COMMIT_EVERY = int(os.getenv('IMPORT_COMMIT_EVERY', 50000))  # Rows per transaction in publisher imports
+    EXPORT_FETCH_SIZE = int(os.getenv('EXPORT_FETCH_SIZE', 1000))  # Rows per fetch/chunk in streaming exports
+    IMPORT_MAX_REJECTS = int(os.getenv('IMPORT_MAX_REJECTS', 1000))  # Offending rows kept in an import report
     
     @staticmethod
     def validate():
@@ -0,0 +1,218 @@
+"""
+Trigger-maintained row counters.
+
+table_counters holds the row count of each counted table and
+inquiry_status_counts the number of inquiries per status. Both are kept
+current by INSERT/UPDATE/DELETE triggers, so list totals and status stats
+are single-row lookups instead of COUNT(*) index walks.
+
+Run from backend/:
+    python counters.py            # verify counters against COUNT(*)
+    python counters.py --repair   # recompute counters from scratch
+"""
+import logging
+import sqlite3
+
+COUNTED_TABLES = ['clients', 'inquiries', 'responses', 'publishers']
+
+# NULL statuses are counted under this key
+NULL_STATUS = 'unknown'
+
+
+def _existing_tables(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+
+
+def _create_table_triggers(conn, table):
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS counters_{table}_ai AFTER INSERT ON {table} BEGIN
+            UPDATE table_counters SET row_count = row_count + 1 WHERE table_name = '{table}';
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS counters_{table}_ad AFTER DELETE ON {table} BEGIN
+            UPDATE table_counters SET row_count = row_count - 1 WHERE table_name = '{table}';
+        END
+    """)
+
+
+def _create_status_triggers(conn):
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS counters_inquiry_status_ai AFTER INSERT ON inquiries BEGIN
+            INSERT INTO inquiry_status_counts (status, count)
+            VALUES (IFNULL(new.status, '{NULL_STATUS}'), 1)
+            ON CONFLICT(status) DO UPDATE SET count = count + 1;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS counters_inquiry_status_ad AFTER DELETE ON inquiries BEGIN
+            UPDATE inquiry_status_counts SET count = count - 1
+            WHERE status = IFNULL(old.status, '{NULL_STATUS}');
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS counters_inquiry_status_au AFTER UPDATE OF status ON inquiries
+        WHEN old.status IS NOT new.status BEGIN
+            UPDATE inquiry_status_counts SET count = count - 1
+            WHERE status = IFNULL(old.status, '{NULL_STATUS}');
+            INSERT INTO inquiry_status_counts (status, count)
+            VALUES (IFNULL(new.status, '{NULL_STATUS}'), 1)
+            ON CONFLICT(status) DO UPDATE SET count = count + 1;
+        END
+    """)
+
+
+def ensure_counters(conn):
+    """
+    Create counter tables and triggers, seeding any missing counter
+    (migration 11 and the CLI).
+
+    Returns:
+        True if counters are available
+    """
+    tables = _existing_tables(conn)
+    counted = [t for t in COUNTED_TABLES if t in tables]
+    if not counted:
+        return False
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS table_counters (
+            table_name TEXT PRIMARY KEY,
+            row_count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS inquiry_status_counts (
+            status TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+
+    # Seed before creating triggers: the INSERT opens the transaction, so
+    # the seed and the triggers become visible to other writers together
+    for table in counted:
+        seeded = conn.execute(
+            f"INSERT OR IGNORE INTO table_counters (table_name, row_count) SELECT '{table}', COUNT(*) FROM {table}"
+        ).rowcount
+        if seeded and table == 'inquiries':
+            _recount_statuses(conn)
+        _create_table_triggers(conn, table)
+
+    if 'inquiries' in counted:
+        _create_status_triggers(conn)
+
+    return True
+
+
+def _recount_statuses(conn):
+    conn.execute("DELETE FROM inquiry_status_counts")
+    conn.execute(f"""
+        INSERT INTO inquiry_status_counts (status, count)
+        SELECT IFNULL(status, '{NULL_STATUS}'), COUNT(*) FROM inquiries GROUP BY 1
+    """)
+
+
+def table_count(conn, table):
+    """Row count of a counted table (falls back to COUNT(*))"""
+    row = None
+    if table in COUNTED_TABLES:
+        try:
+            row = conn.execute(
+                "SELECT row_count FROM table_counters WHERE table_name = ?", (table,)
+            ).fetchone()
+        except sqlite3.OperationalError:
+            row = None
+    if row is None:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    return row[0]
+
+
+def status_counts(conn):
+    """Dict of inquiry status -> count"""
+    try:
+        rows = conn.execute("SELECT status, count FROM inquiry_status_counts WHERE count > 0").fetchall()
+    except sqlite3.OperationalError:
+        rows = conn.execute("SELECT status, COUNT(*) FROM inquiries GROUP BY status").fetchall()
+    return {row[0]: row[1] for row in rows}
+
+
+def status_count(conn, status):
+    """Number of inquiries with the given status"""
+    try:
+        row = conn.execute("SELECT count FROM inquiry_status_counts WHERE status = ?", (status,)).fetchone()
+        return row[0] if row else 0
+    except sqlite3.OperationalError:
+        return conn.execute("SELECT COUNT(*) FROM inquiries WHERE status = ?", (status,)).fetchone()[0]
+
+
+def verify_counters(conn, repair=False):
+    """
+    Compare every counter with a fresh COUNT(*).
+
+    Args:
+        conn: Open connection
+        repair: Rewrite counters that drifted
+
+    Returns:
+        List of dicts with 'counter', 'stored', 'actual' for each mismatch
+    """
+    mismatches = []
+    tables = _existing_tables(conn)
+
+    for table in COUNTED_TABLES:
+        if table not in tables:
+            continue
+        actual = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        row = conn.execute("SELECT row_count FROM table_counters WHERE table_name = ?", (table,)).fetchone()
+        stored = row[0] if row else None
+        if stored != actual:
+            mismatches.append({'counter': table, 'stored': stored, 'actual': actual})
+            if repair:
+                conn.execute(
+                    "INSERT OR REPLACE INTO table_counters (table_name, row_count) VALUES (?, ?)",
+                    (table, actual)
+                )
+
+    if 'inquiries' in tables:
+        actual = {
+            row[0]: row[1] for row in conn.execute(
+                f"SELECT IFNULL(status, '{NULL_STATUS}'), COUNT(*) FROM inquiries GROUP BY 1"
+            )
+        }
+        stored = {row[0]: row[1] for row in conn.execute("SELECT status, count FROM inquiry_status_counts")}
+        status_drift = False
+        for status in sorted(set(actual) | set(stored)):
+            if actual.get(status, 0) != stored.get(status, 0):
+                status_drift = True
+                mismatches.append({
+                    'counter': f"inquiries[status={status}]",
+                    'stored': stored.get(status),
+                    'actual': actual.get(status, 0)
+                })
+        if repair and status_drift:
+            _recount_statuses(conn)
+
+    if mismatches:
+        logging.warning(f"Counter drift found in {len(mismatches)} counter(s)" + (" - repaired" if repair else ""))
+    return mismatches
+
+
+if __name__ == '__main__':
+    import sys
+    from database import db
+
+    repair = '--repair' in sys.argv
+
+    print("=" * 60)
+    print("ROW COUNTERS: " + ("VERIFY AND REPAIR" if repair else "VERIFY"))
+    print("=" * 60)
+
+    with db.get_connection() as conn:
+        mismatches = verify_counters(conn, repair=repair)
+
+    if not mismatches:
+        print("  ✓ All counters match")
+    for m in mismatches:
+        print(f"  ✗ {m['counter']:30} stored={m['stored']} actual={m['actual']}")
+    if mismatches and not repair:
+        print("\nRun with --repair to fix")
@@ -1,7 +1,411 @@
 import sqlite3
 from contextlib import contextmanager
 from config import Config
+from search_index import search_tables, install_body_triggers, build_match_query, search as fts_search
+from counters import table_count, status_counts, status_count
+from migrations import run_migrations
+from query_profiler import connection_factory
+from publisher_import import import_rows
+from result_cache import ResultCache, normalize_sql, query_tags
+from archive import attach_archive, archive_batch
+from message_store import register_functions
+from concurrent.futures import Future
+import atexit
+import base64
+import json
+import logging
 import os
+import queue
+import threading
+import time
+from urllib.parse import quote
+
+
+def encode_cursor(values):
+    """Encode ORDER BY key values of the last row into an opaque cursor"""
+    raw = json.dumps(list(values), separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor.
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or not values:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_ranges(columns, cursor, descending=False):
+    """
+    Build the WHERE conditions selecting rows strictly after the cursor.
+    
+    SQLite sorts NULLs first in ascending and last in descending order, and
+    a row-value comparison never matches a NULL key, so rows whose leading
+    key is NULL get a range of their own. Every range is an index seek;
+    query them in order until the page is full (see keyset_fetch).
+    
+    Args:
+        columns: ORDER BY key columns, unique non-NULL tie-breaker last (e.g. ['i.received_at', 'i.id'])
+        cursor: Cursor from a previous page, or '' for the first page
+        descending: True if the keys are sorted DESC
+    
+    Returns:
+        List of (clause, params); [(None, [])] for the first page
+    """
+    if not cursor:
+        return [(None, [])]
+    values = decode_cursor(cursor)
+    if len(values) != len(columns):
+        raise ValueError("Invalid cursor")
+    op = '<' if descending else '>'
+    if len(columns) == 1:
+        return [(f"{columns[0]} {op} ?", values)]
+    
+    lead, rest = columns[0], columns[1:]
+    if values[0] is None:
+        # Rest of the NULL group, then (ascending) every non-NULL key
+        placeholders = ', '.join('?' for _ in rest)
+        ranges = [(f"{lead} IS NULL AND ({', '.join(rest)}) {op} ({placeholders})", values[1:])]
+        if not descending:
+            ranges.append((f"{lead} IS NOT NULL", []))
+        return ranges
+    
+    # Rest of the non-NULL keys, then (descending) the NULL group
+    placeholders = ', '.join('?' for _ in values)
+    ranges = [(f"({', '.join(columns)}) {op} ({placeholders})", values)]
+    if descending:
+        ranges.append((f"{lead} IS NULL", []))
+    return ranges
+
+
+def keyset_fetch(fetch, ranges, limit):
+    """
+    Fetch up to limit rows from consecutive keyset ranges.
+    
+    Args:
+        fetch: Callable (clause, params, limit) -> rows; clause may be None
+        ranges: Result of keyset_ranges
+        limit: Rows wanted (per_page + 1)
+    
+    Returns:
+        List of rows in ORDER BY order
+    """
+    rows = []
+    for clause, params in ranges:
+        rows += fetch(clause, params, limit - len(rows))
+        if len(rows) >= limit:
+            break
+    return rows
+
+
+def keyset_slice(rows, per_page, keys):
+    """
+    Trim a page fetched with LIMIT per_page + 1.
+    
+    Args:
+        rows: Fetched rows
+        per_page: Requested page size
+        keys: Row field names matching the ORDER BY key columns
+    
+    Returns:
+        Tuple (page_rows, next_cursor); next_cursor is None on the last page
+    """
+    if len(rows) <= per_page:
+        return rows, None
+    rows = rows[:per_page]
+    last = rows[-1]
+    return rows, encode_cursor(last[k] for k in keys)
+
+
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections.
+    A connection is pinned to the thread that checked it out until it is
+    released, so nested get_connection() calls in the same thread share it.
+    Connections are configured once with the performance PRAGMAs.
+    A read_only pool opens the file with mode=ro and PRAGMA query_only, so
+    its WAL readers never take the write lock.
+    """
+    
+    def __init__(self, db_path, max_size=None, timeout=None, max_idle=None, read_only=False):
+        self.db_path = db_path
+        self.read_only = read_only
+        self.max_size = max_size or Config.DB_POOL_SIZE
+        self.timeout = timeout if timeout is not None else Config.DB_POOL_TIMEOUT
+        self.max_idle = max_idle if max_idle is not None else Config.DB_POOL_MAX_IDLE
+        self._idle = []  # (connection, released_at) - LIFO keeps warm connections in use
+        self._open = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._local = threading.local()
+    
+    def _connect(self):
+        """Open and configure a new connection"""
+        if self.read_only:
+            uri = f"file:{quote(os.path.abspath(self.db_path))}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False, factory=connection_factory())
+            conn.execute("PRAGMA query_only=ON")
+        else:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, factory=connection_factory())
+        conn.row_factory = sqlite3.Row  # Access columns by name
+        register_functions(conn)  # message_body() for compressed bodies and exports
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-64000")  # 64MB cache
+        conn.execute("PRAGMA temp_store=MEMORY")
+        if not self.read_only:
+            install_body_triggers(conn)  # index compressed bodies written here
+        return conn
+    
+    def _is_healthy(self, conn):
+        """Cheap liveness probe before handing out an idle connection"""
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return not conn.in_transaction
+        except sqlite3.Error:
+            return False
+    
+    def _discard(self, conn):
+        """Close a connection and free its slot (caller holds the lock)"""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        self._open -= 1
+        self._cond.notify()
+    
+    def _evict_idle(self):
+        """Close connections idle longer than max_idle (caller holds the lock)"""
+        cutoff = time.monotonic() - self.max_idle
+        keep = []
+        for conn, released_at in self._idle:
+            if released_at < cutoff:
+                self._discard(conn)
+            else:
+                keep.append((conn, released_at))
+        self._idle = keep
+    
+    def acquire(self):
+        """
+        Check out a connection for the current thread.
+        
+        Returns:
+            Tuple (connection, owned). owned is False when the thread already
+            holds a connection; only the owner commits and releases it.
+        """
+        current = getattr(self._local, 'conn', None)
+        if current is not None:
+            return current, False
+        
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise sqlite3.OperationalError("Connection pool is closed")
+                
+                self._evict_idle()
+                
+                while self._idle:
+                    conn, _ = self._idle.pop()
+                    if self._is_healthy(conn):
+                        self._local.conn = conn
+                        return conn, True
+                    self._discard(conn)
+                
+                if self._open < self.max_size:
+                    self._open += 1
+                    break
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise sqlite3.OperationalError(
+                        f"Timed out waiting for a database connection (pool size {self.max_size})"
+                    )
+                self._cond.wait(remaining)
+        
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        
+        self._local.conn = conn
+        return conn, True
+    
+    def holds_connection(self):
+        """True if the current thread has a connection checked out"""
+        return getattr(self._local, 'conn', None) is not None
+    
+    def release(self, conn):
+        """Return a connection to the pool"""
+        self._local.conn = None
+        with self._cond:
+            if self._closed:
+                self._discard(conn)
+                return
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except sqlite3.Error:
+                self._discard(conn)
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+    
+    def drain(self):
+        """
+        Close every idle connection and refuse new checkouts.
+        Connections still checked out are closed when released.
+        """
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                self._discard(conn)
+            self._idle = []
+            self._cond.notify_all()
+    
+    def stats(self):
+        """Pool usage snapshot"""
+        with self._cond:
+            return {
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': self._open - len(self._idle),
+                'max_size': self.max_size,
+                'read_only': self.read_only
+            }
+
+
+class WriteQueue:
+    """
+    Single writer thread with group commit.
+    Callers submit functions taking a connection; the writer collects every
+    write that arrives within a short window and runs them in one
+    transaction (one fsync), each inside its own SAVEPOINT so a failing
+    write is rolled back alone. Results and errors come back via futures.
+    """
+    
+    def __init__(self, database, window_ms=None, max_batch=None):
+        self.database = database
+        self.window = (window_ms if window_ms is not None else Config.WRITE_BATCH_WINDOW_MS) / 1000.0
+        self.max_batch = max_batch or Config.WRITE_BATCH_MAX
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'batches': 0,
+            'writes': 0,
+            'failed': 0,
+            'last_batch_size': 0,
+            'max_batch_size': 0
+        }
+    
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+                self._thread.start()
+    
+    def submit(self, fn):
+        """
+        Queue a write.
+        
+        Args:
+            fn: Callable(conn) running the statements; must not commit
+        
+        Returns:
+            Future resolving to fn's return value
+        """
+        future = Future()
+        self._ensure_started()
+        self._queue.put((fn, future))
+        return future
+    
+    def _run(self):
+        """Writer loop: wait for a write, gather a batch, commit it"""
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+    
+    def _commit(self, batch):
+        """Run a batch in one transaction and resolve its futures"""
+        outcomes = []
+        try:
+            with self.database.get_connection(readonly=False) as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for fn, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    conn.execute("SAVEPOINT write_job")
+                    try:
+                        result = fn(conn)
+                        conn.execute("RELEASE write_job")
+                        outcomes.append((future, result, None))
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO write_job")
+                        conn.execute("RELEASE write_job")
+                        outcomes.append((future, None, e))
+        except Exception as e:
+            logging.error(f"Write batch of {len(batch)} failed: {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            with self._lock:
+                self._stats['failed'] += len(batch)
+            return
+        
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['writes'] += len(outcomes)
+            self._stats['failed'] += sum(1 for _, _, error in outcomes if error)
+            self._stats['last_batch_size'] = len(batch)
+            self._stats['max_batch_size'] = max(self._stats['max_batch_size'], len(batch))
+        
+        for future, result, error in outcomes:
+            if error:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+    
+    def stop(self, timeout=None):
+        """Commit everything already queued, then stop the writer thread"""
+        with self._lock:
+            thread = self._thread
+        if thread and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout)
+    
+    def stats(self):
+        """Queue depth and commit-batch metrics"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['avg_batch_size'] = round(stats['writes'] / stats['batches'], 2) if stats['batches'] else 0
+        return stats
+
 
 class Database:
     """
@@ -12,6 +416,14 @@ class Database:
     def __init__(self, db_path=None):
         self.db_path = db_path or Config.DATABASE_PATH
         self._ensure_directory()
+        self.pool = ConnectionPool(self.db_path, max_size=Config.DB_WRITE_POOL_SIZE)
+        self.read_pool = ConnectionPool(self.db_path, read_only=True)
+        self._lane = threading.local()
+        self.write_queue = WriteQueue(self)
+        self.cache = ResultCache()
+        self._versions = None
+        self._versions_lock = threading.Lock()
+        self.fts_tables = {}
         self._initialize_database()
     
     def _ensure_directory(self):
@@ -22,17 +434,18 @@ class Database:
     
     def _initialize_database(self):
         """Initialize database with schema if not exists"""
-        with self.get_connection() as conn:
-            # Enable WAL mode for better concurrent access
+        with self.get_connection(readonly=False) as conn:
+            # Enable WAL mode for better concurrent access (persisted in the file;
+            # per-connection PRAGMAs are applied by the pool)
             conn.execute("PRAGMA journal_mode=WAL")
-            # Optimize for performance
-            conn.execute("PRAGMA synchronous=NORMAL")
-            conn.execute("PRAGMA cache_size=-64000")  # 64MB cache
-            conn.execute("PRAGMA temp_store=MEMORY")
             
             # Load schema if database is new
             if self._is_new_database(conn):
                 self._load_schema(conn)
+            
+            run_migrations(conn)
+            self.fts_tables = search_tables(conn)
+            install_body_triggers(conn)
     
     def _is_new_database(self, conn):
         """Check if database is new (no tables)"""
@@ -44,31 +457,155 @@ class Database:
     def _load_schema(self, conn):
         """Load initial schema from init.sql"""
         schema_path = 'database/init.sql'
+        if not os.path.exists(schema_path):
+            # Repository layout: backend/../database/init.sql
+            schema_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'database', 'init.sql')
         if os.path.exists(schema_path):
             with open(schema_path, 'r') as f:
                 conn.executescript(f.read())
             conn.commit()
     
+    def set_read_only_lane(self, enabled):
+        """
+        Make get_connection() default to the read-only pool in this thread.
+        Set per request by app.py for GET/HEAD handlers.
+        """
+        self._lane.read_only = enabled
+    
     @contextmanager
-    def get_connection(self):
+    def get_connection(self, readonly=None):
         """
-        Context manager for database connections.
+        Context manager for pooled database connections.
+        Nested calls in the same thread reuse the outer connection and
+        transaction; only the outermost block commits.
+        
+        Args:
+            readonly: True for the read-only pool, False for the writer.
+                      Defaults to the thread's lane (see set_read_only_lane).
+                      A thread already holding the writer keeps using it so
+                      it sees its own uncommitted changes.
+        
         Usage:
             with db.get_connection() as conn:
                 conn.execute("SELECT * FROM users")
         """
-        conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        conn.row_factory = sqlite3.Row  # Access columns by name
+        if readonly is None:
+            readonly = getattr(self._lane, 'read_only', False)
+        pool = self.read_pool if readonly and not self.pool.holds_connection() else self.pool
+        
+        conn, owned = pool.acquire()
         try:
             yield conn
-            conn.commit()
+            if owned:
+                conn.commit()
+                if pool is self.pool:
+                    self._invalidate_changed(conn)
         except Exception as e:
-            conn.rollback()
+            if owned:
+                conn.rollback()
             raise e
         finally:
-            conn.close()
+            if owned:
+                pool.release(conn)
+    
+    def _invalidate_changed(self, conn):
+        """
+        After a committed write, evict cached results of every table whose
+        table_versions counter moved since the last check.
+        """
+        if not self.cache.enabled:
+            return
+        try:
+            versions = dict(conn.execute("SELECT table_name, version FROM table_versions").fetchall())
+        except sqlite3.OperationalError:
+            versions = None
+        
+        with self._versions_lock:
+            previous, self._versions = self._versions, versions
+        
+        if versions is None or previous is None:
+            self.cache.clear()
+        else:
+            self.cache.invalidate(t for t, v in versions.items() if previous.get(t) != v)
+    
+    def cached(self, key, tags, loader):
+        """
+        Return loader() through the result cache.
+        Bypassed when the thread holds the writer (it must see its own
+        uncommitted changes) or when tags is None. Every lookup reads the
+        tags' current table_versions, so a write committed by another
+        process misses the cache even though it never invalidated it.
+        
+        Args:
+            key: Hashable cache key
+            tags: Tables the result depends on
+            loader: Callable producing the value
+        """
+        if tags is None or not self.cache.enabled or self.pool.holds_connection():
+            return loader()
+        
+        versions = self.table_versions(tags)
+        if versions is None:
+            return loader()
+        
+        hit, value = self.cache.get(key, versions)
+        if hit:
+            return list(value) if isinstance(value, list) else value
+        
+        snapshot = self.cache.snapshot(tags)
+        value = loader()
+        self.cache.put(key, list(value) if isinstance(value, list) else value, tags, snapshot, versions)
+        return value
     
-    def execute_query(self, query, params=None, fetch_one=False):
+    def submit_write(self, fn):
+        """
+        Queue fn(conn) on the group-commit writer without waiting.
+        A thread that already holds the writer connection runs fn inline
+        in its own transaction (queuing would deadlock on the pool).
+        
+        Returns:
+            Future resolving to fn's return value
+        """
+        if not self.pool.holds_connection():
+            return self.write_queue.submit(fn)
+        
+        future = Future()
+        try:
+            with self.get_connection(readonly=False) as conn:
+                future.set_result(fn(conn))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    
+    def write(self, fn, timeout=None):
+        """
+        Run fn(conn) through the group-commit writer and return its result.
+        Exceptions raised by fn are re-raised here.
+        
+        Usage:
+            inquiry_id = db.write(lambda conn: conn.execute(
+                "INSERT INTO inquiries (client_id, subject, message, message_excerpt) VALUES (?,?,?,?)",
+                (client_id, subject, encode_body(message), make_excerpt(message))
+            ).lastrowid)
+        """
+        return self.submit_write(fn).result(timeout or Config.WRITE_TIMEOUT)
+    
+    def stats(self):
+        """Connection pool and write queue metrics"""
+        return {
+            'read_pool': self.read_pool.stats(),
+            'write_pool': self.pool.stats(),
+            'write_queue': self.write_queue.stats(),
+            'result_cache': self.cache.stats()
+        }
+    
+    def close(self):
+        """Flush queued writes and drain the connection pools (call on shutdown)"""
+        self.write_queue.stop()
+        self.read_pool.drain()
+        self.pool.drain()
+    
+    def execute_query(self, query, params=None, fetch_one=False, cache=True):
         """
         Execute a SELECT query and return results.
         
@@ -76,15 +613,23 @@ class Database:
             query: SQL query string
             params: Query parameters (tuple or dict)
             fetch_one: Return single row instead of all rows
+            cache: Serve repeated calls from the result cache
         
         Returns:
             List of Row objects or single Row object
         """
-        with self.get_connection() as conn:
-            cursor = conn.execute(query, params or ())
-            if fetch_one:
-                return cursor.fetchone()
-            return cursor.fetchall()
+        def run():
+            with self.get_connection(readonly=True) as conn:
+                cursor = conn.execute(query, params or ())
+                if fetch_one:
+                    return cursor.fetchone()
+                return cursor.fetchall()
+        
+        if not cache or isinstance(params, dict):
+            return run()
+        
+        key = ('query', normalize_sql(query), tuple(params or ()), fetch_one)
+        return self.cached(key, query_tags(query), run)
     
     def execute_update(self, query, params=None):
         """
@@ -93,7 +638,7 @@ class Database:
         Returns:
             Last inserted row ID or number of affected rows
         """
-        with self.get_connection() as conn:
+        with self.get_connection(readonly=False) as conn:
             cursor = conn.execute(query, params or ())
             return cursor.lastrowid if cursor.lastrowid else cursor.rowcount
     
@@ -109,7 +654,7 @@ class Database:
         Returns:
             Number of affected rows
         """
-        with self.get_connection() as conn:
+        with self.get_connection(readonly=False) as conn:
             cursor = conn.executemany(query, params_list)
             return cursor.rowcount
     
@@ -118,50 +663,150 @@ class Database:
         Optimized bulk insert for large publisher database.
         
         Args:
-            publishers_data: List of dicts with keys: name, email, category, status
+            publishers_data: List (or any iterable) of dicts with keys: name, email, category, status
         
         Returns:
             Number of inserted records
         """
-        query = """
-            INSERT OR IGNORE INTO publishers (name, email, category, status)
-            VALUES (?, ?, ?, ?)
+        return self.import_publishers(publishers_data)['inserted']
+    
+    def import_publishers(self, rows):
         """
+        Streaming publisher import in constant memory.
+        Uses one writer connection and a prepared INSERT, committing every
+        IMPORT_COMMIT_EVERY rows (one transaction when nested in another).
         
-        params_list = [
-            (p.get('name'), p.get('email'), p.get('category', ''), p.get('status', 'active'))
-            for p in publishers_data
-        ]
-        
-        # Process in batches for memory efficiency
-        batch_size = Config.BATCH_SIZE
-        total_inserted = 0
+        Args:
+            rows: Iterator of dicts (csv.DictReader, NDJSON stream, list)
         
-        for i in range(0, len(params_list), batch_size):
-            batch = params_list[i:i + batch_size]
-            total_inserted += self.execute_many(query, batch)
+        Returns:
+            Dict with exact total/inserted/duplicates/invalid counts and
+            the offending rows (see publisher_import.import_rows)
+        """
+        commit_every = 0 if self.pool.holds_connection() else Config.IMPORT_COMMIT_EVERY
+        with self.get_connection(readonly=False) as conn:
+            return import_rows(conn, rows, commit_every=commit_every)
+    
+    def archive_old_records(self, days=None):
+        """
+        Move finished inquiries older than ARCHIVE_AFTER_DAYS (with their
+        responses and conversation messages) to the archive database.
+        Runs in ARCHIVE_BATCH_SIZE transactions so queued writes interleave.
         
-        return total_inserted
+        Returns:
+            Dict of table -> rows moved
+        """
+        totals = {}
+        while True:
+            with self.get_connection(readonly=False) as conn:
+                attach_archive(conn, create=True)
+                moved = archive_batch(conn, days=days)
+            if not moved:
+                return totals
+            for table, count in moved.items():
+                totals[table] = totals.get(table, 0) + count
     
-    def search_records(self, table, search_term, columns):
+    def search_records(self, table, search_term, columns, limit=None, offset=0):
         """
         Search across multiple columns efficiently.
+        Uses the FTS5 index (prefix match, best bm25 rank first) when the
+        table has one, otherwise falls back to a LIKE scan (id order).
         
         Args:
             table: Table name
             search_term: Term to search for
             columns: List of column names to search in
+            limit: Max rows returned (None = every match)
+            offset: Matches to skip, for paging with limit
         
         Returns:
             List of matching rows
         """
+        if self.has_search_index(table, columns):
+            if build_match_query(search_term) is None:
+                return []
+            with self.get_connection(readonly=True) as conn:
+                return fts_search(conn, table, search_term, columns, limit, offset)
+        
         where_clause = " OR ".join([f"{col} LIKE ?" for col in columns])
-        query = f"SELECT * FROM {table} WHERE {where_clause}"
-        params = tuple(f"%{search_term}%" for _ in columns)
+        query = f"SELECT * FROM {table} WHERE {where_clause} ORDER BY id LIMIT ? OFFSET ?"
+        params = tuple(f"%{search_term}%" for _ in columns) + (-1 if limit is None else limit, offset)
         
         return self.execute_query(query, params)
     
-    def get_paginated(self, table, page=1, per_page=50, order_by="id DESC", where_clause=None, params=None):
+    def has_search_index(self, table, columns):
+        """True if every column is covered by the table's FTS5 index"""
+        indexed = self.fts_tables.get(table)
+        return bool(indexed) and all(col in indexed for col in columns)
+    
+    def search_filter(self, table, search_term, columns):
+        """
+        WHERE condition restricting a list query to full-text matches,
+        keeping the caller's ORDER BY and pagination.
+        
+        Returns:
+            Tuple (clause, params), or None if the table has no search index
+        """
+        if not self.has_search_index(table, columns):
+            return None
+        match = build_match_query(search_term, columns)
+        if match is None:
+            return "0", []
+        return f"id IN (SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH ?)", [match]
+    
+    def count_rows(self, table):
+        """Total rows in a table (O(1) for tables in counters.COUNTED_TABLES)"""
+        def run():
+            with self.get_connection(readonly=True) as conn:
+                return table_count(conn, table)
+        return self.cached(('count', table), frozenset([table]), run)
+    
+    def count_by_status(self, status=None):
+        """Inquiry count for one status, or dict of status -> count"""
+        def run():
+            with self.get_connection(readonly=True) as conn:
+                if status is None:
+                    return status_counts(conn)
+                return status_count(conn, status)
+        value = self.cached(('status_count', status), frozenset(['inquiries']), run)
+        return dict(value) if isinstance(value, dict) else value
+    
+    def table_versions(self, tables):
+        """
+        Current change versions of the given tables.
+        Bumped by triggers on every write (see migrations.VERSIONED_TABLES),
+        so they are consistent across connections and processes.
+        
+        Returns:
+            Sorted tuple of (table, version) pairs, or None if unavailable
+        """
+        placeholders = ','.join('?' * len(tables))
+        try:
+            with self.get_connection(readonly=True) as conn:
+                rows = conn.execute(
+                    f"SELECT table_name, version FROM table_versions WHERE table_name IN ({placeholders})",
+                    tuple(tables)
+                ).fetchall()
+        except sqlite3.OperationalError:
+            return None
+        if len(rows) != len(set(tables)):
+            return None
+        return tuple(sorted(tuple(row) for row in rows))
+    
+    def data_version(self, tables):
+        """
+        Change version of the given tables, for ETags.
+        
+        Returns:
+            String like "clients:12;inquiries:40", or None if unavailable
+        """
+        versions = self.table_versions(tables)
+        if versions is None:
+            return None
+        return ';'.join(f"{name}:{version}" for name, version in versions)
+    
+    def get_paginated(self, table, page=1, per_page=50, order_by="id DESC", where_clause=None, params=None, after=None,
+                      columns="*"):
         """
         Get paginated results for large datasets.
         
@@ -169,24 +814,31 @@ class Database:
             table: Table name
             page: Page number (1-indexed)
             per_page: Results per page
-            order_by: ORDER BY clause
+            order_by: ORDER BY clause ("column [ASC|DESC]")
             where_clause: Optional WHERE clause
             params: Parameters for where clause
+            after: Cursor for keyset pagination ('' for the first page).
+                   When given, 'page' is ignored and every page costs the same.
+            columns: SELECT list (must include the order column and id for keyset paging)
         
         Returns:
             Dict with 'data', 'total', 'page', 'pages'
+            (keyset mode: 'data', 'total', 'next_cursor', 'has_more')
         """
-        offset = (page - 1) * per_page
-        
-        # Count total
-        count_query = f"SELECT COUNT(*) as total FROM {table}"
+        # Count total (trigger-maintained counter when unfiltered)
         if where_clause:
-            count_query += f" WHERE {where_clause}"
+            count_query = f"SELECT COUNT(*) as total FROM {table} WHERE {where_clause}"
+            total = self.execute_query(count_query, params, fetch_one=True)['total']
+        else:
+            total = self.count_rows(table)
         
-        total = self.execute_query(count_query, params, fetch_one=True)['total']
+        if after is not None:
+            return self._get_keyset_page(table, per_page, order_by, where_clause, params, after, total, columns)
+        
+        offset = (page - 1) * per_page
         
         # Get page data
-        data_query = f"SELECT * FROM {table}"
+        data_query = f"SELECT {columns} FROM {table}"
         if where_clause:
             data_query += f" WHERE {where_clause}"
         data_query += f" ORDER BY {order_by} LIMIT ? OFFSET ?"
@@ -201,6 +853,36 @@ class Database:
             'pages': (total + per_page - 1) // per_page,
             'per_page': per_page
         }
+    
+    def _get_keyset_page(self, table, per_page, order_by, where_clause, params, after, total, columns="*"):
+        """Keyset page ordered by (order column, id) - see get_paginated"""
+        parts = order_by.split()
+        column = parts[0]
+        descending = len(parts) > 1 and parts[1].upper() == 'DESC'
+        direction = 'DESC' if descending else 'ASC'
+        keys = [column] if column == 'id' else [column, 'id']
+        
+        order = ", ".join(f"{k} {direction}" for k in keys)
+        
+        def fetch(clause, cursor_params, limit):
+            conditions = [c for c in (where_clause, clause) if c]
+            data_query = f"SELECT {columns} FROM {table}"
+            if conditions:
+                data_query += " WHERE " + " AND ".join(f"({c})" for c in conditions)
+            data_query += f" ORDER BY {order} LIMIT ?"
+            return self.execute_query(data_query, (*(params or ()), *cursor_params, limit))
+        
+        rows = keyset_fetch(fetch, keyset_ranges(keys, after, descending), per_page + 1)
+        rows, next_cursor = keyset_slice(rows, per_page, keys)
+        
+        return {
+            'data': [dict(row) for row in rows],
+            'total': total,
+            'per_page': per_page,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }
 
 # Global database instance
-db = Database()
\ No newline at end of file
+db = Database()
+atexit.register(db.close)
\ No newline at end of file
@@ -5,11 +5,11 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.header import decode_header
 from config import Config
-from models import Client, Inquiry
-from datetime import datetime
+from models import Client, Inquiry, ImapSyncState
+from imap_fetch import fetch_messages
+from imap_idle import MailboxWatcher
+from datetime import datetime, timedelta
 import re
-import threading
-import time
 import logging
 
 # Configurar logging profesional
@@ -22,11 +22,14 @@ logging.basicConfig(
     ]
 )
 
+# SEARCH dates use English month names whatever the locale
+IMAP_MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
 class EmailHandler:
     """
     Handle email operations: fetch inquiries and send responses.
     Supports Gmail, Outlook, and other IMAP/SMTP providers.
-    Can run a professional monitoring loop in a separate thread.
+    Can watch the mailbox for new mail (IMAP IDLE) in a separate thread.
     """
     
     def __init__(self):
@@ -36,8 +39,7 @@ class EmailHandler:
         self.smtp_port = Config.SMTP_PORT
         self.email_address = Config.EMAIL_ADDRESS
         self.email_password = Config.EMAIL_PASSWORD
-        self._monitoring_thread = None
-        self._stop_event = threading.Event()
+        self._watcher = None
     
     def connect_imap(self):
         """Connect to IMAP server"""
@@ -84,37 +86,145 @@ class EmailHandler:
             return msg.get_payload(decode=True).decode()
         return ""
 
-    def fetch_new_emails(self):
+    # --- Sincronización incremental por UID ---
+    def _select_mailbox(self, mail, mailbox):
         """
-        Fetch unread emails and return a list of dicts with keys: from, subject, body
+        Open a mailbox read-only (EXAMINE), so fetching never touches the
+        \\Seen flags people rely on in their mail client.
+        
+        Returns:
+            (UIDVALIDITY, UIDNEXT or None)
         """
-        new_emails = []
+        status, _ = mail.select(mailbox, readonly=True)
+        if status != "OK":
+            raise imaplib.IMAP4.error(f"Cannot open mailbox {mailbox}")
+        uidvalidity = mail.response('UIDVALIDITY')[1][0]
+        uidnext = mail.response('UIDNEXT')[1][0]
+        if uidvalidity is None:
+            status, data = mail.status(mailbox, '(UIDVALIDITY UIDNEXT)')
+            uidvalidity = re.search(rb'UIDVALIDITY (\d+)', data[0]).group(1)
+            found = re.search(rb'UIDNEXT (\d+)', data[0])
+            uidnext = found.group(1) if found else None
+        return int(uidvalidity), int(uidnext) if uidnext else None
+
+    def _uids_after_checkpoint(self, mail, mailbox, uidvalidity):
+        """
+        UIDs of the messages the sync has not processed yet, oldest first.
+        
+        Returns:
+            (UID list, True when this is a full resync)
+        """
+        state = ImapSyncState.get(mailbox)
+        if state and state['uidvalidity'] == uidvalidity:
+            last_uid = state['last_uid']
+            status, data = mail.uid('SEARCH', None, f'UID {last_uid + 1}:*')
+            resync = False
+        else:
+            # First sync, or the server renumbered the mailbox: stored UIDs
+            # mean nothing now. Content-hash dedup absorbs re-fetched mail.
+            last_uid = 0
+            criteria = 'ALL'
+            if Config.IMAP_RESYNC_DAYS > 0:
+                since = datetime.now() - timedelta(days=Config.IMAP_RESYNC_DAYS)
+                criteria = f'SINCE {since.day}-{IMAP_MONTHS[since.month - 1]}-{since.year}'
+            status, data = mail.uid('SEARCH', None, criteria)
+            resync = True
+            logging.info(f"Full resync of {mailbox} (UIDVALIDITY {uidvalidity}, {criteria})")
+        if status != "OK":
+            return [], resync
+        # "n:*" always matches the newest message, even when its UID is below n
+        uids = sorted(uid for uid in map(int, data[0].split()) if uid > last_uid)
+        return uids, resync
+
+    def iter_new_messages(self, mailbox=None, limit=None):
+        """
+        Yield batches (IMAP_FETCH_BATCH UIDs each) of messages that arrived
+        after the mailbox's UID checkpoint (UID last+1:*), oldest first, at
+        most limit in total. Headers and the plain-text part are fetched
+        in batches (see imap_fetch.py); errors are raised.
+        
+        Yields:
+            Lists of dicts with keys: uid, headers (raw), body, truncated,
+            uidvalidity, mailbox
+        """
+        mailbox = mailbox or Config.IMAP_MAILBOX
+        limit = limit or Config.MAX_EMAIL_FETCH
+        mail = self.connect_imap()
         try:
-            mail = self.connect_imap()
-            mail.select("inbox")
-            status, messages = mail.search(None, '(UNSEEN)')
-            if status != "OK":
-                logging.warning("No new messages found")
-                return new_emails
-            for num in messages[0].split():
-                status, data = mail.fetch(num, '(RFC822)')
-                if status != "OK":
-                    continue
-                msg = email.message_from_bytes(data[0][1])
-                from_header = self.decode_email_header(msg["From"])
-                subject = self.decode_email_header(msg["Subject"])
-                body = self.get_email_body(msg)
-                new_emails.append({
-                    "from": self.extract_email_address(from_header),
-                    "name": self.extract_name_from_email(from_header),
-                    "subject": subject,
-                    "body": body
-                })
+            uidvalidity, uidnext = self._select_mailbox(mail, mailbox)
+            uids, resync = self._uids_after_checkpoint(mail, mailbox, uidvalidity)
+            if not uids:
+                if resync and uidnext:
+                    # Nothing in the resync window: start from the current end
+                    ImapSyncState.save(mailbox, uidvalidity, uidnext - 1)
+                return
+            if len(uids) > limit:
+                logging.info(f"{len(uids)} new emails in {mailbox}, fetching the oldest {limit}")
+                uids = uids[:limit]
+            for start in range(0, len(uids), Config.IMAP_FETCH_BATCH):
+                batch = fetch_messages(mail, uids[start:start + Config.IMAP_FETCH_BATCH])
+                yield [dict(message, uidvalidity=uidvalidity, mailbox=mailbox) for message in batch]
+        finally:
             mail.logout()
+
+    def parse_message(self, message):
+        """
+        Email dict (from, name, subject, body, uid, uidvalidity, mailbox)
+        for a message yielded by iter_new_messages()
+        """
+        headers = email.message_from_bytes(message["headers"])
+        from_header = self.decode_email_header(headers["From"] or "")
+        subject = self.decode_email_header(headers["Subject"] or "")
+        return {
+            "from": self.extract_email_address(from_header),
+            "name": self.extract_name_from_email(from_header),
+            "subject": subject,
+            "body": message["body"],
+            "uid": message["uid"],
+            "uidvalidity": message["uidvalidity"],
+            "mailbox": message["mailbox"]
+        }
+
+    def fetch_new_emails(self, mailbox=None, limit=None):
+        """
+        Fetch emails that arrived after the mailbox's UID checkpoint, oldest
+        first, at most limit per call (see iter_new_messages).
+        
+        The checkpoint is not advanced here: call save_checkpoint() with the
+        returned emails once they are stored, so a failed sync fetches them
+        again next time.
+        
+        Returns:
+            List of dicts with keys: from, name, subject, body, uid,
+            uidvalidity, mailbox
+        """
+        new_emails = []
+        try:
+            for batch in self.iter_new_messages(mailbox, limit):
+                new_emails.extend(self.parse_message(message) for message in batch)
         except Exception as e:
             logging.error(f"Error fetching emails: {str(e)}")
         return new_emails
-  
+
+    def save_checkpoint(self, emails):
+        """Advance each mailbox's checkpoint to the highest UID among processed emails"""
+        latest = {}
+        for e in emails:
+            key = (e['mailbox'], e['uidvalidity'])
+            latest[key] = max(latest.get(key, 0), e['uid'])
+        for (mailbox, uidvalidity), uid in latest.items():
+            ImapSyncState.save(mailbox, uidvalidity, uid)
+
+    def count_new_emails(self, mailbox=None):
+        """Number of emails after the checkpoint (UID SEARCH only, nothing fetched)"""
+        mailbox = mailbox or Config.IMAP_MAILBOX
+        mail = self.connect_imap()
+        try:
+            uidvalidity, _ = self._select_mailbox(mail, mailbox)
+            uids, _ = self._uids_after_checkpoint(mail, mailbox, uidvalidity)
+            return len(uids)
+        finally:
+            mail.logout()
 
     def send_email(self, to_address, subject, body):
         """Send a single email"""
@@ -147,42 +257,35 @@ class EmailHandler:
             logging.error(f"Connection test failed: {str(e)}")
             return False
 
-    # --- Monitoreo profesional en thread ---
-    def start_email_monitoring(self, interval=60):
+    # --- Monitoreo con IMAP IDLE en thread ---
+    def start_email_monitoring(self, interval=60, on_new_mail=None):
         """
-        Start email monitoring in a separate daemon thread.
-        interval: seconds between checks
+        Watch the mailbox over one long-lived IMAP connection (IDLE push,
+        see imap_idle.py) and call on_new_mail as soon as mail arrives.
+        interval: seconds between UID SEARCH polls on servers without IDLE
         """
-        if self._monitoring_thread and self._monitoring_thread.is_alive():
+        if self._watcher and self._watcher.is_running():
             logging.warning("Email monitoring already running")
             return
         
-        logging.info(f"Starting email monitoring every {interval} seconds...")
-        self._stop_event.clear()
-        self._monitoring_thread = threading.Thread(target=self._monitor_loop, args=(interval,))
-        self._monitoring_thread.daemon = True
-        self._monitoring_thread.start()
-
-    def _monitor_loop(self, interval):
-        """Loop that fetches new emails periodically"""
-        while not self._stop_event.is_set():
-            try:
-                new_emails = self.fetch_new_emails()
-                for email_data in new_emails:
-                    logging.info(f"New inquiry from {email_data['from']}: {email_data['subject']}")
-                    # Aquí podrías integrar tu AI Assistant para generar respuesta automáticamente
-                    # response_text = ai_assistant.generate_response(email_data['subject'], email_data['body'])
-                    # self.send_email(email_data['from'], "Re: " + email_data['subject'], response_text)
-            except Exception as e:
-                logging.error(f"Error during email monitoring: {str(e)}")
-            time.sleep(interval)
+        def log_pending():
+            pending = self.count_new_emails()
+            if pending:
+                logging.info(f"{pending} new emails waiting for sync")
+        
+        logging.info("Starting email monitoring...")
+        self._watcher = MailboxWatcher(self.connect_imap, on_new_mail or log_pending, poll_interval=interval)
+        self._watcher.start()
+
+    def monitoring_status(self):
+        """Watcher state (connected, mode, last_event, last_wake, ...) or None"""
+        return self._watcher.status() if self._watcher else None
     
     def stop_email_monitoring(self):
-        """Stop the monitoring thread gracefully"""
-        if self._monitoring_thread and self._monitoring_thread.is_alive():
+        """Stop the monitoring threads gracefully"""
+        if self._watcher and self._watcher.is_running():
             logging.info("Stopping email monitoring...")
-            self._stop_event.set()
-            self._monitoring_thread.join()
+            self._watcher.stop()
             logging.info("Email monitoring stopped.")
         else:
             logging.info("No monitoring thread to stop.")
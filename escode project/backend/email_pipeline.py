@@ -0,0 +1,409 @@
+"""
+Background email ingestion pipeline.
+
+A sync job runs four stages in their own threads, joined by bounded
+queues (INGEST_QUEUE_SIZE items), so IMAP round-trips, parsing, contact
+extraction and database writes overlap instead of running one after
+another inside an HTTP request:
+
+    fetch    UID batches from IMAP (headers + text part, see imap_fetch.py)
+    parse    decode headers and addresses
+    extract  contact fields and the 3-of-4 completeness filter (contact_extract.py)
+    persist  resolve the client and insert the inquiry (group-commit writer)
+
+Jobs run one at a time on a worker thread. /api/email/sync and the IMAP
+watcher only enqueue one; a sync requested while another is still queued
+joins it. Each job handles up to INGEST_MAX_EMAILS emails and queues a
+follow-up when more are waiting. The UID checkpoint moves past the
+emails stored (or rejected) in order, so a failed job resumes where it
+stopped. Finished jobs are kept in memory (the newest INGEST_JOBS_KEPT)
+with per-stage counts and throughput.
+"""
+from config import Config
+from contact_extract import FIELDS, MIN_REQUIRED_FIELDS, extract_contact
+from database import db
+from email_handler import email_handler
+from message_store import encode_body, make_excerpt
+from inquiry_dedup import INSERT_SQL as DEDUP_INSERT_SQL, content_hash
+from collections import OrderedDict
+from datetime import datetime
+from functools import partial
+import logging
+import queue
+import threading
+import time
+import uuid
+
+STAGES = ['fetch', 'parse', 'extract', 'persist']
+
+# End-of-stream marker passed down the queues
+_DONE = object()
+
+
+# ============================================================================
+# STAGE FUNCTIONS
+# ============================================================================
+def extract_inquiry(email_data):
+    """
+    Extract contact fields from a parsed email and apply the completeness
+    filter (at least 3 of name, email, phone and company).
+
+    Returns:
+        Dict with full_name, company, phone, subject and body, or None
+        when the email is rejected
+    """
+    body = email_data.get('body', '')
+    raw_subject = email_data.get('subject', '').strip()
+    
+    contact = extract_contact(body, email_data.get('from'))
+    full_name = contact.name.value
+    company = contact.company.value
+    phone = contact.phone.value
+    valid_fields_count = len(contact.valid_fields)
+    
+    if not contact.is_complete():
+        has = [f"OK {field.capitalize()}" for field in FIELDS if getattr(contact, field).valid]
+        missing = [f"MISSING {field.capitalize()}" for field in FIELDS if not getattr(contact, field).valid]
+        
+        logging.warning(f"REJECTED Email ({valid_fields_count}/{MIN_REQUIRED_FIELDS} fields): {raw_subject[:50]}")
+        logging.warning(f"   Has: {', '.join(has) if has else 'None'}")
+        logging.warning(f"   Missing: {', '.join(missing)}")
+        return None
+    
+    logging.info(f"VALID Email ({valid_fields_count}/4 fields): {raw_subject[:50]}")
+    
+    if not raw_subject or raw_subject == '':
+        current_date = datetime.now().strftime('%d/%m/%Y')
+        if company:
+            subject = f"{company} - {current_date}"
+        else:
+            subject = f"{full_name} - {current_date}"
+    else:
+        subject = raw_subject
+
+    return {
+        'full_name': full_name,
+        'company': company,
+        'phone': phone,
+        'subject': subject,
+        'body': body,
+    }
+
+
+def persist_inquiry(conn, full_name, company, phone, subject, body):
+    """
+    Resolve the client and store one synced email as an inquiry.
+    Runs inside a group-commit write batch (see Database.write).
+    
+    Returns:
+        True if a new inquiry was created, False for a duplicate
+    """
+    cursor = conn.execute(
+        "SELECT id, email FROM clients WHERE full_name = ? AND company = ?",
+        (full_name, company if company else '')
+    )
+    client = cursor.fetchone()
+
+    if not client:
+        name_slug = full_name.lower().replace(' ', '.').replace('*', '')
+        company_slug = company.lower().replace(' ', '.').replace('*', '') if company else 'unknown'
+        synthetic_email = f"{name_slug}.{company_slug}@internal.local"
+
+        cursor = conn.execute(
+            "INSERT INTO clients (full_name, email, phone, company) VALUES (?, ?, ?, ?)",
+            (full_name, synthetic_email, phone, company)
+        )
+        client_id = cursor.lastrowid
+        logging.info(f"   NEW client created: {full_name} - {company} ({synthetic_email})")
+    else:
+        client_id = client[0]
+
+        update_fields = []
+        update_values = []
+
+        if phone:
+            update_fields.append("phone = ?")
+            update_values.append(phone)
+
+        if update_fields:
+            update_values.append(client_id)
+            conn.execute(
+                f"UPDATE clients SET {', '.join(update_fields)} WHERE id = ?",
+                tuple(update_values)
+            )
+        logging.info(f"   UPDATED client: {full_name} - {company}")
+
+    # Duplicates hit the unique content_hash index and insert nothing
+    cursor = conn.execute(
+        DEDUP_INSERT_SQL,
+        (client_id, subject, encode_body(body), make_excerpt(body), 'pending', datetime.utcnow(),
+         content_hash(client_id, subject, body))
+    )
+
+    if cursor.rowcount == 1:
+        inquiry_id = cursor.lastrowid
+        logging.info(f"   CREATED inquiry: {subject[:50]}")
+
+        # ========================================================================
+        # AUTO-DETECT: Did client reply to previous response?
+        # ========================================================================
+        cursor = conn.execute("""
+            SELECT r.id, r.inquiry_id
+            FROM responses r
+            JOIN inquiries i ON r.inquiry_id = i.id
+            WHERE i.client_id = ? AND r.client_replied = 0
+            ORDER BY r.sent_at DESC
+            LIMIT 1
+        """, (client_id,))
+
+        pending_response = cursor.fetchone()
+
+        if pending_response:
+            # Update response status
+            conn.execute("""
+                UPDATE responses 
+                SET client_replied = 1, 
+                    follow_up_method = 'email'
+                WHERE id = ?
+            """, (pending_response['id'],))
+
+            # ADD CLIENT MESSAGE TO CONVERSATION THREAD
+            conn.execute("""
+                INSERT INTO conversation_messages (response_id, sender, message, sent_at)
+                VALUES (?, 'client', ?, ?)
+            """, (pending_response['id'], encode_body(body), datetime.utcnow()))
+
+            logging.info(f"   AUTO-DETECTED: Client replied to response #{pending_response['id']}")
+            logging.info(f"   MESSAGE ADDED to conversation thread")
+        return True
+    else:
+        logging.info(f"   DUPLICATE inquiry skipped: {subject[:50]}")
+        return False
+
+
+# ============================================================================
+# JOBS
+# ============================================================================
+class IngestJob:
+    """One sync run: state, per-stage counters and the emails in flight"""
+
+    def __init__(self, trigger):
+        self.id = uuid.uuid4().hex[:12]
+        self.trigger = trigger
+        self.state = 'queued'
+        self.error = None
+        self.halted = False
+        self.queued_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.stages = {name: {'items': 0, 'busy_s': 0.0} for name in STAGES}
+        self.counts = {'fetched': 0, 'rejected': 0, 'created': 0, 'duplicates': 0}
+        self.queues = {}
+        self.pending = []  # (email, write future or None) in UID order
+
+    def fail(self, stage, error, halt=True):
+        """
+        Record the first error. With halt, every stage then drains without
+        working; a fetch error lets the stages finish what was fetched.
+        """
+        if self.error is None:
+            self.error = f"{stage}: {error}"
+            logging.error(f"Ingestion job {self.id} failed in {stage}: {error}")
+        self.halted = self.halted or halt
+
+    def to_dict(self):
+        end = self.finished_at or datetime.now()
+        return {
+            'id': self.id,
+            'trigger': self.trigger,
+            'state': self.state,
+            'error': self.error,
+            'queued_at': self.queued_at.isoformat(timespec='seconds'),
+            'started_at': self.started_at.isoformat(timespec='seconds') if self.started_at else None,
+            'finished_at': self.finished_at.isoformat(timespec='seconds') if self.finished_at else None,
+            'elapsed_s': round((end - self.started_at).total_seconds(), 3) if self.started_at else None,
+            'counts': dict(self.counts),
+            'stages': {
+                name: {
+                    'items': s['items'],
+                    'busy_s': round(s['busy_s'], 3),
+                    'per_s': round(s['items'] / s['busy_s'], 1) if s['busy_s'] else None,
+                    'queued': self.queues[name].qsize() if name in self.queues else 0,
+                }
+                for name, s in self.stages.items()
+            },
+        }
+
+
+class IngestPipeline:
+    """Queue of sync jobs run one at a time through the staged pipeline"""
+
+    def __init__(self, database, handler, queue_size=None, max_emails=None, keep=None):
+        self.database = database
+        self.handler = handler
+        self.queue_size = queue_size or Config.INGEST_QUEUE_SIZE
+        self.max_emails = max_emails or Config.INGEST_MAX_EMAILS
+        self.keep = keep or Config.INGEST_JOBS_KEPT
+        self._jobs = OrderedDict()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self.last_ingest = None  # when a job last created inquiries
+
+    def submit(self, trigger='manual'):
+        """
+        Queue a sync (or join the one already waiting to start).
+
+        Returns:
+            The IngestJob
+        """
+        with self._lock:
+            for job in self._jobs.values():
+                if job.state == 'queued':
+                    return job
+            job = IngestJob(trigger)
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.keep:
+                oldest = next(iter(self._jobs))
+                if self._jobs[oldest].state in ('queued', 'running'):
+                    break
+                del self._jobs[oldest]
+            if not (self._worker and self._worker.is_alive()):
+                self._worker = threading.Thread(target=self._work, name='email-ingest', daemon=True)
+                self._worker.start()
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def latest(self):
+        """Most recently queued job or None"""
+        with self._lock:
+            return next(reversed(self._jobs.values()), None)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self.run(job)
+            except Exception as e:
+                job.fail('pipeline', str(e))
+                job.state, job.finished_at = 'failed', datetime.now()
+
+    # --- Stages ---
+    def _stage(self, job, name, fn, inbox, outbox):
+        """Apply fn to each item from inbox, pass non-None results on, forward the end marker"""
+        stats = job.stages[name]
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                break
+            if job.halted:
+                continue
+            started = time.perf_counter()
+            try:
+                result = fn(job, item)
+            except Exception as e:
+                job.fail(name, str(e))
+                continue
+            stats['items'] += 1
+            stats['busy_s'] += time.perf_counter() - started
+            if result is not None and outbox is not None:
+                outbox.put(result)
+        if outbox is not None:
+            outbox.put(_DONE)
+
+    def _parse(self, job, raw):
+        return self.handler.parse_message(raw)
+
+    def _extract(self, job, email_data):
+        return email_data, extract_inquiry(email_data)
+
+    def _persist(self, job, item):
+        email_data, inquiry = item
+        future = None
+        if inquiry is None:
+            job.counts['rejected'] += 1
+        else:
+            future = self.database.submit_write(partial(persist_inquiry, **inquiry))
+        job.pending.append((email_data, future))
+
+    def _fetch(self, job, outbox):
+        """Stream new messages from IMAP into the parse queue"""
+        stats = job.stages['fetch']
+        started = time.perf_counter()
+        try:
+            for batch in self.handler.iter_new_messages(limit=self.max_emails):
+                stats['busy_s'] += time.perf_counter() - started
+                for raw in batch:
+                    if job.halted:
+                        return
+                    stats['items'] += 1
+                    job.counts['fetched'] += 1
+                    outbox.put(raw)
+                started = time.perf_counter()
+        except Exception as e:
+            job.fail('fetch', str(e), halt=False)
+        finally:
+            outbox.put(_DONE)
+
+    def _settle(self, job):
+        """
+        Wait for the writes in UID order and move the checkpoint past the
+        emails handled before the first failure.
+        """
+        stats = job.stages['persist']
+        started = time.perf_counter()
+        done = []
+        for email_data, future in job.pending:
+            if future is not None:
+                try:
+                    created = future.result(Config.WRITE_TIMEOUT)
+                except Exception as e:
+                    job.fail('persist', str(e))
+                    break
+                job.counts['created' if created else 'duplicates'] += 1
+            done.append(email_data)
+        stats['busy_s'] += time.perf_counter() - started
+        self.handler.save_checkpoint(done)
+        job.pending = []
+
+    def run(self, job):
+        """Run one job through all stages (called by the worker thread)"""
+        job.state, job.started_at = 'running', datetime.now()
+        job.queues = {name: queue.Queue(self.queue_size) for name in STAGES[1:]}
+        threads = [
+            threading.Thread(target=self._stage, name=f'email-ingest-{name}', daemon=True,
+                             args=(job, name, fn, job.queues[name], job.queues.get(next_name)))
+            for name, fn, next_name in [
+                ('parse', self._parse, 'extract'),
+                ('extract', self._extract, 'persist'),
+                ('persist', self._persist, None),
+            ]
+        ]
+        for thread in threads:
+            thread.start()
+        self._fetch(job, job.queues['parse'])
+        for thread in threads:
+            thread.join()
+        self._settle(job)
+
+        job.state = 'failed' if job.error else 'done'
+        job.finished_at = datetime.now()
+        if job.counts['created']:
+            self.last_ingest = job.finished_at.isoformat(timespec='seconds')
+
+        c = job.counts
+        logging.info(
+            f"SYNC SUMMARY (job {job.id}, {job.trigger}): {c['fetched']} fetched, {c['rejected']} rejected, "
+            f"{c['created']} created, {c['duplicates']} duplicates in {job.to_dict()['elapsed_s']}s"
+        )
+
+        # A full job may have left mail behind: keep draining
+        if not job.error and c['fetched'] >= self.max_emails:
+            self.submit('continue')
+
+
+# Global pipeline (worker thread starts with the first job)
+ingest_pipeline = IngestPipeline(db, email_handler)
@@ -0,0 +1,145 @@
+"""
+Streaming CSV / NDJSON export.
+
+Rows are read from one cursor in fetchmany() batches of EXPORT_FETCH_SIZE
+and encoded (optionally gzip-compressed) batch by batch, so memory stays
+flat regardless of table size and the whole export is one consistent
+read snapshot.
+"""
+import csv
+import io
+import json
+import zlib
+from config import Config
+
+# Exportable tables: base query, ORDER BY and the filters of the matching list route
+EXPORT_TABLES = {
+    'clients': {
+        'query': "SELECT * FROM clients",
+        'order_by': "id ASC",
+        'search': ['full_name', 'email'],
+    },
+    'inquiries': {
+        'query': """
+            SELECT i.id, i.client_id, i.subject, message_body(i.message) AS message, i.status,
+                   i.received_at, i.responded_at, i.assigned_to,
+                   c.full_name as client_name, c.email as client_email
+            FROM inquiries i
+            LEFT JOIN clients c ON i.client_id = c.id
+        """,
+        'order_by': "i.received_at DESC, i.id DESC",
+        'status': 'i.status',
+    },
+    'publishers': {
+        'query': "SELECT * FROM publishers",
+        'order_by': "name ASC, id ASC",
+        'search': ['name', 'email'],
+    },
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def build_export_query(database, table, search=None, status=None):
+    """
+    SELECT for an export with the list-route filters applied.
+
+    Returns:
+        (query, params)
+    """
+    spec = EXPORT_TABLES[table]
+    conditions = []
+    params = []
+
+    if search and 'search' in spec:
+        fts = database.search_filter(table, search, spec['search'])
+        if fts:
+            conditions.append(fts[0])
+            params += fts[1]
+        else:
+            conditions.append('(' + ' OR '.join(f"{c} LIKE ?" for c in spec['search']) + ')')
+            params += [f"%{search}%"] * len(spec['search'])
+
+    if status and 'status' in spec:
+        conditions.append(f"{spec['status']}=?")
+        params.append(status)
+
+    query = spec['query']
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {spec['order_by']}"
+    return query, tuple(params)
+
+
+def _csv_chunks(cursor, fetch_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([d[0] for d in cursor.description])
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            break
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    tail = buffer.getvalue()
+    if tail:
+        yield tail.encode('utf-8')
+
+
+def _ndjson_chunks(cursor, fetch_size):
+    columns = [d[0] for d in cursor.description]
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            break
+        yield ''.join(
+            json.dumps(dict(zip(columns, row)), default=str, ensure_ascii=False) + '\n'
+            for row in rows
+        ).encode('utf-8')
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        chunks.close()
+
+
+def stream_export(database, table, fmt='csv', search=None, status=None, compress=False, fetch_size=None):
+    """
+    Generator of encoded export chunks.
+    Holds one read-only pooled connection until the generator is exhausted
+    or closed (Flask closes it when the client disconnects).
+
+    Args:
+        database: Database instance
+        table: One of EXPORT_TABLES
+        fmt: 'csv' or 'ndjson'
+        search: Search filter (clients, publishers)
+        status: Status filter (inquiries)
+        compress: gzip the stream
+        fetch_size: Rows per fetchmany() batch
+    """
+    fetch_size = fetch_size or Config.EXPORT_FETCH_SIZE
+    query, params = build_export_query(database, table, search, status)
+    encode = _csv_chunks if fmt == 'csv' else _ndjson_chunks
+
+    def chunks():
+        with database.get_connection(readonly=True) as conn:
+            cursor = conn.execute(query, params)
+            try:
+                yield from encode(cursor, fetch_size)
+            finally:
+                cursor.close()
+
+    return _gzip(chunks()) if compress else chunks()
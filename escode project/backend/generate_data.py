@@ -0,0 +1,291 @@
+"""
+Synthetic data generator for performance testing.
+
+Fills a scratch database (never point it at production) with realistic,
+skewed volumes: a few clients send most inquiries, recent weeks are
+busier than old ones, most inquiries are responded and a few long
+conversations hold most messages.
+
+Usage (from backend/):
+    python generate_data.py --db database/bench.db
+    python generate_data.py --db database/bench.db --publishers 100000 --inquiries 1000000 --messages 5000000
+    python generate_data.py --db database/bench.db --scale 0.01   # 1% of the default volumes
+"""
+import argparse
+import bisect
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+DEFAULTS = {
+    'users': 25,
+    'clients': 50000,
+    'publishers': 100000,
+    'inquiries': 1000000,
+    'messages': 5000000,
+}
+
+CHUNK_SIZE = 10000
+
+STATUS_WEIGHTS = [('pending', 20), ('in_progress', 10), ('responded', 55), ('closed', 15)]
+CATEGORIES = [('Technology', 30), ('News', 25), ('Lifestyle', 15), ('Finance', 10),
+              ('Sports', 8), ('Travel', 6), ('Health', 4), ('Gaming', 2)]
+FIRST_NAMES = ['John', 'Maria', 'Lucas', 'Sofia', 'Daniel', 'Laura', 'Martin', 'Ana', 'Pablo', 'Julia',
+               'Diego', 'Emma', 'Carlos', 'Olivia', 'Pedro', 'Valentina', 'Tomas', 'Camila', 'Mateo', 'Lucia']
+LAST_NAMES = ['Smith', 'Garcia', 'Rossi', 'Muller', 'Lopez', 'Martin', 'Brown', 'Silva', 'Fernandez',
+              'Costa', 'Romero', 'Keller', 'Dubois', 'Novak', 'Perez', 'Wilson', 'Moreau', 'Torres']
+COMPANY_WORDS = ['Acme', 'Blue', 'Nova', 'Delta', 'Prime', 'Vertex', 'Atlas', 'Orbit', 'Summit', 'Pixel',
+                 'Quantum', 'Green', 'Bright', 'Nexus', 'Silver', 'Polar', 'Urban', 'Alpha']
+COMPANY_SUFFIXES = ['Solutions', 'Inc', 'LLC', 'Ltd', 'Corp', 'Systems', 'Technologies', 'Group', 'Media']
+WORDS = ('quote price campaign sponsored article backlink publication guest post budget website traffic '
+         'audience placement link niche domain authority request offer package deadline invoice payment '
+         'content editorial guidelines review feedback proposal banner newsletter social media').split()
+
+BODY_POOL_SIZE = 5000
+
+
+def weighted_picker(rng, pairs):
+    values = [v for v, _ in pairs]
+    cum = list(itertools.accumulate(w for _, w in pairs))
+    return lambda: values[bisect.bisect(cum, rng.random() * cum[-1])]
+
+
+def zipf_picker(rng, n, exponent=1.1):
+    """Pick 1..n with a power-law skew (1 is the most frequent)"""
+    cum = list(itertools.accumulate(1.0 / (rank ** exponent) for rank in range(1, n + 1)))
+    total = cum[-1]
+    return lambda: bisect.bisect(cum, rng.random() * total) + 1
+
+
+def make_body_pool(rng):
+    """Pre-built message bodies (50 to ~4000 chars) reused across rows"""
+    pool = []
+    for _ in range(BODY_POOL_SIZE):
+        words = rng.choices(WORDS, k=int(rng.lognormvariate(4.2, 0.9)) + 8)
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        company = f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)}"
+        pool.append(
+            f"Hello, my name is {name} from {company}.\n"
+            + ' '.join(words).capitalize() + ".\n"
+            + f"Phone: +{rng.randint(1, 99)} {rng.randint(100, 999)} {rng.randint(100000, 9999999)}\n"
+            + f"Email: {name.lower().replace(' ', '.')}@{company.split()[0].lower()}.com"
+        )
+    return pool
+
+
+def make_sample_emails(rng, count):
+    """
+    (sender, body) pairs in the shapes the email sync sees: introductions,
+    web-form notifications, Spanish requests, long threads with the
+    signature at the end and incomplete messages. Used by the contact
+    extraction benchmark.
+    """
+    emails = []
+    for i in range(count):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        company = f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)}"
+        address = f"{name.lower().replace(' ', '.')}@{company.split()[0].lower()}.com"
+        phone = f"+{rng.randint(1, 99)} {rng.randint(100, 999)} {rng.randint(100000, 9999999)}"
+        text = ' '.join(rng.choices(WORDS, k=int(rng.lognormvariate(4.2, 0.9)) + 8)).capitalize() + '.'
+        kind = i % 5
+        if kind == 0:
+            emails.append((address, f"Hello, my name is {name} from {company}.\n{text}\nPhone: {phone}\nEmail: {address}"))
+        elif kind == 1:
+            emails.append(('noreply@wordpress.com',
+                           f"New quote request\n\n*{name}*\n*{company}*\n*{phone}*\n{address}\n\n{text}"))
+        elif kind == 2:
+            emails.append((address, f"Hola,\nNombre: {name}\nEmpresa: {company}\nTeléfono: {phone}\nCorreo: {address}\n\n{text}"))
+        elif kind == 3:
+            thread = '\n'.join(' '.join(rng.choices(WORDS, k=12)) for _ in range(rng.randint(20, 80)))
+            quoted = '\n'.join('> ' + ' '.join(rng.choices(WORDS, k=12)) for _ in range(rng.randint(20, 120)))
+            emails.append((address, f"Hi,\n{thread}\n\nOn Monday you wrote:\n{quoted}\n\n"
+                                    f"Best regards,\n{name}\n{company}\nPhone: {phone}"))
+        else:
+            emails.append((f"info@{company.split()[0].lower()}.com", text))
+    return emails
+
+
+def recent_timestamp(rng, now, days):
+    """Timestamp skewed towards recent days"""
+    offset = days * (rng.random() ** 2.5)
+    return (now - timedelta(days=offset)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def insert_chunks(conn, sql, rows, label, total):
+    started = time.time()
+    done = 0
+    for chunk in iter(lambda: list(itertools.islice(rows, CHUNK_SIZE)), []):
+        conn.executemany(sql, chunk)
+        done += len(chunk)
+        if done % (CHUNK_SIZE * 10) == 0 or done == total:
+            print(f"  {label:22} {done:>10,}/{total:,}", end='\r')
+    elapsed = time.time() - started
+    print(f"  ✓ {label:20} {total:>10,} rows in {elapsed:6.1f}s")
+
+
+def generate(db_path, volumes, seed=42, days=730):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    # Create the full schema (init.sql, migrations, FTS, counters) through the app
+    from database import Database
+    from search_index import rebuild_search_index
+    from counters import verify_counters
+    from message_store import encode_body, make_excerpt
+    from inquiry_dedup import backfill
+    scratch = Database(db_path)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-256000")
+
+    # Drop triggers during the bulk load; indexes they maintain are rebuilt afterwards
+    triggers = conn.execute("SELECT name, sql FROM sqlite_master WHERE type='trigger'").fetchall()
+    for name, _ in triggers:
+        conn.execute(f"DROP TRIGGER {name}")
+
+    conn.execute("BEGIN")
+
+    # Users (first one is an admin used by benchmark.py)
+    start_user = (conn.execute("SELECT MAX(id) FROM users").fetchone()[0] or 0) + 1
+    users = [
+        (f"bench{i}", 'x', f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", f"bench{i}@example.com",
+         'admin' if i == start_user else 'user')
+        for i in range(start_user, start_user + volumes['users'])
+    ]
+    conn.executemany(
+        "INSERT OR IGNORE INTO users (username, password_hash, full_name, email, role) VALUES (?, ?, ?, ?, ?)",
+        users
+    )
+    user_ids = [row[0] for row in conn.execute("SELECT id FROM users")]
+
+    # Clients
+    first_client = (conn.execute("SELECT MAX(id) FROM clients").fetchone()[0] or 0) + 1
+    clients = (
+        (f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+         f"client{first_client + i}@example{i % 997}.com",
+         f"+{rng.randint(1, 99)} {rng.randint(100000000, 999999999)}",
+         f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)}",
+         recent_timestamp(rng, now, days))
+        for i in range(volumes['clients'])
+    )
+    insert_chunks(conn, "INSERT INTO clients (full_name, email, phone, company, created_at) VALUES (?, ?, ?, ?, ?)",
+                  clients, 'clients', volumes['clients'])
+
+    # Publishers
+    category = weighted_picker(rng, CATEGORIES)
+    first_publisher = (conn.execute("SELECT MAX(id) FROM publishers").fetchone()[0] or 0) + 1
+    publishers = (
+        (f"{rng.choice(COMPANY_WORDS)} {rng.choice(WORDS).capitalize()} {first_publisher + i}",
+         f"editor{first_publisher + i}@publisher{i % 4999}.com",
+         category(),
+         'active' if rng.random() < 0.9 else 'inactive')
+        for i in range(volumes['publishers'])
+    )
+    insert_chunks(conn, "INSERT OR IGNORE INTO publishers (name, email, category, status) VALUES (?, ?, ?, ?)",
+                  publishers, 'publishers', volumes['publishers'])
+
+    # Inquiries: power-law clients, recent-heavy timestamps
+    bodies = make_body_pool(rng)
+    stored = [encode_body(b) for b in bodies]
+    excerpts = [make_excerpt(b) for b in bodies]
+    status = weighted_picker(rng, STATUS_WEIGHTS)
+    client = zipf_picker(rng, volumes['clients']) if volumes['clients'] else (lambda: None)
+    first_inquiry = (conn.execute("SELECT MAX(id) FROM inquiries").fetchone()[0] or 0) + 1
+    responded = []
+
+    def inquiries():
+        for i in range(volumes['inquiries']):
+            st = status()
+            received = recent_timestamp(rng, now, days)
+            if st in ('responded', 'closed'):
+                responded.append((first_inquiry + i, received))
+            client_id = first_client + client() - 1 if volumes['clients'] else None
+            body = rng.randrange(len(bodies))
+            yield (client_id, f"Quote request: {' '.join(rng.choices(WORDS, k=4))}",
+                   stored[body], excerpts[body], st, received,
+                   received if st in ('responded', 'closed') else None)
+
+    insert_chunks(conn, """
+        INSERT INTO inquiries (client_id, subject, message, message_excerpt, status, received_at, responded_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, inquiries(), 'inquiries', volumes['inquiries'])
+
+    # One response per responded/closed inquiry
+    first_response = (conn.execute("SELECT MAX(id) FROM responses").fetchone()[0] or 0) + 1
+    deal = weighted_picker(rng, [('open', 70), ('closed_won', 18), ('closed_lost', 12)])
+    responses = (
+        (inquiry_id, rng.choice(user_ids), rng.choice(bodies), sent_at,
+         1 if rng.random() < 0.35 else 0, 'email' if rng.random() < 0.3 else None, deal())
+        for inquiry_id, sent_at in responded
+    )
+    insert_chunks(conn, """
+        INSERT INTO responses (inquiry_id, user_id, response_text, sent_at, client_replied, follow_up_method, deal_status)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, responses, 'responses', len(responded))
+
+    # Conversation messages: a few long threads hold most messages
+    if responded and volumes['messages']:
+        thread = zipf_picker(rng, len(responded), exponent=0.8)
+        messages = (
+            (first_response + thread() - 1, 'agent' if i % 2 else 'client', rng.choice(stored),
+             recent_timestamp(rng, now, days))
+            for i in range(volumes['messages'])
+        )
+        insert_chunks(conn, "INSERT INTO conversation_messages (response_id, sender, message, sent_at) VALUES (?, ?, ?, ?)",
+                      messages, 'conversation_messages', volumes['messages'])
+
+    conn.commit()
+
+    # Restore triggers, then rebuild what they would have maintained
+    for _, sql in triggers:
+        conn.execute(sql)
+    conn.commit()
+    conn.close()
+
+    print("  Rebuilding search indexes, counters and content hashes...")
+    with scratch.get_connection(readonly=False) as rconn:
+        rebuild_search_index(rconn)
+        backfill(rconn)
+        verify_counters(rconn, repair=True)
+        rconn.execute("ANALYZE")
+    scratch.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill a scratch database with synthetic data")
+    parser.add_argument('--db', required=True, help="Scratch database path (created if missing)")
+    for table, default in DEFAULTS.items():
+        parser.add_argument(f"--{table}", type=int, default=None, help=f"Rows to add (default {default:,})")
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiply every default volume")
+    parser.add_argument('--days', type=int, default=730, help="History span for timestamps")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if os.path.abspath(args.db) == os.path.abspath('database/quotations.db'):
+        print("ERROR: refusing to generate data into the main database")
+        sys.exit(1)
+
+    # Point the app's global Database at the scratch file before importing it
+    os.environ['DATABASE_PATH'] = args.db
+
+    volumes = {
+        table: getattr(args, table) if getattr(args, table) is not None else int(default * args.scale)
+        for table, default in DEFAULTS.items()
+    }
+    volumes['users'] = max(volumes['users'], 1)
+
+    print("=" * 60)
+    print(f"SYNTHETIC DATA -> {args.db}")
+    print("=" * 60)
+    started = time.time()
+    generate(args.db, volumes, seed=args.seed, days=args.days)
+    print(f"\nDone in {time.time() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
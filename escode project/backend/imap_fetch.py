@@ -0,0 +1,315 @@
+"""
+Batched IMAP fetch of message headers and the plain-text part only.
+
+Instead of one 'FETCH n (RFC822)' round-trip per message (full raw
+messages, attachments included), messages are fetched in UID sets:
+
+    1. UID FETCH <set> (UID BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS (FROM SUBJECT)])
+    2. UID FETCH <set> (BODY.PEEK[<section>]<0.IMAP_MAX_BODY_BYTES>)
+       once per distinct text/plain section (usually one or two)
+
+so a sync costs a handful of commands and only the text bytes travel.
+BODY.PEEK never sets the \\Seen flag.
+
+Run from backend/:
+    python imap_fetch.py               # compare with RFC822 on the newest 20 messages
+    python imap_fetch.py --last 100
+"""
+from config import Config
+import base64
+import binascii
+import logging
+
+HEADER_FIELDS = 'BODY.PEEK[HEADER.FIELDS (FROM SUBJECT)]'
+
+
+def uid_set(uids):
+    """Compact IMAP sequence set for UIDs, e.g. [3, 5, 6, 7, 9] -> '3,5:7,9'"""
+    ranges = []
+    for uid in sorted(set(uids)):
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ','.join(str(a) if a == b else f'{a}:{b}' for a, b in ranges)
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _response_bytes(data):
+    """Bytes in an imaplib response (literals included)"""
+    return sum(
+        sum(len(part) for part in item) if isinstance(item, tuple) else len(item or b'')
+        for item in data
+    )
+
+
+def _join_response(data):
+    """Rebuild the raw untagged responses imaplib split around literals"""
+    parts = []
+    for item in data:
+        if isinstance(item, tuple):
+            parts.append(item[0] + b'\r\n' + item[1])
+        elif item:
+            parts.append(item)
+    return b' '.join(parts)
+
+
+def parse_response(buf):
+    """
+    Parse IMAP data (atoms, "strings", {n} literals, NIL and nested lists).
+
+    Returns:
+        List of values: bytes, None (NIL) or lists
+    """
+    stack = [[]]
+    i, n = 0, len(buf)
+    while i < n:
+        ch = buf[i:i + 1]
+        if ch in (b' ', b'\r', b'\n'):
+            i += 1
+        elif ch == b'(':
+            stack.append([])
+            i += 1
+        elif ch == b')':
+            done = stack.pop()
+            stack[-1].append(done)
+            i += 1
+        elif ch == b'"':
+            out = bytearray()
+            i += 1
+            while buf[i:i + 1] != b'"':
+                if buf[i:i + 1] == b'\\':
+                    i += 1
+                out += buf[i:i + 1]
+                i += 1
+            stack[-1].append(bytes(out))
+            i += 1
+        elif ch == b'{':
+            close = buf.index(b'}', i)
+            size = int(buf[i + 1:close])
+            start = close + 1
+            if buf[start:start + 2] == b'\r\n':
+                start += 2
+            stack[-1].append(buf[start:start + size])
+            i = start + size
+        else:
+            # Atom; "[...]" sections like BODY[HEADER.FIELDS (FROM)] stay whole
+            j, depth = i, 0
+            while j < n:
+                c = buf[j:j + 1]
+                if c == b'[':
+                    depth += 1
+                elif c == b']':
+                    depth -= 1
+                elif depth == 0 and c in (b' ', b'(', b')', b'\r', b'\n'):
+                    break
+                j += 1
+            atom = buf[i:j]
+            stack[-1].append(None if atom.upper() == b'NIL' else atom)
+            i = j
+    return stack[0]
+
+
+def parse_fetch(data):
+    """
+    Returns:
+        Dict of UID -> {data item name (upper-case bytes): value}.
+        Unsolicited FETCH responses without a UID are dropped.
+    """
+    tokens = parse_response(_join_response(data))
+    messages = {}
+    for items in tokens:
+        if not isinstance(items, list):
+            continue  # message sequence number
+        fields = {}
+        for k in range(0, len(items) - 1, 2):
+            name = items[k].upper() if isinstance(items[k], bytes) else items[k]
+            fields[name] = items[k + 1]
+        if b'UID' in fields:
+            messages[int(fields[b'UID'])] = fields
+    return messages
+
+
+def _text(value):
+    return value.decode('ascii', errors='replace').lower() if isinstance(value, bytes) else None
+
+
+def _params(value):
+    """Body parameter list ("charset" "utf-8" ...) as a lower-case key dict"""
+    if not isinstance(value, list):
+        return {}
+    return {_text(value[k]): value[k + 1] for k in range(0, len(value) - 1, 2)}
+
+
+def find_text_part(structure, section=''):
+    """
+    The first text/plain part that is not an attachment, like
+    get_email_body() walking the message (attached messages are skipped).
+    A single-part message is part '1' whatever its text subtype.
+
+    Returns:
+        Dict with section, encoding, charset and size, or None
+    """
+    if not isinstance(structure, list) or not structure:
+        return None
+
+    if isinstance(structure[0], list):
+        # multipart: child parts, then the subtype and extension data
+        number = 0
+        for child in structure:
+            if not isinstance(child, list):
+                break
+            number += 1
+            found = find_text_part(child, f'{section}.{number}' if section else str(number))
+            if found:
+                return found
+        return None
+
+    media_type, subtype = _text(structure[0]), _text(structure[1])
+    if media_type != 'text' or (section and subtype != 'plain'):
+        return None
+    # text parts: type, subtype, params, id, description, encoding, size, lines, md5, disposition
+    disposition = structure[9] if len(structure) > 9 else None
+    if isinstance(disposition, list) and _text(disposition[0]) == 'attachment':
+        return None
+    charset = _params(structure[2]).get('charset')
+    return {
+        'section': section or '1',
+        'encoding': _text(structure[5]) or '7bit',
+        'charset': charset.decode('ascii', errors='replace') if charset else None,
+        'size': int(structure[6]) if structure[6] else 0,
+    }
+
+
+def decode_part(raw, encoding, charset, truncated=False):
+    """Text of a fetched body part (possibly cut short at the size limit)"""
+    raw = raw or b''
+    if encoding == 'base64':
+        raw = b''.join(raw.split())
+        if truncated:
+            raw = raw[:len(raw) - len(raw) % 4]
+        data = base64.b64decode(raw)
+    elif encoding == 'quoted-printable':
+        if truncated:
+            # Drop an escape sequence cut in half
+            cut = raw.rfind(b'=', max(len(raw) - 2, 0))
+            if cut != -1:
+                raw = raw[:cut]
+        data = binascii.a2b_qp(raw)
+    else:
+        data = raw
+    try:
+        return data.decode(charset or 'utf-8', errors='replace')
+    except LookupError:
+        return data.decode('utf-8', errors='replace')
+
+
+def fetch_messages(mail, uids, max_body_bytes=None, batch_size=None, stats=None):
+    """
+    Fetch headers and the plain-text body of messages in a selected mailbox.
+
+    Args:
+        mail: Logged-in imaplib connection with the mailbox selected
+        uids: Message UIDs
+        max_body_bytes: Bytes of each text part fetched (0 = no limit)
+        batch_size: UIDs per FETCH command
+        stats: Optional dict; 'commands' and 'bytes' are added to it
+
+    Returns:
+        List of {'uid', 'headers' (raw bytes), 'body', 'truncated'} in UID
+        order. Messages expunged meanwhile are missing.
+
+    Raises:
+        imaplib.IMAP4.error when a FETCH fails
+    """
+    max_body_bytes = Config.IMAP_MAX_BODY_BYTES if max_body_bytes is None else max_body_bytes
+    batch_size = batch_size or Config.IMAP_FETCH_BATCH
+    stats = stats if stats is not None else {}
+    stats.setdefault('commands', 0)
+    stats.setdefault('bytes', 0)
+
+    def fetch(uid_list, items):
+        status, data = mail.uid('FETCH', uid_set(uid_list), items)
+        if status != 'OK':
+            raise mail.error(f"UID FETCH {items} failed: {data}")
+        stats['commands'] += 1
+        stats['bytes'] += _response_bytes(data)
+        return parse_fetch(data)
+
+    # 1. Structure and headers
+    meta = {}
+    for chunk in _chunks(sorted(uids), batch_size):
+        meta.update(fetch(chunk, f'(UID BODYSTRUCTURE {HEADER_FIELDS})'))
+
+    messages = {}
+    by_section = {}
+    for uid, fields in meta.items():
+        headers = next((v for k, v in fields.items() if k.startswith(b'BODY[HEADER')), b'')
+        part = find_text_part(fields.get(b'BODYSTRUCTURE'))
+        messages[uid] = {'uid': uid, 'headers': headers or b'', 'body': '', 'truncated': False}
+        if part:
+            messages[uid]['part'] = part
+            by_section.setdefault(part['section'], []).append(uid)
+
+    # 2. Text parts, one command per section and batch
+    partial = f'<0.{max_body_bytes}>' if max_body_bytes > 0 else ''
+    for section, section_uids in by_section.items():
+        prefix = f'BODY[{section}]'.encode()
+        for chunk in _chunks(section_uids, batch_size):
+            for uid, fields in fetch(chunk, f'(UID BODY.PEEK[{section}]{partial})').items():
+                if uid not in messages:
+                    continue
+                raw = next((v for k, v in fields.items() if k.startswith(prefix)), b'')
+                part = messages[uid]['part']
+                truncated = bool(partial) and part['size'] > max_body_bytes
+                messages[uid]['body'] = decode_part(raw, part['encoding'], part['charset'], truncated)
+                messages[uid]['truncated'] = truncated
+                if truncated:
+                    logging.info(f"Body of UID {uid} cut at {max_body_bytes} of {part['size']} bytes")
+
+    for message in messages.values():
+        message.pop('part', None)
+    return [messages[uid] for uid in sorted(messages)]
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    from email_handler import email_handler
+
+    last = int(sys.argv[sys.argv.index('--last') + 1]) if '--last' in sys.argv else 20
+
+    print("=" * 60)
+    print(f"IMAP FETCH ({Config.IMAP_MAILBOX}, newest {last} messages)")
+    print("=" * 60)
+
+    mail = email_handler.connect_imap()
+    try:
+        mail.select(Config.IMAP_MAILBOX, readonly=True)
+        status, data = mail.uid('SEARCH', None, 'ALL')
+        uids = [int(u) for u in data[0].split()][-last:]
+        if not uids:
+            print("  - Mailbox is empty")
+            sys.exit(0)
+
+        started = time.perf_counter()
+        full_bytes = 0
+        for uid in uids:
+            status, data = mail.uid('FETCH', str(uid), '(RFC822)')
+            full_bytes += _response_bytes(data)
+        full_s = time.perf_counter() - started
+
+        stats = {}
+        started = time.perf_counter()
+        fetched = fetch_messages(mail, uids, stats=stats)
+        batched_s = time.perf_counter() - started
+    finally:
+        mail.logout()
+
+    print(f"  RFC822 per message: {len(uids):>5} commands  {full_bytes / 1024:10.1f} KB  {full_s:6.2f}s")
+    print(f"  Batched text parts: {stats['commands']:>5} commands  {stats['bytes'] / 1024:10.1f} KB  {batched_s:6.2f}s")
+    print(f"  ✓ {len(fetched)} messages, {sum(m['truncated'] for m in fetched)} bodies truncated")
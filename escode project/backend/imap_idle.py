@@ -0,0 +1,338 @@
+"""
+Long-lived IMAP session that waits for new mail with IDLE (RFC 2177).
+
+One connection stays logged in with the mailbox selected read-only.
+IDLE is re-issued every IMAP_IDLE_TIMEOUT seconds (servers drop idle
+sessions after 10-30 minutes), with a UID SEARCH in between that doubles
+as the keepalive. Servers without IDLE are polled with the same UID
+SEARCH every IMAP_POLL_INTERVAL seconds on the same connection. New mail
+is any UID at or above the UIDNEXT seen so far, so mail arriving in the
+same interval as an expunge is not missed. A dropped connection is
+reopened with exponential backoff (capped at IMAP_RECONNECT_MAX_DELAY);
+the backoff only resets after a complete wait cycle.
+
+imaplib's buffered reader is replaced by SocketFile for the session, so
+imaplib and the IDLE wait read from one buffer: untagged lines read
+ahead by either side are never lost.
+
+When mail arrives (or after every reconnect, to catch up) the on_mail
+callback runs in a separate dispatch thread; bursts of events while it
+runs collapse into one more call.
+
+Run from backend/:
+    python imap_idle.py      # watch the mailbox and print events
+"""
+from config import Config
+from datetime import datetime
+import logging
+import random
+import re
+import select
+import ssl
+import threading
+import time
+
+EXISTS_RE = re.compile(rb'^\* \d+ EXISTS')
+
+
+class SocketFile:
+    """
+    Stand-in for imaplib's mail.file reading the socket directly (select +
+    recv), so waiting for the next line can time out without breaking the
+    connection. Bytes imaplib had already buffered are carried over.
+    """
+
+    def __init__(self, sock, wrapped=None):
+        self.sock = sock
+        self.buf = bytearray()
+        self.wrapped = wrapped
+        if wrapped is not None:
+            self.buf += self._take_buffered(wrapped)
+
+    def _take_buffered(self, file):
+        """What the buffered reader already pulled off the socket, without blocking"""
+        timeout = self.sock.gettimeout()
+        self.sock.setblocking(False)
+        try:
+            return file.read1(65536) or b''
+        except (BlockingIOError, ssl.SSLWantReadError):
+            return b''
+        finally:
+            self.sock.settimeout(timeout)
+
+    def _fill(self, deadline, stop_event=None):
+        """Receive more bytes; False at the deadline or on stop"""
+        while True:
+            wait = 1.0 if deadline is None else min(deadline - time.monotonic(), 1.0)
+            if wait <= 0 or (stop_event is not None and stop_event.is_set()):
+                return False
+            pending = getattr(self.sock, 'pending', None)
+            if not (pending and pending()):
+                readable, _, _ = select.select([self.sock], [], [], wait)
+                if not readable:
+                    continue
+            try:
+                chunk = self.sock.recv(65536)
+            except ssl.SSLWantReadError:
+                continue
+            if not chunk:
+                raise ConnectionError("IMAP server closed the connection")
+            self.buf += chunk
+            return True
+
+    def _blocking_fill(self):
+        timeout = self.sock.gettimeout()
+        if not self._fill(None if timeout is None else time.monotonic() + timeout):
+            raise TimeoutError("IMAP read timed out")
+
+    def wait_line(self, deadline, stop_event=None):
+        """
+        Returns:
+            The next line without CRLF, or None at the deadline or on stop
+        """
+        while b'\r\n' not in self.buf:
+            if not self._fill(deadline, stop_event):
+                return None
+        end = self.buf.index(b'\r\n')
+        line = bytes(self.buf[:end])
+        del self.buf[:end + 2]
+        return line
+
+    # File interface used by imaplib
+    def readline(self, size=-1):
+        while b'\n' not in self.buf and not (0 <= size <= len(self.buf)):
+            self._blocking_fill()
+        end = self.buf.find(b'\n')
+        n = end + 1 if end >= 0 else len(self.buf)
+        if size >= 0:
+            n = min(n, size)
+        line = bytes(self.buf[:n])
+        del self.buf[:n]
+        return line
+
+    def read(self, size):
+        while len(self.buf) < size:
+            self._blocking_fill()
+        data = bytes(self.buf[:size])
+        del self.buf[:size]
+        return data
+
+    def close(self):
+        if self.wrapped is not None:
+            self.wrapped.close()
+
+
+class MailboxWatcher:
+    """
+    Keeps one IMAP connection open and calls on_mail() when mail arrives.
+
+    Args:
+        connect: Callable returning a logged-in imaplib connection
+        on_mail: Callable run (in the dispatch thread) when new mail is seen
+        mailbox: Mailbox to watch (default IMAP_MAILBOX)
+    """
+
+    def __init__(self, connect, on_mail, mailbox=None, idle_timeout=None,
+                 poll_interval=None, max_delay=None):
+        self.connect = connect
+        self.on_mail = on_mail
+        self.mailbox = mailbox or Config.IMAP_MAILBOX
+        self.idle_timeout = idle_timeout or Config.IMAP_IDLE_TIMEOUT
+        self.poll_interval = poll_interval or Config.IMAP_POLL_INTERVAL
+        self.max_delay = max_delay or Config.IMAP_RECONNECT_MAX_DELAY
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._threads = []
+        self._stats = {
+            'mode': None, 'connected': False, 'connections': 0, 'failures': 0,
+            'last_error': None, 'last_event': None, 'last_wake': None, 'wakes': 0,
+        }
+
+    # --- IMAP session ---
+    def _idle(self, mail):
+        """
+        One IDLE cycle: returns True as soon as the server reports new
+        mail, False after idle_timeout (or on stop).
+        """
+        reader = mail.file
+        tag = mail._new_tag()
+        mail.send(tag + b' IDLE\r\n')
+        arrived = False
+        while True:
+            line = reader.wait_line(time.monotonic() + 30)
+            if line is None:
+                raise TimeoutError("No reply to IDLE")
+            if line.startswith(b'+'):
+                break
+            if not line.startswith(b'*'):
+                raise mail.error(f"IDLE refused: {line!r}")
+            arrived = arrived or bool(EXISTS_RE.match(line))
+
+        deadline = time.monotonic() + self.idle_timeout
+        while not arrived:
+            line = reader.wait_line(deadline, self._stop_event)
+            if line is None:
+                break
+            if line.startswith(b'* BYE'):
+                raise ConnectionError(line.decode(errors='replace'))
+            arrived = bool(EXISTS_RE.match(line))
+
+        mail.send(b'DONE\r\n')
+        while True:
+            line = reader.wait_line(time.monotonic() + 30)
+            if line is None:
+                raise TimeoutError("No reply to IDLE DONE")
+            if line.startswith(tag):
+                if not line[len(tag):].lstrip().upper().startswith(b'OK'):
+                    raise mail.error(f"IDLE failed: {line!r}")
+                return arrived
+            arrived = arrived or bool(EXISTS_RE.match(line))
+
+    def _uidnext(self, mail):
+        """UIDNEXT of the selected mailbox: from the SELECT response, else one past the newest UID"""
+        uidnext = mail.response('UIDNEXT')[1][-1]
+        if uidnext is not None:
+            return int(uidnext)
+        status, data = mail.uid('SEARCH', None, 'UID *')
+        if status != 'OK':
+            raise mail.error(f"UID SEARCH failed: {data!r}")
+        uids = [int(u) for u in b' '.join(d for d in data if d).split()]
+        return max(uids, default=0) + 1
+
+    def _new_mail(self, mail, uidnext):
+        """
+        UID SEARCH for messages at or above uidnext (also the keepalive).
+
+        Returns:
+            (new mail?, updated uidnext)
+        """
+        status, data = mail.uid('SEARCH', None, f'UID {uidnext}:*')
+        if status != 'OK':
+            raise mail.error(f"UID SEARCH failed: {data!r}")
+        # Unread untagged responses would pile up on a long-lived connection
+        mail.untagged_responses.clear()
+        # "n:*" also matches the newest message when every UID is below n
+        uids = [u for u in (int(u) for u in b' '.join(d for d in data if d).split()) if u >= uidnext]
+        if not uids:
+            return False, uidnext
+        return True, max(uids) + 1
+
+    def _poll(self, mail, uidnext):
+        """UID SEARCH poll for servers without IDLE; returns (new mail?, uidnext)"""
+        if self._stop_event.wait(self.poll_interval):
+            return False, uidnext
+        return self._new_mail(mail, uidnext)
+
+    def _session(self):
+        """Connect, select, then wait for mail until the connection fails or stop"""
+        mail = self.connect()
+        self._stats['connections'] += 1
+        try:
+            mail.file = SocketFile(mail.sock, mail.file)
+            status, data = mail.select(self.mailbox, readonly=True)
+            if status != 'OK':
+                raise mail.error(f"Cannot open mailbox {self.mailbox}")
+            uidnext = self._uidnext(mail)
+            use_idle = b'IDLE' in mail.capability()[1][0].upper().split()
+            self._stats.update(mode='idle' if use_idle else 'poll', connected=True)
+            logging.info(f"Watching {self.mailbox} ({'IDLE push' if use_idle else f'UID SEARCH every {self.poll_interval}s'})")
+
+            # Catch up on mail that arrived while disconnected
+            self.wake()
+            while not self._stop_event.is_set():
+                if use_idle:
+                    arrived = self._idle(mail)
+                    if self._stop_event.is_set():
+                        break
+                    # Keepalive; also catches mail that came in between IDLE cycles
+                    found, uidnext = self._new_mail(mail, uidnext)
+                    arrived = arrived or found
+                else:
+                    arrived, uidnext = self._poll(mail, uidnext)
+                # Only a complete wait cycle proves the session healthy
+                self._stats['failures'] = 0
+                if arrived:
+                    self._stats['last_event'] = datetime.now().isoformat(timespec='seconds')
+                    self.wake()
+        finally:
+            self._stats['connected'] = False
+            try:
+                mail.logout()
+            except Exception:
+                pass
+
+    def _watch_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                self._session()
+            except Exception as e:
+                self._stats['failures'] += 1
+                self._stats['last_error'] = str(e)
+                delay = min(self.max_delay, 2 ** self._stats['failures'])
+                delay += random.uniform(0, delay / 2)
+                logging.error(f"IMAP watcher disconnected ({str(e)}), reconnecting in {delay:.0f}s")
+                self._stop_event.wait(delay)
+
+    # --- Ingestion ---
+    def wake(self):
+        """Ask the dispatch thread to run on_mail (coalesces repeated calls)"""
+        self._wake_event.set()
+
+    def _dispatch_loop(self):
+        while not self._stop_event.is_set():
+            if not self._wake_event.wait(1.0):
+                continue
+            self._wake_event.clear()
+            try:
+                self.on_mail()
+                self._stats['wakes'] += 1
+                self._stats['last_wake'] = datetime.now().isoformat(timespec='seconds')
+            except Exception as e:
+                logging.error(f"Email ingestion after IMAP event failed: {str(e)}")
+
+    # --- Control ---
+    def start(self):
+        """Start the watcher and dispatch daemon threads"""
+        if self.is_running():
+            logging.warning("IMAP watcher already running")
+            return
+        self._stop_event.clear()
+        self._threads = [
+            threading.Thread(target=self._watch_loop, name='imap-watcher', daemon=True),
+            threading.Thread(target=self._dispatch_loop, name='imap-dispatch', daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=None):
+        """Leave IDLE, log out and stop both threads"""
+        self._stop_event.set()
+        for thread in self._threads:
+            if thread.is_alive():
+                thread.join(timeout)
+
+    def is_running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def status(self):
+        """Connection state and counters (connections = TLS handshakes so far)"""
+        return dict(self._stats, running=self.is_running(), mailbox=self.mailbox)
+
+
+if __name__ == '__main__':
+    from email_handler import email_handler
+
+    print("=" * 60)
+    print(f"IMAP WATCHER ({Config.IMAP_SERVER}, {Config.IMAP_MAILBOX})")
+    print("=" * 60)
+
+    def report():
+        print(f"  ✓ {datetime.now():%H:%M:%S} {email_handler.count_new_emails()} new emails waiting")
+
+    watcher = MailboxWatcher(email_handler.connect_imap, report)
+    watcher.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        watcher.stop(5)
@@ -0,0 +1,104 @@
+"""
+Content-hash deduplication for synced inquiries.
+
+inquiries.content_hash is a SHA-256 over the client id and the
+whitespace-normalized subject and body, with a UNIQUE index. Email sync
+inserts with ON CONFLICT(content_hash) DO NOTHING, so spotting a
+duplicate is one index probe instead of comparing stored bodies.
+
+Synced inquiries are stored with source = 'email'. Inquiries created by
+hand (source NULL) keep a NULL hash, which never conflicts, so they never
+block a synced email; the backfill only hashes email-sourced rows. Rows
+stored before migration 5 have no recorded origin: that migration hashed
+them all, as the body comparison it replaced matched them too.
+
+Run from backend/:
+    python inquiry_dedup.py     # hash synced inquiries stored without one
+"""
+import hashlib
+from message_store import decode_body
+
+INSERT_SQL = """
+    INSERT INTO inquiries (client_id, subject, message, message_excerpt, status, received_at, content_hash, source)
+    VALUES (?, ?, ?, ?, ?, ?, ?, 'email')
+    ON CONFLICT(content_hash) DO NOTHING
+"""
+
+
+def _normalize(text):
+    return ' '.join((text or '').split())
+
+
+def content_hash(client_id, subject, body):
+    """Hex SHA-256 identifying an inquiry's client, subject and body"""
+    key = '\x1f'.join((str(client_id or ''), _normalize(subject), _normalize(body)))
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def backfill_batch(conn, after_id=0, limit=1000, email_only=True):
+    """
+    Hash one batch of synced inquiries that have no content_hash. The
+    caller commits. Rows whose hash is already taken (duplicates stored
+    before the hash existed) are left NULL.
+
+    Args:
+        email_only: Only rows with source = 'email' (False hashes every
+                    row; used once by migration 5, before sources existed)
+
+    Returns:
+        (rows hashed, duplicates skipped, last id scanned or None when done)
+    """
+    rows = conn.execute(f"""
+        SELECT id, client_id, subject, message FROM inquiries
+        WHERE id > ? AND content_hash IS NULL {"AND source = 'email'" if email_only else ''}
+        ORDER BY id LIMIT ?
+    """, (after_id, limit)).fetchall()
+    if not rows:
+        return 0, 0, None
+
+    hashed = 0
+    for row_id, client_id, subject, message in rows:
+        cursor = conn.execute(
+            "UPDATE OR IGNORE inquiries SET content_hash = ? WHERE id = ?",
+            (content_hash(client_id, subject, decode_body(message)), row_id)
+        )
+        hashed += cursor.rowcount
+    return hashed, len(rows) - hashed, rows[-1][0]
+
+
+def backfill(conn, limit=1000, email_only=True):
+    """
+    Hash every synced inquiry without a content_hash, in batches on one
+    connection (the caller commits). See backfill_batch for email_only.
+
+    Returns:
+        (rows hashed, duplicates skipped)
+    """
+    hashed = skipped = 0
+    last_id = 0
+    while last_id is not None:
+        done, dupes, last_id = backfill_batch(conn, last_id, limit, email_only)
+        hashed += done
+        skipped += dupes
+    return hashed, skipped
+
+
+if __name__ == '__main__':
+    from database import db
+
+    print("=" * 60)
+    print("INQUIRY CONTENT HASH BACKFILL")
+    print("=" * 60)
+
+    hashed = skipped = 0
+    last_id = 0
+    while last_id is not None:
+        # One transaction per batch keeps the writer lock short
+        with db.get_connection(readonly=False) as conn:
+            done, dupes, last_id = backfill_batch(conn, last_id)
+        hashed += done
+        skipped += dupes
+
+    print(f"  ✓ {hashed} inquiries hashed")
+    if skipped:
+        print(f"  - {skipped} existing duplicates left without a hash")
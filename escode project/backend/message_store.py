@@ -0,0 +1,147 @@
+"""
+Compressed storage for message bodies.
+
+Inquiry and conversation message bodies longer than
+MESSAGE_COMPRESS_MIN_BYTES are stored as a BLOB holding a format marker
+followed by zlib data; shorter bodies stay plain TEXT. Bodies are only
+decompressed when read through decode_body() (or message_body() in SQL,
+registered on every pooled connection), and list views read the short
+inquiries.message_excerpt column instead of the body.
+
+Run from backend/:
+    python message_store.py            # compress existing large bodies
+    python message_store.py --status   # show stored sizes only
+"""
+import zlib
+from config import Config
+
+# Marker + format version at the start of every compressed body
+COMPRESSED_MARKER = b'QZ1\x00'
+
+# Tables and columns holding message bodies
+BODY_COLUMNS = [('inquiries', 'message'), ('conversation_messages', 'message')]
+
+# Inquiry columns read by list views (the excerpt instead of the body)
+INQUIRY_LIST_COLUMNS = ['id', 'client_id', 'subject', 'message_excerpt', 'status',
+                        'received_at', 'responded_at', 'assigned_to']
+
+
+def encode_body(text, min_bytes=None):
+    """
+    Value to store for a message body.
+
+    Returns:
+        Marker + zlib BLOB when the UTF-8 body reaches min_bytes and
+        compression pays off, otherwise the text unchanged
+    """
+    if not isinstance(text, str):
+        return text
+    min_bytes = Config.MESSAGE_COMPRESS_MIN_BYTES if min_bytes is None else min_bytes
+    raw = text.encode('utf-8')
+    if min_bytes <= 0 or len(raw) < min_bytes:
+        return text
+    packed = COMPRESSED_MARKER + zlib.compress(raw, Config.MESSAGE_COMPRESS_LEVEL)
+    return packed if len(packed) < len(raw) else text
+
+
+def decode_body(value):
+    """Message text from a stored value (plain TEXT, compressed BLOB or None)"""
+    if isinstance(value, bytes):
+        if value.startswith(COMPRESSED_MARKER):
+            return zlib.decompress(value[len(COMPRESSED_MARKER):]).decode('utf-8')
+        return value.decode('utf-8', errors='replace')
+    return value
+
+
+def make_excerpt(text, length=None):
+    """First characters of a body on one line, for list views"""
+    if text is None:
+        return None
+    length = Config.MESSAGE_EXCERPT_CHARS if length is None else length
+    excerpt = ' '.join(decode_body(text)[:length * 2].split())
+    return excerpt[:length].rstrip()
+
+
+def decode_row(row, *columns):
+    """Dict copy of a row with the given body columns decompressed"""
+    if row is None:
+        return None
+    data = dict(row)
+    for column in columns or ('message',):
+        if column in data:
+            data[column] = decode_body(data[column])
+    return data
+
+
+def register_functions(conn):
+    """
+    SQL functions used by the app's TEMP search-index triggers (see
+    search_index.install_body_triggers), migrations and exports:
+    message_body(x) and body_excerpt(x). Persistent schema objects never
+    call them, so other connections can still write these tables.
+    """
+    conn.create_function('message_body', 1, decode_body, deterministic=True)
+    conn.create_function('body_excerpt', 1, make_excerpt, deterministic=True)
+
+
+def storage_stats(conn):
+    """
+    Returns:
+        Dict of 'table.column' -> rows, compressed rows and stored bytes
+    """
+    stats = {}
+    for table, column in BODY_COLUMNS:
+        row = conn.execute(f"""
+            SELECT COUNT(*), IFNULL(SUM(typeof({column}) = 'blob'), 0), IFNULL(SUM(length(CAST({column} AS BLOB))), 0)
+            FROM {table}
+        """).fetchone()
+        stats[f"{table}.{column}"] = {'rows': row[0], 'compressed': row[1], 'bytes': row[2]}
+    return stats
+
+
+def compact_batch(conn, table, column, after_id=0, limit=1000):
+    """
+    Compress one batch of plain bodies at or above the size threshold.
+    The caller commits.
+
+    Returns:
+        (rows compressed, last id scanned or None when done)
+    """
+    rows = conn.execute(f"""
+        SELECT id, {column} FROM {table}
+        WHERE id > ? AND typeof({column}) = 'text' AND length(CAST({column} AS BLOB)) >= ?
+        ORDER BY id LIMIT ?
+    """, (after_id, Config.MESSAGE_COMPRESS_MIN_BYTES, limit)).fetchall()
+    if not rows:
+        return 0, None
+
+    updates = []
+    for row_id, text in rows:
+        value = encode_body(text)
+        if value is not text:
+            updates.append((value, row_id))
+    conn.executemany(f"UPDATE {table} SET {column} = ? WHERE id = ?", updates)
+    return len(updates), rows[-1][0]
+
+
+if __name__ == '__main__':
+    import sys
+    from database import db
+
+    print("=" * 60)
+    print(f"MESSAGE BODY STORAGE (compress >= {Config.MESSAGE_COMPRESS_MIN_BYTES} bytes)")
+    print("=" * 60)
+
+    if '--status' not in sys.argv:
+        for table, column in BODY_COLUMNS:
+            total, last_id = 0, 0
+            while last_id is not None:
+                # One transaction per batch keeps the writer lock short
+                with db.get_connection(readonly=False) as conn:
+                    done, last_id = compact_batch(conn, table, column, last_id)
+                total += done
+            print(f"  ✓ {table}.{column}: {total} bodies compressed")
+
+    with db.get_connection(readonly=True) as conn:
+        for name, s in storage_stats(conn).items():
+            print(f"  {name:32} {s['rows']:>9} rows  {s['compressed']:>9} compressed  {s['bytes'] / 1048576:8.1f} MB")
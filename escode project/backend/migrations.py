@@ -0,0 +1,357 @@
+"""
+Versioned schema migrations.
+
+Applied versions are recorded in schema_migrations; pending migrations run
+in order at startup (Database._initialize_database) or from the CLI. Each
+migration runs in its own IMMEDIATE transaction, so concurrent starts
+apply it exactly once.
+
+Run from backend/:
+    python migrations.py            # apply pending migrations
+    python migrations.py --status   # list applied / pending versions
+    python migrations.py --check    # fail if a hot query plan does a full scan
+"""
+import logging
+import re
+from search_index import fts_available, ensure_search_index, rebuild_search_index
+from counters import ensure_counters
+from inquiry_dedup import backfill
+
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _add_column(conn, table, column, definition):
+    if column not in _columns(conn, table):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _migrate_legacy_schema(conn):
+    """
+    Columns and tables previously added by hand (create_tables.py,
+    migrate_add_client_replied.py, migrate_add_follow_up.py,
+    migrate_create_conversation_messages.py). Idempotent, so databases
+    that already ran those scripts are left unchanged.
+    """
+    _add_column(conn, 'users', 'role', "TEXT DEFAULT 'user'")
+    _add_column(conn, 'users', 'phone', "TEXT")
+    _add_column(conn, 'users', 'position', "TEXT DEFAULT 'Sales Representative'")
+    _add_column(conn, 'clients', 'company', "TEXT")
+    _add_column(conn, 'responses', 'client_replied', "INTEGER DEFAULT 0")
+    _add_column(conn, 'responses', 'follow_up_method', "TEXT DEFAULT NULL")
+    _add_column(conn, 'responses', 'deal_status', "TEXT DEFAULT 'open'")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS conversation_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            response_id INTEGER NOT NULL,
+            sender TEXT NOT NULL,
+            message TEXT NOT NULL,
+            sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (response_id) REFERENCES responses(id) ON DELETE CASCADE
+        )
+    """)
+
+
+# Indexes for every lookup, filter and sort in app.py
+HOT_PATH_INDEXES = [
+    # Client resolution in sync_emails
+    "CREATE INDEX IF NOT EXISTS idx_clients_name_company ON clients(full_name, company)",
+    # delete_client check, reply auto-detection and duplicate check in sync_emails
+    "CREATE INDEX IF NOT EXISTS idx_inquiries_client ON inquiries(client_id, subject)",
+    # get_inquiries?status=... ORDER BY received_at
+    "CREATE INDEX IF NOT EXISTS idx_inquiries_status_received ON inquiries(status, received_at)",
+    # get_publishers / get_responses ORDER BY keys
+    "CREATE INDEX IF NOT EXISTS idx_publishers_name ON publishers(name)",
+    "CREATE INDEX IF NOT EXISTS idx_responses_sent ON responses(sent_at DESC)",
+    # get_response conversation thread ORDER BY sent_at (supersedes idx_conversation_response)
+    "CREATE INDEX IF NOT EXISTS idx_conversation_response_sent ON conversation_messages(response_id, sent_at)",
+    "DROP INDEX IF EXISTS idx_conversation_response",
+    # Prefix of idx_inquiries_status_received
+    "DROP INDEX IF EXISTS idx_inquiries_status",
+]
+
+
+def _migrate_hot_path_indexes(conn):
+    for statement in HOT_PATH_INDEXES:
+        conn.execute(statement)
+
+
+# Tables whose changes invalidate ETags of the GET routes reading them
+VERSIONED_TABLES = ['users', 'clients', 'inquiries', 'responses', 'publishers', 'conversation_messages']
+
+
+def _migrate_table_versions(conn):
+    """
+    table_versions.version is bumped by a trigger on every INSERT, UPDATE
+    and DELETE, giving a change counter that is shared by every connection
+    and process (PRAGMA data_version is only meaningful per connection).
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    for table in VERSIONED_TABLES:
+        conn.execute("INSERT OR IGNORE INTO table_versions (table_name, version) VALUES (?, 0)", (table,))
+        for suffix, event in (('ai', 'INSERT'), ('au', 'UPDATE'), ('ad', 'DELETE')):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS versions_{table}_{suffix} AFTER {event} ON {table} BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';
+                END
+            """)
+
+
+def _migrate_message_excerpts(conn):
+    """
+    inquiries.message_excerpt lets list views skip the (possibly
+    compressed) body. The inquiries FTS index is rebuilt so it indexes
+    the decoded bodies.
+    """
+    _add_column(conn, 'inquiries', 'message_excerpt', "TEXT")
+    conn.execute("UPDATE inquiries SET message_excerpt = body_excerpt(message) WHERE message_excerpt IS NULL")
+    if fts_available(conn):
+        rebuild_search_index(conn, ['inquiries'])
+
+
+def _migrate_inquiry_content_hash(conn):
+    """
+    inquiries.content_hash (see inquiry_dedup.py) replaces the body
+    comparison of the email sync duplicate check with a unique index probe.
+    """
+    _add_column(conn, 'inquiries', 'content_hash', "TEXT")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_inquiries_content_hash ON inquiries(content_hash)")
+    # Stored rows have no recorded origin yet (see migration 9): hash them all
+    hashed, skipped = backfill(conn, email_only=False)
+    logging.info(f"Hashed {hashed} inquiries ({skipped} existing duplicates left unhashed)")
+
+
+def _migrate_maintenance_jobs(conn):
+    """Last-run state and run leases of the schedulet.py jobs (epoch seconds)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS maintenance_jobs (
+            name TEXT PRIMARY KEY,
+            last_started REAL,
+            last_finished REAL,
+            last_status TEXT,
+            last_duration_ms REAL,
+            last_result TEXT,
+            lease_until REAL
+        )
+    """)
+
+
+def _migrate_imap_sync_state(conn):
+    """Per-mailbox UID checkpoint of the IMAP sync"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS imap_sync_state (
+            mailbox TEXT PRIMARY KEY,
+            uidvalidity INTEGER NOT NULL,
+            last_uid INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _migrate_builtin_search_triggers(conn):
+    """
+    Rebuild the inquiries FTS index as one that stores its decoded text,
+    so its triggers no longer call message_body() and connections without
+    the app's SQL functions can write inquiries again.
+    """
+    if fts_available(conn) and _columns(conn, 'inquiries'):
+        rebuild_search_index(conn, ['inquiries'])
+
+
+def _migrate_inquiry_source(conn):
+    """
+    inquiries.source is 'email' for inquiries stored by the email sync and
+    NULL otherwise; only synced rows are dedup targets (inquiry_dedup.py).
+    """
+    _add_column(conn, 'inquiries', 'source', "TEXT")
+
+
+def _migrate_search_indexes(conn):
+    """FTS5 indexes and their sync triggers (see search_index.py)"""
+    ensure_search_index(conn)
+
+
+def _migrate_counters(conn):
+    """Row and inquiry status counters and their triggers (see counters.py)"""
+    ensure_counters(conn)
+
+
+# (version, name, function) - append only, never renumber
+MIGRATIONS = [
+    (1, 'legacy_schema', _migrate_legacy_schema),
+    (2, 'hot_path_indexes', _migrate_hot_path_indexes),
+    (3, 'table_versions', _migrate_table_versions),
+    (4, 'message_excerpts', _migrate_message_excerpts),
+    (5, 'inquiry_content_hash', _migrate_inquiry_content_hash),
+    (6, 'maintenance_jobs', _migrate_maintenance_jobs),
+    (7, 'imap_sync_state', _migrate_imap_sync_state),
+    (8, 'builtin_search_triggers', _migrate_builtin_search_triggers),
+    (9, 'inquiry_source', _migrate_inquiry_source),
+    (10, 'search_indexes', _migrate_search_indexes),
+    (11, 'counters', _migrate_counters),
+]
+
+
+def _ensure_migrations_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_versions(conn):
+    """Set of applied migration versions"""
+    _ensure_migrations_table(conn)
+    return {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+
+
+def run_migrations(conn):
+    """
+    Apply pending migrations in version order.
+
+    Returns:
+        List of applied migration names
+    """
+    if conn.in_transaction:
+        conn.commit()
+
+    applied = []
+    for version, name, migrate in MIGRATIONS:
+        if version in applied_versions(conn):
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-check under the write lock in case another process got here first
+            if conn.execute("SELECT 1 FROM schema_migrations WHERE version = ?", (version,)).fetchone():
+                conn.rollback()
+                continue
+            migrate(conn)
+            conn.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (?, ?)",
+                (version, name)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logging.error(f"Migration {version} ({name}) failed")
+            raise
+        logging.info(f"Applied migration {version}: {name}")
+        applied.append(name)
+    return applied
+
+
+# Representative statements for each hot query in app.py (name, sql, params)
+HOT_QUERIES = [
+    ("get_clients cursor", "SELECT * FROM clients WHERE (id) > (?) ORDER BY id ASC LIMIT ?", (0, 51)),
+    ("get_client", "SELECT * FROM clients WHERE id=?", (1,)),
+    ("delete_client inquiry check", "SELECT COUNT(*) as count FROM inquiries WHERE client_id=?", (1,)),
+    ("get_inquiries page", """
+        SELECT i.id, i.subject, i.message_excerpt, i.status, i.received_at, c.full_name as client_name
+        FROM inquiries i LEFT JOIN clients c ON i.client_id = c.id
+        ORDER BY i.received_at DESC LIMIT ? OFFSET ?
+    """, (50, 0)),
+    ("get_inquiries status filter", """
+        SELECT i.id, i.subject, i.message_excerpt, i.status, i.received_at, c.full_name as client_name
+        FROM inquiries i LEFT JOIN clients c ON i.client_id = c.id
+        WHERE i.status=? ORDER BY i.received_at DESC LIMIT ? OFFSET ?
+    """, ('pending', 50, 0)),
+    ("get_inquiries status cursor", """
+        SELECT i.id, i.subject, i.message_excerpt, i.status, i.received_at, c.full_name as client_name
+        FROM inquiries i LEFT JOIN clients c ON i.client_id = c.id
+        WHERE i.status=? AND (i.received_at, i.id) < (?, ?)
+        ORDER BY i.received_at DESC, i.id DESC LIMIT ?
+    """, ('pending', '2100-01-01', 0, 51)),
+    ("get_inquiries status cursor, NULL dates", """
+        SELECT i.id, i.subject, i.message_excerpt, i.status, i.received_at, c.full_name as client_name
+        FROM inquiries i LEFT JOIN clients c ON i.client_id = c.id
+        WHERE i.status=? AND (i.received_at IS NULL AND (i.id) < (?))
+        ORDER BY i.received_at DESC, i.id DESC LIMIT ?
+    """, ('pending', 0, 51)),
+    ("get_responses page", """
+        SELECT r.id, i.subject, c.full_name, u.full_name
+        FROM responses r
+        LEFT JOIN inquiries i ON r.inquiry_id = i.id
+        LEFT JOIN clients c ON i.client_id = c.id
+        LEFT JOIN users u ON r.user_id = u.id
+        ORDER BY r.sent_at DESC LIMIT ? OFFSET ?
+    """, (50, 0)),
+    ("get_response thread", """
+        SELECT id, sender, message, sent_at FROM conversation_messages
+        WHERE response_id = ? ORDER BY sent_at ASC
+    """, (1,)),
+    ("get_publishers page", "SELECT * FROM publishers ORDER BY name ASC LIMIT ? OFFSET ?", (100, 0)),
+    ("get_publishers cursor", """
+        SELECT * FROM publishers WHERE (name, id) > (?, ?) ORDER BY name ASC, id ASC LIMIT ?
+    """, ('', 0, 101)),
+    ("sync client lookup", "SELECT id, email FROM clients WHERE full_name = ? AND company = ?", ('a', 'b')),
+    ("sync duplicate check", "SELECT id FROM inquiries WHERE content_hash = ?", ('0' * 64,)),
+    ("sync reply detection", """
+        SELECT r.id, r.inquiry_id FROM responses r
+        JOIN inquiries i ON r.inquiry_id = i.id
+        WHERE i.client_id = ? AND r.client_replied = 0
+        ORDER BY r.sent_at DESC LIMIT 1
+    """, (1,)),
+    ("login by email", "SELECT * FROM users WHERE email = ? AND is_active = 1", ('a@b.c',)),
+    ("session user", "SELECT * FROM users WHERE username = ? AND is_active = 1", ('admin',)),
+    ("publishers by emails", "SELECT * FROM publishers WHERE email IN (?, ?)", ('a@b.c', 'd@e.f')),
+]
+
+# "SCAN t" / "SCAN t AS x" without an index is a full table scan
+FULL_SCAN_RE = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+
+
+def check_query_plans(conn, queries=None):
+    """
+    Run EXPLAIN QUERY PLAN on each hot query.
+
+    Returns:
+        List of (query name, plan detail) for every full table scan
+    """
+    problems = []
+    for name, sql, params in queries or HOT_QUERIES:
+        for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params):
+            detail = row[3]
+            if FULL_SCAN_RE.match(detail):
+                problems.append((name, detail))
+    return problems
+
+
+if __name__ == '__main__':
+    import sys
+    from database import db
+
+    print("=" * 60)
+    print("SCHEMA MIGRATIONS")
+    print("=" * 60)
+
+    # Importing db already applied pending migrations at startup
+    with db.get_connection() as conn:
+        done = applied_versions(conn)
+
+        if '--check' in sys.argv:
+            problems = check_query_plans(conn)
+            for name, detail in problems:
+                print(f"  ✗ {name:30} {detail}")
+            if problems:
+                print(f"\n{len(problems)} hot query plan(s) need an index")
+                sys.exit(1)
+            print(f"  ✓ {len(HOT_QUERIES)} hot queries use indexes")
+            sys.exit(0)
+
+        if '--status' not in sys.argv:
+            for name in run_migrations(conn):
+                print(f"  ✓ Applied {name}")
+            done = applied_versions(conn)
+
+        for version, name, _ in MIGRATIONS:
+            state = "applied" if version in done else "pending"
+            print(f"  {version:4}  {name:25} {state}")
@@ -1,4 +1,5 @@
 from database import db
+from message_store import INQUIRY_LIST_COLUMNS, encode_body, make_excerpt, decode_row
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -17,15 +18,15 @@ class User:
     
     @staticmethod
     def get_by_username(username):
-        """Get user by username"""
+        """Get user by username (never cached: a deactivated user must lose access at once)"""
         query = "SELECT * FROM users WHERE username = ? AND is_active = 1"
-        return db.execute_query(query, (username,), fetch_one=True)
+        return db.execute_query(query, (username,), fetch_one=True, cache=False)
     
     @staticmethod
     def get_by_email(email):
-        """Get user by email"""
+        """Get user by email (never cached, see get_by_username)"""
         query = "SELECT * FROM users WHERE email = ? AND is_active = 1"
-        return db.execute_query(query, (email,), fetch_one=True)
+        return db.execute_query(query, (email,), fetch_one=True, cache=False)
     
     @staticmethod
     def verify_password(user, password):
@@ -75,14 +76,14 @@ class Client:
         }
     
     @staticmethod
-    def get_all(page=1, per_page=50):
-        """Get all clients paginated"""
-        return db.get_paginated('clients', page=page, per_page=per_page, order_by="created_at DESC")
+    def get_all(page=1, per_page=50, after=None):
+        """Get all clients paginated (pass after='' or a cursor for keyset paging)"""
+        return db.get_paginated('clients', page=page, per_page=per_page, order_by="created_at DESC", after=after)
     
     @staticmethod
-    def search(search_term):
-        """Search clients by name or email"""
-        return db.search_records('clients', search_term, ['full_name', 'email', 'phone'])
+    def search(search_term, limit=None, offset=0):
+        """Search clients by name or email (every match unless limit is given)"""
+        return db.search_records('clients', search_term, ['full_name', 'email', 'phone'], limit, offset)
     
     @staticmethod
     def update(client_id, **kwargs):
@@ -107,14 +108,14 @@ class Inquiry:
     def create(client_id, subject, message, status='pending'):
         """Create new inquiry"""
         query = """
-            INSERT INTO inquiries (client_id, subject, message, status)
-            VALUES (?, ?, ?, ?)
+            INSERT INTO inquiries (client_id, subject, message, message_excerpt, status)
+            VALUES (?, ?, ?, ?, ?)
         """
-        return db.execute_update(query, (client_id, subject, message, status))
+        return db.execute_update(query, (client_id, subject, encode_body(message), make_excerpt(message), status))
     
     @staticmethod
-    def get_all(page=1, per_page=50, status=None):
-        """Get all inquiries with optional status filter"""
+    def get_all(page=1, per_page=50, status=None, after=None):
+        """Get all inquiries with optional status filter (pass after for keyset paging)"""
         where_clause = "status = ?" if status else None
         params = (status,) if status else None
         
@@ -124,7 +125,9 @@ class Inquiry:
             per_page=per_page,
             order_by="received_at DESC",
             where_clause=where_clause,
-            params=params
+            params=params,
+            after=after,
+            columns=', '.join(INQUIRY_LIST_COLUMNS)
         )
     
     @staticmethod
@@ -140,7 +143,7 @@ class Inquiry:
             LEFT JOIN clients c ON i.client_id = c.id
             WHERE i.id = ?
         """
-        return db.execute_query(query, (inquiry_id,), fetch_one=True)
+        return decode_row(db.execute_query(query, (inquiry_id,), fetch_one=True))
     
     @staticmethod
     def update_status(inquiry_id, status, assigned_to=None):
@@ -161,15 +164,7 @@ class Inquiry:
     @staticmethod
     def get_statistics():
         """Get inquiry statistics by status"""
-        query = """
-            SELECT 
-                status,
-                COUNT(*) as count
-            FROM inquiries
-            GROUP BY status
-        """
-        results = db.execute_query(query)
-        return {row['status']: row['count'] for row in results}
+        return db.count_by_status()
 
 
 class Response:
@@ -204,6 +199,34 @@ class Response:
         return db.execute_query(query, (inquiry_id,))
 
 
+class ImapSyncState:
+    """Per-mailbox UID checkpoint of the email sync"""
+    
+    @staticmethod
+    def get(mailbox):
+        """Get the checkpoint row (uidvalidity, last_uid) or None"""
+        query = "SELECT * FROM imap_sync_state WHERE mailbox = ?"
+        return db.execute_query(query, (mailbox,), fetch_one=True, cache=False)
+    
+    @staticmethod
+    def save(mailbox, uidvalidity, last_uid):
+        """
+        Advance the checkpoint. Within one UIDVALIDITY it only moves forward,
+        so overlapping syncs never rewind it; a new UIDVALIDITY replaces it.
+        """
+        query = """
+            INSERT INTO imap_sync_state (mailbox, uidvalidity, last_uid)
+            VALUES (?, ?, ?)
+            ON CONFLICT(mailbox) DO UPDATE SET
+                last_uid = CASE WHEN uidvalidity = excluded.uidvalidity
+                                THEN MAX(last_uid, excluded.last_uid)
+                                ELSE excluded.last_uid END,
+                uidvalidity = excluded.uidvalidity,
+                updated_at = CURRENT_TIMESTAMP
+        """
+        return db.execute_update(query, (mailbox, uidvalidity, last_uid))
+
+
 class Publisher:
     """Publisher model"""
     
@@ -225,14 +248,14 @@ class Publisher:
         return db.bulk_insert_publishers(publishers_data)
     
     @staticmethod
-    def get_all(page=1, per_page=100):
-        """Get all publishers paginated"""
-        return db.get_paginated('publishers', page=page, per_page=per_page, order_by="name ASC")
+    def get_all(page=1, per_page=100, after=None):
+        """Get all publishers paginated (pass after='' or a cursor for keyset paging)"""
+        return db.get_paginated('publishers', page=page, per_page=per_page, order_by="name ASC", after=after)
     
     @staticmethod
-    def search(search_term):
-        """Search publishers"""
-        return db.search_records('publishers', search_term, ['name', 'email', 'category'])
+    def search(search_term, limit=None, offset=0):
+        """Search publishers (every match unless limit is given)"""
+        return db.search_records('publishers', search_term, ['name', 'email', 'category'], limit, offset)
     
     @staticmethod
     def get_by_emails(email_list):
@@ -252,6 +275,4 @@ class Publisher:
     @staticmethod
     def get_count():
         """Get total publisher count"""
-        query = "SELECT COUNT(*) as total FROM publishers"
-        result = db.execute_query(query, fetch_one=True)
-        return result['total']
\ No newline at end of file
+        return db.count_rows('publishers')
\ No newline at end of file
@@ -0,0 +1,185 @@
+"""
+Streaming publisher import.
+
+Rows come from any iterator (csv.DictReader, NDJSON lines, a JSON list)
+and are inserted one at a time through a single prepared INSERT on one
+writer connection, committing every IMPORT_COMMIT_EVERY rows. Each row is
+counted exactly as inserted, duplicate (email already present, including
+earlier in the same file) or invalid, and memory stays constant: only
+the first IMPORT_MAX_REJECTS offending rows are kept for the report.
+
+Run from backend/:
+    python publisher_import.py publishers.csv
+    python publisher_import.py publishers.ndjson
+    python publisher_import.py publishers.json
+"""
+import codecs
+import csv
+import io
+import json
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+from config import Config
+from query_profiler import profiler
+
+INSERT_SQL = """
+    INSERT INTO publishers (name, email, category, status)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(email) DO NOTHING
+"""
+
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+# Uploads larger than this are spooled to disk instead of memory
+SPOOL_MEMORY_BYTES = 1024 * 1024
+COPY_CHUNK = 64 * 1024
+
+
+def normalize_publisher(row):
+    """
+    Validate and clean one input row.
+
+    Returns:
+        (params tuple, None) or (None, reason)
+    """
+    if not isinstance(row, dict):
+        return None, 'not an object'
+
+    name = str(row.get('name') or '').strip()
+    email = str(row.get('email') or '').strip().lower()
+    category = str(row.get('category') or '').strip()
+    status = str(row.get('status') or 'active').strip().lower()
+
+    if not name:
+        return None, 'missing name'
+    if not EMAIL_RE.match(email):
+        return None, 'invalid email'
+    return (name, email, category, status), None
+
+
+def spool(stream):
+    """
+    Read a whole upload into a temporary file (memory up to
+    SPOOL_MEMORY_BYTES, then disk), rewound for reading. Import from the
+    copy so the writer connection is not held while the client sends.
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    shutil.copyfileobj(stream, spooled, COPY_CHUNK)
+    spooled.seek(0)
+    return spooled
+
+
+def iter_csv(stream, encoding='utf-8'):
+    """Rows of a CSV file (binary or text stream) with a name,email,category,status header"""
+    if not isinstance(stream, io.TextIOBase):
+        stream = codecs.getreader(encoding)(stream, errors='replace')
+    return csv.DictReader(stream)
+
+
+def iter_ndjson(stream, encoding='utf-8'):
+    """One JSON object per line; unparsable lines are yielded as-is and reported invalid"""
+    for line in stream:
+        if isinstance(line, bytes):
+            line = line.decode(encoding, errors='replace')
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield line
+
+
+def import_rows(conn, rows, commit_every=None, max_rejects=None):
+    """
+    Insert publisher rows from an iterator.
+
+    Args:
+        conn: Writer connection (the caller owns the final commit)
+        rows: Iterator of dicts with keys name, email, category, status
+        commit_every: Commit after this many rows (0 = one transaction)
+        max_rejects: Offending rows kept in the report
+
+    Returns:
+        Dict with total, inserted, duplicates, invalid, rejected (list of
+        {'row', 'reason', 'data'}) and rejected_truncated
+    """
+    commit_every = Config.IMPORT_COMMIT_EVERY if commit_every is None else commit_every
+    max_rejects = Config.IMPORT_MAX_REJECTS if max_rejects is None else max_rejects
+
+    result = {'total': 0, 'inserted': 0, 'duplicates': 0, 'invalid': 0, 'rejected': [], 'rejected_truncated': False}
+
+    def reject(number, reason, data):
+        if len(result['rejected']) < max_rejects:
+            # csv.DictReader puts extra columns under a None key
+            data = {str(k): v for k, v in data.items()} if isinstance(data, dict) else str(data)[:500]
+            result['rejected'].append({'row': number, 'reason': reason, 'data': data})
+        else:
+            result['rejected_truncated'] = True
+
+    # A plain cursor re-executing one statement keeps it prepared; the
+    # import is reported to the profiler once instead of per row
+    cursor = conn.cursor(sqlite3.Cursor)
+    started = time.perf_counter()
+    pending = 0
+
+    for number, row in enumerate(rows, 1):
+        result['total'] += 1
+        params, reason = normalize_publisher(row)
+        if params is None:
+            result['invalid'] += 1
+            reject(number, reason, row)
+            continue
+
+        cursor.execute(INSERT_SQL, params)
+        if cursor.rowcount == 1:
+            result['inserted'] += 1
+        else:
+            result['duplicates'] += 1
+            reject(number, 'duplicate email', row)
+
+        pending += 1
+        if commit_every and pending >= commit_every:
+            conn.commit()
+            pending = 0
+
+    cursor.close()
+    profiler.record(INSERT_SQL, time.perf_counter() - started, result['inserted'])
+    return result
+
+
+if __name__ == '__main__':
+    import sys
+    from database import db
+
+    if len(sys.argv) < 2:
+        print("Usage: python publisher_import.py <publishers.csv|.ndjson|.json>")
+        sys.exit(1)
+
+    path = sys.argv[1]
+
+    print("=" * 60)
+    print(f"PUBLISHER IMPORT: {path}")
+    print("=" * 60)
+
+    started = time.time()
+    with open(path, 'rb') as f:
+        if path.endswith('.csv'):
+            rows = iter_csv(f)
+        elif path.endswith('.json'):
+            rows = json.load(f)
+        else:
+            rows = iter_ndjson(f)
+        result = db.import_publishers(rows)
+
+    print(f"  ✓ Inserted:   {result['inserted']}")
+    print(f"  - Duplicates: {result['duplicates']}")
+    print(f"  ✗ Invalid:    {result['invalid']}")
+    print(f"  Total rows:   {result['total']} in {time.time() - started:.1f}s")
+    for r in result['rejected'][:20]:
+        print(f"    row {r['row']}: {r['reason']}")
+    if result['duplicates'] + result['invalid'] > 20:
+        print(f"    ... {result['duplicates'] + result['invalid'] - 20} more")
@@ -0,0 +1,249 @@
+"""
+Query profiling and slow-query log.
+
+Pooled connections are created with ProfiledConnection, so every statement
+run through Database.execute_query/execute_update/execute_many or a raw
+conn.execute() inside get_connection() is timed (execute plus fetches) and
+aggregated per statement fingerprint: literals and IN lists are normalized
+so "WHERE id = 5" and "WHERE id = 7" count as one statement.
+
+Statements slower than SLOW_QUERY_MS are written to the slow-query log.
+"""
+from collections import deque
+from config import Config
+from functools import lru_cache
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+SAMPLES_PER_STATEMENT = 512  # Latency samples kept per fingerprint for percentiles
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """Normalize a statement so calls differing only in literals aggregate"""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('(?+)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def _percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(round(pct / 100.0 * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+class QueryProfiler:
+    """Per-fingerprint counters plus the slow-query log"""
+
+    def __init__(self, slow_ms=None, log_path=None):
+        self.enabled = Config.QUERY_PROFILING
+        self.slow_ms = slow_ms if slow_ms is not None else Config.SLOW_QUERY_MS
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._traced_statements = 0
+        self.slow_log = logging.getLogger('slow_queries')
+        log_path = log_path if log_path is not None else Config.SLOW_QUERY_LOG
+        if log_path and not self.slow_log.handlers:
+            # delay: the file is only created by the first slow query
+            handler = logging.FileHandler(log_path, delay=True)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self.slow_log.addHandler(handler)
+
+    def record(self, sql, elapsed, rows):
+        """Add one finished statement (elapsed in seconds)"""
+        fp = fingerprint(sql)
+        ms = elapsed * 1000.0
+        with self._lock:
+            entry = self._stats.get(fp)
+            if entry is None:
+                entry = self._stats[fp] = {
+                    'calls': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'rows': 0,
+                    'samples': deque(maxlen=SAMPLES_PER_STATEMENT)
+                }
+            entry['calls'] += 1
+            entry['total_ms'] += ms
+            entry['max_ms'] = max(entry['max_ms'], ms)
+            entry['rows'] += rows
+            entry['samples'].append(ms)
+
+        if ms >= self.slow_ms:
+            self.slow_log.warning(f"SLOW QUERY {ms:.1f}ms rows={rows}: {fp[:500]}")
+
+    def trace(self, statement):
+        """
+        sqlite3 trace callback: counts every statement SQLite starts,
+        including implicit BEGIN/COMMIT and trigger programs, so hidden
+        work shows up next to the timed calls.
+        """
+        with self._lock:
+            self._traced_statements += 1
+
+    def top(self, limit=20, sort='total_ms'):
+        """
+        Most expensive statements.
+
+        Args:
+            limit: Number of statements
+            sort: total_ms, calls, avg_ms, p50_ms, p99_ms, max_ms or rows
+
+        Returns:
+            List of dicts, most expensive first
+        """
+        with self._lock:
+            snapshot = [(fp, dict(entry), list(entry['samples'])) for fp, entry in self._stats.items()]
+
+        result = []
+        for fp, entry, samples in snapshot:
+            samples.sort()
+            result.append({
+                'statement': fp,
+                'calls': entry['calls'],
+                'total_ms': round(entry['total_ms'], 3),
+                'avg_ms': round(entry['total_ms'] / entry['calls'], 3),
+                'p50_ms': round(_percentile(samples, 50), 3),
+                'p99_ms': round(_percentile(samples, 99), 3),
+                'max_ms': round(entry['max_ms'], 3),
+                'rows': entry['rows']
+            })
+        result.sort(key=lambda r: r.get(sort, r['total_ms']), reverse=True)
+        return result[:limit]
+
+    def summary(self):
+        with self._lock:
+            return {
+                'statements': len(self._stats),
+                'calls': sum(e['calls'] for e in self._stats.values()),
+                'traced_statements': self._traced_statements,
+                'slow_query_ms': self.slow_ms
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._traced_statements = 0
+
+
+profiler = QueryProfiler()
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """
+    Cursor that times execute() plus every fetch and reports the statement
+    to the profiler once its rows are consumed (or the cursor is reused,
+    closed or garbage collected).
+    """
+
+    _sql = None
+
+    def _start(self, sql):
+        self._finish()
+        self._sql = sql
+        self._elapsed = 0.0
+        self._rows = 0
+
+    def _finish(self):
+        if self._sql is not None:
+            rows = self._rows if self._rows else max(self.rowcount, 0)
+            profiler.record(self._sql, self._elapsed, rows)
+            self._sql = None
+
+    def execute(self, sql, parameters=()):
+        self._start(sql)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._elapsed += time.perf_counter() - started
+
+    def executemany(self, sql, seq_of_parameters):
+        self._start(sql)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._elapsed += time.perf_counter() - started
+            self._finish()
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._elapsed += time.perf_counter() - started
+        if row is None:
+            self._finish()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(size if size is not None else self.arraysize)
+        self._elapsed += time.perf_counter() - started
+        self._rows += len(rows)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._elapsed += time.perf_counter() - started
+        self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._elapsed += time.perf_counter() - started
+            self._finish()
+            raise
+        self._elapsed += time.perf_counter() - started
+        self._rows += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """Connection whose execute()/executemany() go through ProfiledCursor"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.set_trace_callback(profiler.trace)
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connection_factory():
+    """Connection class for sqlite3.connect(factory=...)"""
+    return ProfiledConnection if profiler.enabled else sqlite3.Connection
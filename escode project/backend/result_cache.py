@@ -0,0 +1,157 @@
+"""
+In-process query result cache.
+
+LRU cache (RESULT_CACHE_SIZE entries, RESULT_CACHE_TTL seconds) keyed by
+normalized SQL + params and tagged with the base tables the statement
+reads. Database invalidates tags after every committed write by diffing
+the trigger-maintained table_versions counters, so writes made through
+execute_update, execute_many, the write queue or a raw get_connection()
+transaction (including trigger side effects) all evict stale results.
+
+Each entry also stores the table_versions of its tags at load time, and
+a lookup only hits when they still match the current counters, so writes
+from other processes (a second worker, publisher_import.py, archive.py, a
+restored backup) are never served from the cache.
+"""
+from collections import OrderedDict
+from config import Config
+from counters import COUNTED_TABLES
+from functools import lru_cache
+from migrations import VERSIONED_TABLES
+import re
+import threading
+import time
+
+_SPACE_RE = re.compile(r'\s+')
+_TABLE_RE = re.compile(r'\b(?:FROM|JOIN)\s+([A-Za-z_]\w*)', re.IGNORECASE)
+
+# Derived tables read on behalf of a base table
+DERIVED_TABLES = {
+    'table_counters': COUNTED_TABLES,
+    'inquiry_status_counts': ['inquiries'],
+}
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(sql):
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+@lru_cache(maxsize=2048)
+def query_tags(sql):
+    """
+    Base tables a SELECT depends on.
+
+    Returns:
+        Frozenset of table names, or None if the statement reads a table
+        without a change version (never cached)
+    """
+    tags = set()
+    for name in _TABLE_RE.findall(sql):
+        name = name.lower()
+        if name.endswith('_fts'):
+            name = name[:-4]
+        if name in DERIVED_TABLES:
+            tags.update(DERIVED_TABLES[name])
+        elif name in VERSIONED_TABLES:
+            tags.add(name)
+        else:
+            return None
+    return frozenset(tags) if tags else None
+
+
+class ResultCache:
+    """Thread-safe LRU + TTL cache with tag invalidation and hit statistics"""
+
+    def __init__(self, max_entries=None, ttl=None, max_rows=None):
+        self.max_entries = Config.RESULT_CACHE_SIZE if max_entries is None else max_entries
+        self.ttl = Config.RESULT_CACHE_TTL if ttl is None else ttl
+        self.max_rows = Config.RESULT_CACHE_MAX_ROWS if max_rows is None else max_rows
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0,
+                       'stale': 0}
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, key, versions=None):
+        """
+        Args:
+            versions: Current table versions of the entry's tags; an entry
+                      stored under other versions is dropped as stale
+
+        Returns:
+            (True, value) on a fresh hit, (False, None) otherwise
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return False, None
+            value, tags, expires, stored_versions = entry
+            if expires < time.monotonic() or stored_versions != versions:
+                del self._entries[key]
+                self._stats['expirations' if stored_versions == versions else 'stale'] += 1
+                self._stats['misses'] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return True, value
+
+    def snapshot(self, tags):
+        """Tag generations to pass to put(); taken before running the query"""
+        with self._lock:
+            return tuple(self._generations.get(t, 0) for t in tags)
+
+    def put(self, key, value, tags, snapshot, versions=None):
+        """
+        Store a result unless one of its tags was invalidated since
+        snapshot() (the query may have read pre-write data).
+
+        Args:
+            versions: Table versions of the tags read before the query ran
+        """
+        if isinstance(value, list) and len(value) > self.max_rows:
+            return
+        with self._lock:
+            if snapshot != tuple(self._generations.get(t, 0) for t in tags):
+                return
+            self._entries[key] = (value, tags, time.monotonic() + self.ttl, versions)
+            self._entries.move_to_end(key)
+            self._stats['stores'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, tables):
+        """Evict every entry tagged with one of the tables"""
+        tables = set(tables)
+        if not tables:
+            return 0
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            stale = [key for key, (_, tags, _, _) in self._entries.items() if tags & tables]
+            for key in stale:
+                del self._entries[key]
+            self._stats['invalidations'] += len(stale)
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            for table in list(self._generations) + list(VERSIONED_TABLES):
+                self._generations[table] = self._generations.get(table, 0) + 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        stats['ttl'] = self.ttl
+        return stats
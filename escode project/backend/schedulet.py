@@ -0,0 +1,317 @@
+"""
+Background maintenance scheduler.
+
+Runs SQLite housekeeping on cron-like intervals ('30s', '15m', '6h', '1d',
+'@hourly', '@daily', '@weekly'; empty or 'off' disables a job):
+
+    wal_checkpoint      PRAGMA wal_checkpoint(TRUNCATE) - bounds the -wal file
+    optimize            PRAGMA optimize on the writer connection
+    analyze             ANALYZE (sampled with MAINTENANCE_ANALYZE_LIMIT)
+    incremental_vacuum  Returns free pages to the OS (needs auto_vacuum=INCREMENTAL)
+    archive             archive.py run (off by default)
+    backup              backup.py snapshot with rotation (off by default)
+
+Each job starts after its interval plus a random jitter, so several
+workers never fire together. Last-run state lives in the maintenance_jobs
+table; a job is claimed with a lease there before it runs, so two
+processes (or the app and the CLI) never run the same job at once.
+
+python app.py starts the scheduler thread unless MAINTENANCE_ON_SERVE=False;
+importing app.py (tests, scripts, WSGI workers) only starts it when
+MAINTENANCE_ENABLED=True.
+
+Run from backend/:
+    python schedulet.py                  # run the scheduler in the foreground
+    python schedulet.py --once           # run due jobs once and exit
+    python schedulet.py --run analyze    # run one job now
+    python schedulet.py --status         # last run of every job
+    python schedulet.py --enable-incremental-vacuum
+"""
+from config import Config
+from database import db
+from backup import create_backup
+import atexit
+import json
+import logging
+import random
+import re
+import threading
+import time
+from datetime import datetime
+
+_INTERVAL_RE = re.compile(r'^(\d+)\s*([smhd])$')
+_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+_ALIASES = {'@hourly': 3600, '@daily': 86400, '@weekly': 7 * 86400}
+
+
+def parse_interval(spec):
+    """
+    Seconds between runs for an interval spec.
+
+    Returns:
+        Seconds, or None when the job is disabled
+    """
+    spec = (spec or '').strip().lower()
+    if spec in ('', 'off', 'never'):
+        return None
+    if spec in _ALIASES:
+        return _ALIASES[spec]
+    match = _INTERVAL_RE.match(spec)
+    if not match:
+        raise ValueError(f"Invalid interval: {spec!r}")
+    return int(match.group(1)) * _UNITS[match.group(2)]
+
+
+# ============================================================================
+# BUILT-IN JOBS (each returns a JSON-serializable result)
+# ============================================================================
+def wal_checkpoint(database):
+    with database.get_connection(readonly=False) as conn:
+        busy, log_pages, checkpointed = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+    return {'busy': busy, 'log_pages': log_pages, 'checkpointed': checkpointed}
+
+
+def optimize(database):
+    with database.get_connection(readonly=False) as conn:
+        conn.execute("PRAGMA optimize")
+    return {}
+
+
+def analyze(database):
+    with database.get_connection(readonly=False) as conn:
+        conn.execute(f"PRAGMA analysis_limit={int(Config.MAINTENANCE_ANALYZE_LIMIT)}")
+        conn.execute("ANALYZE")
+        stats = conn.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0]
+    return {'stat_rows': stats}
+
+
+def incremental_vacuum(database):
+    with database.get_connection(readonly=False) as conn:
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return {'skipped': 'auto_vacuum is not INCREMENTAL', 'free_pages': free}
+        conn.execute(f"PRAGMA incremental_vacuum({int(Config.MAINTENANCE_VACUUM_PAGES)})").fetchall()
+        left = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return {'freed_pages': free - left, 'free_pages': left}
+
+
+def archive(database):
+    return database.archive_old_records()
+
+
+def backup(database):
+    return create_backup(database.db_path)
+
+
+def enable_incremental_vacuum(database):
+    """Switch the database to auto_vacuum=INCREMENTAL (rewrites the file with VACUUM)"""
+    with database.get_connection(readonly=False) as conn:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+        return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+
+# (name, function, interval spec)
+JOBS = [
+    ('wal_checkpoint', wal_checkpoint, Config.MAINTENANCE_CHECKPOINT_EVERY),
+    ('optimize', optimize, Config.MAINTENANCE_OPTIMIZE_EVERY),
+    ('analyze', analyze, Config.MAINTENANCE_ANALYZE_EVERY),
+    ('incremental_vacuum', incremental_vacuum, Config.MAINTENANCE_VACUUM_EVERY),
+    ('archive', archive, Config.MAINTENANCE_ARCHIVE_EVERY),
+    ('backup', backup, Config.MAINTENANCE_BACKUP_EVERY),
+]
+
+
+class Scheduler:
+    """
+    Runs JOBS from one daemon thread, checking every MAINTENANCE_TICK seconds.
+    Jobs run one at a time; run_job() can also be called from other threads.
+    """
+
+    def __init__(self, database, jobs=None, tick=None, jitter=None, lease=None):
+        self.database = database
+        self.tick = tick if tick is not None else Config.MAINTENANCE_TICK
+        self.jitter = jitter if jitter is not None else Config.MAINTENANCE_JITTER
+        self.lease = lease if lease is not None else Config.MAINTENANCE_LEASE
+        self.jobs = {}
+        for name, fn, spec in jobs or JOBS:
+            self.jobs[name] = {'fn': fn, 'interval': parse_interval(spec), 'lock': threading.Lock()}
+        self._next_run = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _load_state(self):
+        with self.database.get_connection(readonly=True) as conn:
+            return {row['name']: dict(row) for row in conn.execute("SELECT * FROM maintenance_jobs")}
+
+    def _schedule(self, name, last_started=None):
+        """Next run: interval after the last start plus jitter (a fresh job waits only the jitter)"""
+        interval = self.jobs[name]['interval']
+        base = last_started + interval if last_started else time.time()
+        self._next_run[name] = base + random.uniform(0, self.jitter)
+
+    def _claim(self, name, now):
+        """Take the job's lease; False if another run holds it"""
+        with self.database.get_connection(readonly=False) as conn:
+            conn.execute("INSERT INTO maintenance_jobs (name) VALUES (?) ON CONFLICT(name) DO NOTHING", (name,))
+            cursor = conn.execute("""
+                UPDATE maintenance_jobs SET lease_until = ?, last_started = ?
+                WHERE name = ? AND (lease_until IS NULL OR lease_until < ?)
+            """, (now + self.lease, now, name, now))
+            return cursor.rowcount == 1
+
+    def _finish(self, name, status, duration_ms, result):
+        with self.database.get_connection(readonly=False) as conn:
+            conn.execute("""
+                UPDATE maintenance_jobs
+                SET lease_until = NULL, last_finished = ?, last_status = ?, last_duration_ms = ?, last_result = ?
+                WHERE name = ?
+            """, (time.time(), status, round(duration_ms, 1), json.dumps(result, default=str), name))
+
+    def run_job(self, name):
+        """
+        Run one job now (skipped if it is already running here or elsewhere).
+
+        Returns:
+            Dict with status ('ok', 'error' or 'skipped'), duration_ms and result
+        """
+        job = self.jobs[name]
+        if not job['lock'].acquire(blocking=False):
+            return {'status': 'skipped', 'reason': 'already running'}
+        try:
+            started = time.time()
+            if not self._claim(name, started):
+                logging.info(f"Maintenance job {name} skipped: running in another process")
+                if job['interval']:
+                    self._schedule(name, started)
+                return {'status': 'skipped', 'reason': 'running in another process'}
+
+            timer = time.perf_counter()
+            try:
+                result, status = job['fn'](self.database), 'ok'
+            except Exception as e:
+                result, status = str(e), 'error'
+            duration_ms = (time.perf_counter() - timer) * 1000
+            self._finish(name, status, duration_ms, result)
+
+            if status == 'ok':
+                logging.info(f"Maintenance job {name} finished in {duration_ms:.0f}ms: {result}")
+            else:
+                logging.error(f"Maintenance job {name} failed after {duration_ms:.0f}ms: {result}")
+            if job['interval']:
+                self._schedule(name, started)
+            return {'status': status, 'duration_ms': round(duration_ms, 1), 'result': result}
+        finally:
+            job['lock'].release()
+
+    def run_pending(self):
+        """
+        Run every enabled job that is due.
+
+        Returns:
+            Dict of job name -> run_job() outcome
+        """
+        if not self._next_run:
+            state = self._load_state()
+            for name, job in self.jobs.items():
+                if job['interval']:
+                    self._schedule(name, state.get(name, {}).get('last_started'))
+
+        now = time.time()
+        outcomes = {}
+        for name in sorted(self._next_run, key=self._next_run.get):
+            if self._stop_event.is_set():
+                break
+            if self._next_run[name] <= now:
+                outcomes[name] = self.run_job(name)
+        return outcomes
+
+    def status(self):
+        """Schedule and last run of every job"""
+        state = self._load_state()
+        jobs = []
+        for name, job in self.jobs.items():
+            last = state.get(name, {})
+            next_run = self._next_run.get(name)
+            jobs.append({
+                'name': name,
+                'interval_s': job['interval'],
+                'next_run': datetime.fromtimestamp(next_run).isoformat(timespec='seconds') if next_run else None,
+                'last_started': datetime.fromtimestamp(last['last_started']).isoformat(timespec='seconds') if last.get('last_started') else None,
+                'last_status': last.get('last_status'),
+                'last_duration_ms': last.get('last_duration_ms'),
+                'last_result': json.loads(last['last_result']) if last.get('last_result') else None,
+                'running': bool(last.get('lease_until') and last['lease_until'] > time.time()),
+            })
+        return {'running': bool(self._thread and self._thread.is_alive()), 'jobs': jobs}
+
+    def start(self):
+        """Start the scheduler in a daemon thread"""
+        if self._thread and self._thread.is_alive():
+            logging.warning("Maintenance scheduler already running")
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name='maintenance-scheduler', daemon=True)
+        self._thread.start()
+        logging.info(f"Maintenance scheduler started ({', '.join(n for n, j in self.jobs.items() if j['interval'])})")
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            try:
+                self.run_pending()
+            except Exception as e:
+                logging.error(f"Maintenance scheduler error: {str(e)}")
+            self._stop_event.wait(self.tick)
+
+    def stop(self, timeout=None):
+        """Stop the thread after the running job (if any) finishes"""
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout)
+
+
+# Global scheduler instance (started by python app.py, see module docstring)
+scheduler = Scheduler(db)
+atexit.register(scheduler.stop, 5)
+
+
+if __name__ == '__main__':
+    import sys
+
+    print("=" * 60)
+    print(f"MAINTENANCE SCHEDULER ({Config.DATABASE_PATH})")
+    print("=" * 60)
+
+    if '--enable-incremental-vacuum' in sys.argv:
+        ok = enable_incremental_vacuum(db)
+        print(f"  {'✓' if ok else '✗'} auto_vacuum=INCREMENTAL")
+        sys.exit(0 if ok else 1)
+
+    if '--run' in sys.argv:
+        name = sys.argv[sys.argv.index('--run') + 1]
+        if name not in scheduler.jobs:
+            print(f"  ✗ Unknown job {name} (one of: {', '.join(scheduler.jobs)})")
+            sys.exit(1)
+        outcome = scheduler.run_job(name)
+        print(f"  {'✓' if outcome['status'] == 'ok' else '✗'} {name}: {outcome}")
+        sys.exit(0 if outcome['status'] != 'error' else 1)
+
+    if '--status' in sys.argv:
+        for job in scheduler.status()['jobs']:
+            every = f"every {job['interval_s']}s" if job['interval_s'] else "disabled"
+            print(f"  {job['name']:20} {every:16} last {job['last_started'] or 'never'} "
+                  f"{job['last_status'] or ''} {job['last_duration_ms'] or ''}")
+        sys.exit(0)
+
+    if '--once' in sys.argv:
+        # No jitter: jobs that never ran are due right away
+        for name, outcome in Scheduler(db, jitter=0).run_pending().items():
+            print(f"  {'✗' if outcome['status'] == 'error' else '✓'} {name:20} {outcome}")
+        sys.exit(0)
+
+    scheduler.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        scheduler.stop()
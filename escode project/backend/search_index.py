@@ -0,0 +1,313 @@
+"""
+Full-text search for clients, publishers and inquiries (SQLite FTS5).
+
+Each table gets an FTS5 index (<table>_fts) kept in sync by
+INSERT/UPDATE/DELETE triggers, so searches are index lookups ranked by
+bm25 instead of LIKE '%term%' table scans.
+
+The persistent triggers only use built-in SQL, so any connection (the
+sqlite3 CLI, migrate_*.py scripts) can write these tables. Columns that
+may hold compressed bodies (see message_store.py) get an index that
+stores its own plain text: a compressed value is decoded in Python at
+write time by TEMP triggers that the app installs on its own writer
+connections (install_body_triggers), where message_body() exists.
+
+Run from backend/:
+    python search_index.py            # create missing indexes
+    python search_index.py --rebuild  # rebuild every index from scratch
+"""
+import logging
+import re
+import sqlite3
+
+# Indexed columns per table (columns missing from an older schema are skipped)
+FTS_TABLES = {
+    'clients': ['full_name', 'email', 'phone', 'company'],
+    'publishers': ['name', 'email', 'category'],
+    'inquiries': ['subject', 'message'],
+}
+
+# Columns that may hold compressed bodies: their table's index keeps its
+# own decoded copy instead of reading the base table
+FTS_COMPRESSED = {
+    'inquiries': ['message'],
+}
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_available(conn):
+    """Check that this SQLite build ships FTS5"""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE IF EXISTS temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _table_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def indexed_columns(conn, table):
+    """Columns of FTS_TABLES[table] present in the current schema"""
+    existing = _table_columns(conn, table)
+    return [c for c in FTS_TABLES[table] if c in existing]
+
+
+def _index_exists(conn, table):
+    row = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name=?",
+        (f"{table}_fts",)
+    ).fetchone()
+    return row is not None
+
+
+def _create_index(conn, table, columns):
+    """Create the FTS table and the triggers that keep it in sync"""
+    if table in FTS_COMPRESSED:
+        _create_decoded_index(conn, table, columns)
+        return
+
+    fts = f"{table}_fts"
+    cols = ', '.join(columns)
+    new_cols = ', '.join(f"new.{c}" for c in columns)
+    old_cols = ', '.join(f"old.{c}" for c in columns)
+
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE {fts} USING fts5(
+            {cols},
+            content='{table}', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+            INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols});
+        END
+    """)
+    conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def _plain(column, row='new'):
+    """Column value, or NULL for a compressed (BLOB) body"""
+    return f"CASE WHEN typeof({row}.{column}) = 'blob' THEN NULL ELSE {row}.{column} END"
+
+
+def _create_decoded_index(conn, table, columns):
+    """
+    Index holding its own decoded text. The triggers index plain values
+    directly; compressed ones are filled in by install_body_triggers().
+    Both sides work whichever trigger fires first.
+    """
+    fts = f"{table}_fts"
+    cols = ', '.join(columns)
+    compressed = FTS_COMPRESSED[table]
+    new_values = ', '.join(_plain(c) if c in compressed else f"new.{c}" for c in columns)
+    # A compressed column keeps what the decoding trigger put there
+    updates = ', '.join(
+        f"{c} = CASE WHEN typeof(new.{c}) = 'blob' THEN {c} ELSE new.{c} END" if c in compressed else f"{c} = new.{c}"
+        for c in columns
+    )
+
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE {fts} USING fts5(
+            {cols},
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts}(rowid, {cols})
+            SELECT new.id, {new_values} WHERE NOT EXISTS (SELECT 1 FROM {fts} WHERE rowid = new.id);
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN
+            DELETE FROM {fts} WHERE rowid = old.id;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN
+            UPDATE {fts} SET {updates} WHERE rowid = new.id;
+        END
+    """)
+
+    # Fill from Python so building the index needs no SQL functions
+    from message_store import decode_body
+    rows = conn.execute(f"SELECT id, {cols} FROM {table}")
+    placeholders = ', '.join('?' * (len(columns) + 1))
+    while True:
+        batch = rows.fetchmany(1000)
+        if not batch:
+            break
+        conn.executemany(
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES ({placeholders})",
+            [(row[0], *(decode_body(v) if c in compressed else v for c, v in zip(columns, row[1:]))) for row in batch]
+        )
+
+
+def install_body_triggers(conn):
+    """
+    TEMP triggers that index compressed bodies, decoded with
+    message_body(). Installed per writer connection (they only exist on
+    connections that registered the function); a no-op until the index
+    exists.
+    """
+    for table, compressed in FTS_COMPRESSED.items():
+        fts = f"{table}_fts"
+        if not _index_exists(conn, table):
+            continue
+        columns = _table_columns(conn, fts)
+        cols = ', '.join(columns)
+        values = ', '.join(f"message_body(new.{c})" if c in compressed else f"new.{c}" for c in columns)
+        for column in compressed:
+            conn.execute(f"""
+                CREATE TEMP TRIGGER IF NOT EXISTS {fts}_{column}_ai AFTER INSERT ON main.{table}
+                WHEN typeof(new.{column}) = 'blob' BEGIN
+                    INSERT OR REPLACE INTO {fts}(rowid, {cols}) VALUES (new.id, {values});
+                END
+            """)
+            conn.execute(f"""
+                CREATE TEMP TRIGGER IF NOT EXISTS {fts}_{column}_au AFTER UPDATE OF {column} ON main.{table}
+                WHEN typeof(new.{column}) = 'blob' BEGIN
+                    UPDATE {fts} SET {column} = message_body(new.{column}) WHERE rowid = new.id;
+                END
+            """)
+
+
+def _drop_index(conn, table):
+    fts = f"{table}_fts"
+    for suffix in ('ai', 'ad', 'au'):
+        conn.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+    conn.execute(f"DROP TABLE IF EXISTS {fts}")
+    conn.execute(f"DROP VIEW IF EXISTS {fts}_content")
+
+
+def ensure_search_index(conn):
+    """
+    Create any missing FTS index (migration 10 and the CLI).
+
+    Returns:
+        Dict of table -> columns covered by its search index
+    """
+    if not fts_available(conn):
+        logging.warning("SQLite FTS5 not available - search falls back to LIKE scans")
+        return {}
+
+    ready = {}
+    for table in FTS_TABLES:
+        if not _table_columns(conn, table):
+            continue
+        if not _index_exists(conn, table):
+            _create_index(conn, table, indexed_columns(conn, table))
+            logging.info(f"Created full-text index {table}_fts")
+        ready[table] = _table_columns(conn, f"{table}_fts")
+    return ready
+
+
+def search_tables(conn):
+    """
+    Indexes present in the database, without creating any.
+
+    Returns:
+        Dict of table -> columns covered by its search index
+    """
+    return {
+        table: _table_columns(conn, f"{table}_fts")
+        for table in FTS_TABLES
+        if _index_exists(conn, table)
+    }
+
+
+def rebuild_search_index(conn, tables=None):
+    """
+    Drop and recreate the FTS indexes and triggers.
+    Picks up columns added to the schema since the index was created.
+
+    Returns:
+        Dict of table -> indexed row count
+    """
+    counts = {}
+    for table in tables or FTS_TABLES:
+        if not _table_columns(conn, table):
+            continue
+        _drop_index(conn, table)
+        _create_index(conn, table, indexed_columns(conn, table))
+        counts[table] = conn.execute(f"SELECT COUNT(*) FROM {table}_fts").fetchone()[0]
+    return counts
+
+
+def build_match_query(search_term, columns=None):
+    """
+    Turn free user input into a safe FTS5 MATCH expression.
+    Every word must match as a prefix: "john gm" -> "john"* AND "gm"*
+
+    Returns:
+        MATCH string, or None if the term has no searchable words
+    """
+    tokens = TOKEN_RE.findall(search_term or '')
+    if not tokens:
+        return None
+    query = ' AND '.join(f'"{t}"*' for t in tokens)
+    if columns:
+        query = f"{{{' '.join(columns)}}} : ({query})"
+    return query
+
+
+def search(conn, table, search_term, columns=None, limit=None, offset=0):
+    """
+    Ranked full-text search (best bm25 score first).
+
+    Args:
+        conn: Open connection
+        table: One of FTS_TABLES
+        search_term: Raw user input
+        columns: Optional subset of indexed columns to search
+        limit: Max rows returned (None = every match)
+        offset: Matches to skip, for paging with limit
+
+    Returns:
+        List of rows from the base table
+    """
+    match = build_match_query(search_term, columns)
+    if match is None:
+        return []
+    query = f"""
+        SELECT t.*
+        FROM {table}_fts f
+        JOIN {table} t ON t.id = f.rowid
+        WHERE {table}_fts MATCH ?
+        ORDER BY bm25({table}_fts)
+        LIMIT ? OFFSET ?
+    """
+    return conn.execute(query, (match, -1 if limit is None else limit, offset)).fetchall()
+
+
+if __name__ == '__main__':
+    import sys
+    from database import db
+
+    print("=" * 60)
+    print("FULL-TEXT SEARCH INDEX")
+    print("=" * 60)
+
+    with db.get_connection() as conn:
+        if '--rebuild' in sys.argv:
+            for table, count in rebuild_search_index(conn).items():
+                print(f"  ✓ {table}_fts rebuilt ({count} rows)")
+        else:
+            for table in sorted(ensure_search_index(conn)):
+                print(f"  ✓ {table}_fts ready")
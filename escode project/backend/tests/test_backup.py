@@ -0,0 +1,53 @@
+"""
+Online backup throttling.
+
+Run from backend/:
+    python -m pytest tests/test_backup.py
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backup import create_backup
+
+
+class CreateBackupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.source = os.path.join(self.directory, 'source.db')
+        conn = sqlite3.connect(self.source)
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, body TEXT)")
+        conn.executemany("INSERT INTO t (body) VALUES (?)", [('x' * 2000,) for _ in range(100)])
+        conn.commit()
+        conn.close()
+
+    def backup(self, pages, sleep):
+        return create_backup(self.source, os.path.join(self.directory, 'snapshots'),
+                             pages=pages, sleep=sleep, compress=False, keep=10)
+
+    def test_sleeps_between_steps(self):
+        result = self.backup(pages=5, sleep=0.01)
+        self.assertGreater(result['steps'], 10)
+        self.assertGreaterEqual(result['seconds'], (result['steps'] - 1) * 0.01)
+
+    def test_elapsed_time_grows_with_step_count(self):
+        few = self.backup(pages=40, sleep=0.02)
+        many = self.backup(pages=4, sleep=0.02)
+        self.assertGreater(many['steps'], 4 * few['steps'])
+        self.assertGreater(many['seconds'], few['seconds'] + 0.02 * (many['steps'] - few['steps']) / 2)
+
+    def test_no_sleep_after_last_step(self):
+        result = self.backup(pages=1000, sleep=1.0)
+        self.assertEqual(result['steps'], 1)
+        self.assertLess(result['seconds'], 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,255 @@
+"""
+MailboxWatcher against a local IMAP stand-in server.
+
+Run from backend/:
+    python -m pytest tests/test_imap_idle.py
+"""
+import imaplib
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from imap_idle import MailboxWatcher
+
+
+class StandInServer(socketserver.ThreadingTCPServer):
+    """
+    Minimal IMAP server: LOGIN, CAPABILITY, SELECT/EXAMINE, UID SEARCH,
+    IDLE/DONE and LOGOUT over a shared list of message UIDs.
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, idle=True):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.idle = idle
+        self.uids = [1, 2, 3]
+        self.uidnext = 4
+        self.lock = threading.Lock()
+        self.handlers = []
+        self.commands = []
+        self.logins = 0
+        self.refuse_idle = False
+        self.exists_after_search = False
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def deliver(self, push=True):
+        """Add a message and push EXISTS to idling sessions"""
+        with self.lock:
+            self.uids.append(self.uidnext)
+            self.uidnext += 1
+            count = len(self.uids)
+        if push:
+            for handler in list(self.handlers):
+                if handler.idling:
+                    handler.send(f'* {count} EXISTS')
+
+    def expunge_oldest(self):
+        with self.lock:
+            self.uids.pop(0)
+
+    def drop_connections(self):
+        for handler in list(self.handlers):
+            try:
+                handler.request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def close(self):
+        self.shutdown()
+        self.drop_connections()
+        self.server_close()
+
+
+class StandInHandler(socketserver.StreamRequestHandler):
+    def send(self, *lines):
+        try:
+            self.wfile.write(b''.join(line.encode() + b'\r\n' for line in lines))
+            self.wfile.flush()
+        except OSError:
+            pass
+
+    def handle(self):
+        server = self.server
+        self.idling = None
+        server.handlers.append(self)
+        self.send('* OK stand-in ready')
+        for raw in self.rfile:
+            line = raw.decode().strip()
+            if self.idling:
+                if line == 'DONE':
+                    server.commands.append('DONE')
+                    self.send(f'{self.idling} OK IDLE terminated')
+                    self.idling = None
+                continue
+            tag, command, *args = line.split(' ', 2)
+            command = command.upper()
+            args = args[0] if args else ''
+            server.commands.append(command if command != 'UID' else 'UID ' + args.split()[0].upper())
+            if command == 'CAPABILITY':
+                self.send('* CAPABILITY IMAP4rev1' + (' IDLE' if server.idle else ''), f'{tag} OK done')
+            elif command == 'LOGIN':
+                server.logins += 1
+                self.send(f'{tag} OK logged in')
+            elif command in ('SELECT', 'EXAMINE'):
+                self.send(f'* {len(server.uids)} EXISTS', '* OK [UIDVALIDITY 1]',
+                          f'* OK [UIDNEXT {server.uidnext}]', f'{tag} OK [READ-ONLY] done')
+            elif command == 'UID' and args.upper().startswith('SEARCH'):
+                self.search(tag, args)
+            elif command == 'IDLE':
+                if server.refuse_idle:
+                    self.send(f'{tag} BAD not now')
+                else:
+                    self.idling = tag
+                    self.send('+ idling')
+            elif command == 'LOGOUT':
+                self.send('* BYE', f'{tag} OK done')
+                return
+            else:
+                self.send(f'{tag} BAD unknown')
+
+    def search(self, tag, args):
+        server = self.server
+        low = int(args.split()[-1].split(':')[0].replace('*', '0') or 0)
+        with server.lock:
+            found = [u for u in server.uids if u >= low] or server.uids[-1:]
+        lines = ['* SEARCH ' + ' '.join(map(str, found)), f'{tag} OK done']
+        if server.exists_after_search:
+            # New mail right behind the tagged reply, in the same packet
+            server.exists_after_search = False
+            server.deliver(push=False)
+            lines.append(f'* {len(server.uids)} EXISTS')
+        self.send(*lines)
+
+    def finish(self):
+        if self in self.server.handlers:
+            self.server.handlers.remove(self)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class MailboxWatcherTest(unittest.TestCase):
+
+    def start(self, idle=True, idle_timeout=30, poll_interval=30, max_delay=0.1, connect=None):
+        self.server = StandInServer(idle=idle)
+        self.addCleanup(self.server.close)
+        self.calls = []
+
+        def default_connect():
+            mail = imaplib.IMAP4('127.0.0.1', self.server.port)
+            mail.login('user', 'secret')
+            return mail
+
+        self.watcher = MailboxWatcher(connect or default_connect, lambda: self.calls.append(time.monotonic()),
+                                      mailbox='INBOX', idle_timeout=idle_timeout,
+                                      poll_interval=poll_interval, max_delay=max_delay)
+        self.watcher.start()
+        self.addCleanup(self.watcher.stop, 5)
+
+    def wait_idling(self):
+        self.assertTrue(wait_for(lambda: any(h.idling for h in self.server.handlers)))
+
+    def test_idle_push_wakes_on_mail(self):
+        self.start()
+        self.wait_idling()
+        self.assertTrue(wait_for(lambda: len(self.calls) == 1))  # catch-up after connect
+        self.assertEqual(self.watcher.status()['mode'], 'idle')
+
+        self.server.deliver()
+        self.assertTrue(wait_for(lambda: len(self.calls) == 2, timeout=2))
+
+    def test_idle_is_renewed_with_a_keepalive(self):
+        self.start(idle_timeout=0.3)
+        self.assertTrue(wait_for(lambda: self.server.commands.count('IDLE') >= 3))
+        commands = self.server.commands
+        renewal = commands.index('DONE')
+        self.assertEqual(commands[renewal + 1:renewal + 3], ['UID SEARCH', 'IDLE'])
+        self.assertEqual(len(self.calls), 1)  # no mail, no wake-up beyond the catch-up
+
+    def test_exists_buffered_behind_a_reply_is_not_lost(self):
+        self.start(idle_timeout=0.3)
+        self.wait_idling()
+        self.watcher.idle_timeout = 30
+        self.server.exists_after_search = True
+        # The next keepalive reply carries the EXISTS; the following IDLE must see it
+        self.assertTrue(wait_for(lambda: len(self.calls) == 2, timeout=2))
+
+    def test_reconnects_after_drop(self):
+        self.start()
+        self.wait_idling()
+        self.server.drop_connections()
+        self.assertTrue(wait_for(lambda: self.server.logins == 2))
+        self.wait_idling()
+        self.server.deliver()
+        self.assertTrue(wait_for(lambda: len(self.calls) >= 3))
+        self.assertEqual(self.watcher.status()['connections'], 2)
+
+    def test_backoff_grows_while_sessions_fail_after_login(self):
+        self.start(max_delay=0.05)
+        self.wait_idling()
+        self.server.refuse_idle = True
+        self.server.drop_connections()
+        self.assertTrue(wait_for(lambda: self.watcher.status()['failures'] >= 4))
+        self.assertIn('IDLE refused', self.watcher.status()['last_error'])
+
+        self.server.refuse_idle = False
+        self.watcher.idle_timeout = 0.2
+        self.assertTrue(wait_for(lambda: self.watcher.status()['failures'] == 0))
+
+    def test_backoff_on_connect_failure(self):
+        attempts = []
+
+        def failing_connect():
+            attempts.append(time.monotonic())
+            raise ConnectionRefusedError("no server")
+
+        self.start(connect=failing_connect, max_delay=0.1)
+        self.assertTrue(wait_for(lambda: len(attempts) >= 3))
+        self.assertGreaterEqual(self.watcher.status()['failures'], 3)
+        self.assertFalse(self.watcher.status()['connected'])
+
+    def test_poll_fallback(self):
+        self.start(idle=False, poll_interval=0.1)
+        self.assertTrue(wait_for(lambda: self.watcher.status()['mode'] == 'poll'))
+        self.assertTrue(wait_for(lambda: len(self.calls) == 1))
+        self.server.deliver(push=False)
+        self.assertTrue(wait_for(lambda: len(self.calls) == 2, timeout=2))
+        self.assertNotIn('IDLE', self.server.commands)
+
+    def test_poll_sees_mail_arriving_with_an_expunge(self):
+        self.start(idle=False, poll_interval=0.3)
+        self.assertTrue(wait_for(lambda: len(self.calls) == 1 and 'UID SEARCH' in self.server.commands))
+        # Message count stays at 3, but there is a new UID
+        self.server.expunge_oldest()
+        self.server.deliver(push=False)
+        self.assertTrue(wait_for(lambda: len(self.calls) == 2, timeout=2))
+
+    def test_stop_ends_idle_and_logs_out(self):
+        self.start()
+        self.wait_idling()
+        started = time.monotonic()
+        self.watcher.stop(5)
+        self.assertLess(time.monotonic() - started, 3)
+        self.assertFalse(self.watcher.is_running())
+        self.assertEqual(self.server.commands[-2:], ['DONE', 'LOGOUT'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -63,6 +63,8 @@ CREATE INDEX IF NOT EXISTS idx_inquiries_status ON inquiries(status);
 CREATE INDEX IF NOT EXISTS idx_inquiries_received ON inquiries(received_at DESC);
 CREATE INDEX IF NOT EXISTS idx_publishers_email ON publishers(email);
 CREATE INDEX IF NOT EXISTS idx_responses_inquiry ON responses(inquiry_id);
+CREATE INDEX IF NOT EXISTS idx_publishers_name ON publishers(name);
+CREATE INDEX IF NOT EXISTS idx_responses_sent ON responses(sent_at DESC);
 
 -- Usuario admin por defecto (password: admin123 - CAMBIAR DESPUES)
 INSERT OR IGNORE INTO users (username, password_hash, full_name, email) 
@@ -31,10 +31,10 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 });
 
-// Authentication
+// Authentication (one bootstrap request returns the user and the first screen's data)
 async function checkAuth() {
     try {
-        const response = await fetch(`${API_URL}/api/auth/check`, {
+        const response = await fetch(`${API_URL}/api/dashboard/bootstrap?status=&per_page=50`, {
             credentials: 'include'
         });
 
@@ -42,7 +42,7 @@ async function checkAuth() {
             const data = await response.json();
             currentUser = data.user;
             document.getElementById('currentUser').textContent = currentUser.full_name;
-            loadDashboard();
+            renderBootstrap(data);
         } else {
             window.location.href = '/login.html';
         }
@@ -251,9 +251,10 @@ function switchTab(tabName) {
     loadTabData(tabName);
 }
 
-function loadDashboard() {
-    loadInquiries();
-    loadInquiryStats();
+function renderBootstrap(data) {
+    renderInquiries(data.inquiries.data);
+    renderPagination('inquiriesPagination', data.inquiries);
+    document.getElementById('pendingBadge').textContent = data.stats.pending || 0;
     checkExpiringLicenses();
 }
 
@@ -402,12 +403,27 @@ async function syncEmails() {
 
         const data = await response.json();
 
-        if (data.success) {
-            alert(`Synced ${data.count} new emails`);
+        if (!data.success) {
+            alert('Sync failed: ' + data.error);
+            return;
+        }
+
+        // The sync runs in the background: follow the job until it ends
+        let job = null;
+        do {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            const jobResponse = await fetch(`${API_URL}${data.status_url}`, {
+                credentials: 'include'
+            });
+            job = await jobResponse.json();
+        } while (job.state === 'queued' || job.state === 'running');
+
+        if (job.state === 'done') {
+            alert(`Synced ${job.counts.created} new emails (rejected ${job.counts.rejected} incomplete)`);
             loadInquiries();
             loadInquiryStats();
         } else {
-            alert('Sync failed: ' + data.error);
+            alert('Sync failed: ' + (job.error || 'unknown error'));
         }
     } catch (error) {
         console.error('Sync error:', error);
@@ -831,10 +847,28 @@ function closeModal(modalId) {
     document.getElementById(modalId).classList.remove('active');
 }
 
-setInterval(() => {
-    console.log('Auto-syncing emails...');
-    syncEmails();
-}, 5 * 60 * 1000);
+// The server syncs new mail as it arrives (IMAP IDLE); tabs only refresh
+// their lists when the last ingest time changes
+let lastEmailIngest = null;
+setInterval(async () => {
+    try {
+        const response = await fetch(`${API_URL}/api/email/status`, {
+            credentials: 'include'
+        });
+        if (!response.ok) return;
+
+        const status = await response.json();
+        if (status.last_ingest && status.last_ingest !== lastEmailIngest) {
+            if (lastEmailIngest !== null) {
+                loadInquiries();
+                loadInquiryStats();
+            }
+            lastEmailIngest = status.last_ingest;
+        }
+    } catch (error) {
+        console.error('Email status error:', error);
+    }
+}, 30 * 1000);
 
 // ============================================================================
 // RESPONSES - TRAZABILIDAD CON CONVERSATION THREADS